@@ -38,3 +38,39 @@ class UsuarioPerfil(models.Model):
     def __str__(self):
         suc = self.sucursal.nombre if self.sucursal_id else "Sin sucursal"
         return f"{self.user.username} - {suc}"
+
+
+class ReporteJob(models.Model):
+    """
+    Resultado de un reporte pesado calculado en segundo plano.
+    La clave resume tipo + filtros: pedidos idénticos comparten el mismo job.
+    """
+
+    class Estado(models.TextChoices):
+        PENDIENTE = "PENDIENTE", "Pendiente"
+        EN_CURSO = "EN_CURSO", "En curso"
+        LISTO = "LISTO", "Listo"
+        ERROR = "ERROR", "Error"
+
+    clave = models.CharField(max_length=64, unique=True)
+    tipo = models.CharField(max_length=40)
+    parametros = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=20, choices=Estado.choices, default=Estado.PENDIENTE)
+    resultado = models.JSONField(null=True, blank=True)
+    error = models.CharField(max_length=255, blank=True, default="")
+
+    creado_en = models.DateTimeField(auto_now_add=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+    expira_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Reporte en segundo plano"
+        verbose_name_plural = "Reportes en segundo plano"
+        indexes = [models.Index(fields=["tipo", "estado"])]
+
+    @property
+    def pendiente(self) -> bool:
+        return self.estado in (self.Estado.PENDIENTE, self.Estado.EN_CURSO)
+
+    def __str__(self):
+        return f"{self.tipo} [{self.estado}] {self.clave[:12]}"
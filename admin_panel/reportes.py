@@ -0,0 +1,157 @@
+"""
+Reportes pesados en segundo plano (pool local de threads).
+
+Cada pedido se identifica por (tipo, parámetros). El job vive en la tabla
+ReporteJob, así que dos pedidos idénticos -aunque lleguen a workers distintos
+de gunicorn- se acoplan al mismo job y leen el mismo resultado.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections
+from django.utils import timezone
+
+from core.db.replica import leer_de_reportes
+
+from .models import ReporteJob
+
+logger = logging.getLogger(__name__)
+
+_REGISTRO = {}
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def registrar_reporte(tipo: str):
+    """Registra la función que calcula un tipo de reporte (devuelve dict JSON-serializable)."""
+    def decorator(func):
+        _REGISTRO[tipo] = func
+        return func
+    return decorator
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # Lazy: el pool se crea dentro del worker (nunca antes de un fork).
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=int(getattr(settings, "REPORTES_WORKERS", 1) or 1),
+                thread_name_prefix="reportes",
+            )
+        return _EXECUTOR
+
+
+def clave_reporte(tipo: str, parametros: dict) -> str:
+    raw = json.dumps({"tipo": tipo, "parametros": parametros}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _job_vigente(job: ReporteJob, ahora) -> bool:
+    if job.estado == ReporteJob.Estado.LISTO:
+        return job.expira_en is None or job.expira_en > ahora
+    if job.pendiente:
+        # Un job "colgado" (worker reiniciado a mitad de cálculo) se relanza.
+        timeout = int(getattr(settings, "REPORTES_JOB_TIMEOUT", 300) or 300)
+        return job.actualizado_en >= ahora - timedelta(seconds=timeout)
+    if job.estado == ReporteJob.Estado.ERROR:
+        # El error se muestra un rato antes de reintentar (evita loops de recarga).
+        espera = int(getattr(settings, "REPORTES_ERROR_REINTENTO", 60) or 0)
+        return job.actualizado_en >= ahora - timedelta(seconds=espera)
+    return False
+
+
+def obtener_o_encolar(tipo: str, parametros: dict, *, ttl_segundos: int) -> ReporteJob:
+    """
+    Devuelve el job del reporte. Si no hay resultado vigente ni un cálculo
+    en curso, lo (re)encola en el pool local.
+    """
+    if tipo not in _REGISTRO:
+        raise ValueError(f"Reporte no registrado: {tipo}")
+
+    clave = clave_reporte(tipo, parametros)
+    ahora = timezone.now()
+
+    job = ReporteJob.objects.filter(clave=clave).first()
+    if job is not None and _job_vigente(job, ahora):
+        return job
+
+    if job is None:
+        try:
+            job = ReporteJob.objects.create(
+                clave=clave,
+                tipo=tipo,
+                parametros=parametros,
+                estado=ReporteJob.Estado.PENDIENTE,
+            )
+        except IntegrityError:
+            # Otro request (u otro worker) lo creó en paralelo: nos acoplamos a ese.
+            return ReporteJob.objects.get(clave=clave)
+    else:
+        # Reclamo condicional: solo un request gana el relanzamiento.
+        tomado = (
+            ReporteJob.objects
+            .filter(pk=job.pk, estado=job.estado, actualizado_en=job.actualizado_en)
+            .update(
+                estado=ReporteJob.Estado.PENDIENTE,
+                resultado=None,
+                error="",
+                expira_en=None,
+                actualizado_en=ahora,
+            )
+        )
+        job.refresh_from_db()
+        if not tomado:
+            return job
+
+    _get_executor().submit(_ejecutar_en_worker, job.pk, ttl_segundos)
+    return job
+
+
+def ejecutar_job(job_id: int, ttl_segundos: int) -> None:
+    job = ReporteJob.objects.get(pk=job_id)
+    func = _REGISTRO[job.tipo]
+
+    ReporteJob.objects.filter(pk=job.pk).update(
+        estado=ReporteJob.Estado.EN_CURSO,
+        actualizado_en=timezone.now(),
+    )
+
+    try:
+        # El cálculo es de solo lectura: va a la base de reportes si hay una configurada.
+        with leer_de_reportes():
+            resultado = func(**(job.parametros or {}))
+    except Exception as exc:
+        logger.error("Reporte %s falló: %s", job.tipo, traceback.format_exc())
+        ReporteJob.objects.filter(pk=job.pk).update(
+            estado=ReporteJob.Estado.ERROR,
+            error=str(exc)[:255],
+            actualizado_en=timezone.now(),
+        )
+        return
+
+    ahora = timezone.now()
+    ReporteJob.objects.filter(pk=job.pk).update(
+        estado=ReporteJob.Estado.LISTO,
+        resultado=resultado,
+        error="",
+        expira_en=ahora + timedelta(seconds=int(ttl_segundos)),
+        actualizado_en=ahora,
+    )
+
+
+def _ejecutar_en_worker(job_id: int, ttl_segundos: int) -> None:
+    try:
+        ejecutar_job(job_id, ttl_segundos)
+    except Exception:
+        logger.error("Error inesperado ejecutando reporte #%s: %s", job_id, traceback.format_exc())
+    finally:
+        # Las conexiones son por thread: las liberamos al terminar el job.
+        connections.close_all()
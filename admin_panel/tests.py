@@ -1,3 +1,35 @@
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from admin_panel import reportes
+from admin_panel.models import ReporteJob
+
+
+@reportes.registrar_reporte("_test_suma")
+def _reporte_suma(a=0, b=0):
+    return {"total": a + b}
+
+
+class ReportesJobTests(TestCase):
+    def test_pedidos_identicos_se_acoplan_al_mismo_job(self):
+        executor = mock.Mock()
+        with mock.patch.object(reportes, "_get_executor", return_value=executor):
+            j1 = reportes.obtener_o_encolar("_test_suma", {"a": 1, "b": 2}, ttl_segundos=60)
+            j2 = reportes.obtener_o_encolar("_test_suma", {"b": 2, "a": 1}, ttl_segundos=60)
+
+        self.assertEqual(j1.pk, j2.pk)
+        self.assertEqual(executor.submit.call_count, 1)
+        self.assertEqual(ReporteJob.objects.count(), 1)
+
+    def test_ejecutar_job_guarda_resultado(self):
+        executor = mock.Mock()
+        with mock.patch.object(reportes, "_get_executor", return_value=executor):
+            job = reportes.obtener_o_encolar("_test_suma", {"a": 1, "b": 2}, ttl_segundos=60)
+
+        reportes.ejecutar_job(job.pk, 60)
+        job.refresh_from_db()
+
+        self.assertEqual(job.estado, ReporteJob.Estado.LISTO)
+        self.assertEqual(job.resultado, {"total": 3})
+        self.assertIsNotNone(job.expira_en)
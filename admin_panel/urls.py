@@ -1,5 +1,10 @@
+from functools import wraps
+
 from django.urls import path
-from django.contrib.auth.decorators import login_required, permission_required
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+
+from core.autorizacion import usuario_tiene_permiso
 from . import views
 
 app_name = "admin_panel"
@@ -10,11 +15,15 @@ ADMIN_PANEL_GATE_PERMISSION = "admin_panel.view_usuarioperfil"
 def _admin_panel_protect(view_func):
     """
     Bloquea acceso al Admin Panel a usuarios sin permiso explícito del app.
-    Superusers pasan por has_perm automáticamente.
+    Superusers pasan siempre. El permiso sale de la autorización cacheada.
     """
-    return login_required(
-        permission_required(ADMIN_PANEL_GATE_PERMISSION, raise_exception=True)(view_func)
-    )
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        if not usuario_tiene_permiso(request.user, ADMIN_PANEL_GATE_PERMISSION):
+            raise PermissionDenied
+        return view_func(request, *args, **kwargs)
+
+    return login_required(_wrapped)
 
 
 urlpatterns = [
@@ -27,10 +36,17 @@ urlpatterns = [
     path("tarjetas/", _admin_panel_protect(views.tarjetas_view), name="tarjetas"),
     path("ventas/<int:venta_id>/", _admin_panel_protect(views.ventas_detalle), name="ventas_detalle"),
     path("balances/", _admin_panel_protect(views.balances), name="balances"),
+    path("balances/estado/", _admin_panel_protect(views.balances_estado), name="balances_estado"),
+    path("balances/libro-iva/", _admin_panel_protect(views.libro_iva_exportar), name="libro_iva_exportar"),
+    path("stock-bajo/", _admin_panel_protect(views.stock_bajo), name="stock_bajo"),
     path("cuentas-corrientes/", _admin_panel_protect(views.cc_lista), name="cc_lista"),
+    path("cuentas-corrientes/antiguedad/", _admin_panel_protect(views.cc_antiguedad), name="cc_antiguedad"),
+    path("cuentas-corrientes/importar-pagos/", _admin_panel_protect(views.cc_importar_pagos), name="cc_importar_pagos"),
+    path("cuentas-corrientes/antiguedad/exportar/", _admin_panel_protect(views.cc_antiguedad_exportar), name="cc_antiguedad_exportar"),
     path("cuentas-corrientes/<int:cuenta_id>/", _admin_panel_protect(views.cc_detalle), name="cc_detalle"),
     path("cuentas-corrientes/<int:cuenta_id>/toggle/", _admin_panel_protect(views.cc_toggle_activa), name="cc_toggle_activa"),
     path("cuentas-corrientes/<int:cuenta_id>/pago/", _admin_panel_protect(views.cc_registrar_pago), name="cc_registrar_pago"),
+    path("cuentas-corrientes/<int:cuenta_id>/exportar/", _admin_panel_protect(views.cc_exportar), name="cc_exportar"),
     path("cuentas-corrientes/nueva/", _admin_panel_protect(views.cc_crear), name="cc_crear"),
 
 
@@ -1,10 +1,14 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from core.models import AppSetting, Sucursal
-from ventas.models import Venta, VentaItem, VentaPago, PlanCuotas
+from catalogo.models import StockSucursal
+from ventas.models import MargenDiario, Venta, VentaItem, VentaPago, PlanCuotas
+from ventas.libro_iva import acumular_total, filas_libro_iva, linea_txt
 from django.core.paginator import Paginator
 from django.db.models import Q, Sum, Value, Count, F, DecimalField, ExpressionWrapper
 from datetime import datetime, timedelta, time
@@ -16,6 +20,7 @@ from decimal import Decimal
 from django.db.models.functions import Coalesce
 from django.db import transaction, IntegrityError
 import calendar
+import csv
 from cuentas_corrientes.models import Cliente, CuentaCorriente
 from django.contrib import messages
 from admin_panel.services import (
@@ -32,6 +37,11 @@ from admin_panel.forms import (
     EmpresaDatosForm,
     SucursalCreateForm,
 )
+from admin_panel.models import ReporteJob
+from admin_panel.reportes import obtener_o_encolar, registrar_reporte
+from core import referencia
+from core.autorizacion import invalidar_autorizaciones
+from core.db.replica import lectura_reportes
 from core.fiscal import get_empresa_condicion_fiscal, set_empresa_condicion_fiscal
 
 
@@ -139,48 +149,14 @@ def _venta_medio_pago_resumen(venta: Venta) -> str:
     return f"Mixto ({base})"
 
 
-def _build_nombre_item_venta(variante):
-    producto = getattr(variante, "producto", None)
-    base = (getattr(producto, "nombre", "") or "").strip()
-
-    color = ""
-    talle = ""
-
-    attrs_mgr = getattr(variante, "atributos", None)
-    attrs = attrs_mgr.all() if attrs_mgr is not None else []
-    for va in attrs:
-        nom = (getattr(getattr(va, "atributo", None), "nombre", "") or "").strip().lower()
-        val = (getattr(getattr(va, "valor", None), "valor", "") or "").strip()
-        if not val:
-            continue
-        if nom == "color":
-            color = val
-        elif nom in ("talle", "tamaño", "tamanio", "size"):
-            talle = val
-
-    partes = [p for p in (base, color, talle) if p]
-    return " - ".join(partes) if partes else (getattr(variante, "sku", "") or base or "Item")
-
-
-@login_required
-def balances(request):
-    vista = (request.GET.get("vista") or "ventas").strip().lower()
-    if vista not in {"ventas", "productos", "pagos"}:
-        vista = "ventas"
-
-    raw_from = request.GET.get("from", None)
-    raw_to = request.GET.get("to", None)
-    hoy = timezone.localdate()
-
-    date_from = _parse_date(raw_from or "")
-    date_to = _parse_date(raw_to or "")
-
-    # default: hoy
-    if raw_from is None and raw_to is None:
-        date_from = hoy
-        date_to = hoy
-        raw_from = hoy.strftime("%Y-%m-%d")
-        raw_to = hoy.strftime("%Y-%m-%d")
+@registrar_reporte("balances")
+def _calcular_balances(desde=None, hasta=None) -> dict:
+    """
+    Calcula todos los agregados de Balances para el rango [desde, hasta].
+    Devuelve solo tipos JSON (se guarda tal cual en ReporteJob.resultado).
+    """
+    date_from = _parse_date(desde or "")
+    date_to = _parse_date(hasta or "")
 
     qs = Venta.objects.select_related("sucursal").filter(estado=Venta.Estado.CONFIRMADA)
 
@@ -191,9 +167,9 @@ def balances(request):
         total=Sum("total"),
         cantidad=Count("id"),
     )
-    total = kpi["total"] or 0
+    total = Decimal(kpi["total"] or 0).quantize(Decimal("0.01"))
     cantidad = kpi["cantidad"] or 0
-    ticket_prom = (total / cantidad) if cantidad else 0
+    ticket_prom = (total / cantidad).quantize(Decimal("0.01")) if cantidad else Decimal("0.00")
 
     # Serie por día
     por_dia = list(
@@ -324,6 +300,163 @@ def balances(request):
     data_producto = [float(x["total"] or 0) for x in por_producto[:15]]
     data_producto_cantidad = [int(x["cantidad"] or 0) for x in por_producto[:15]]
 
+    return {
+        "total": str(total),
+        "cantidad": int(cantidad),
+        "ticket_prom": str(ticket_prom),
+        "labels_dia": labels_dia,
+        "data_total_dia": data_total_dia,
+        "data_cantidad_dia": data_cantidad_dia,
+        "labels_hora": labels_hora,
+        "data_hora": data_hora,
+        "data_hora_cantidad": data_hora_cantidad,
+        "labels_medio": labels_medio,
+        "data_medio": data_medio,
+        "data_medio_cantidad_ventas": data_medio_cantidad_ventas,
+        "labels_sucursal": labels_sucursal,
+        "data_sucursal": data_sucursal,
+        "data_sucursal_cantidad": data_sucursal_cantidad,
+        "labels_categoria": labels_categoria,
+        "data_categoria": data_categoria,
+        "data_categoria_cantidad": data_categoria_cantidad,
+        "labels_producto": labels_producto,
+        "data_producto": data_producto,
+        "data_producto_cantidad": data_producto_cantidad,
+    }
+
+
+def _balances_filtros(request):
+    raw_from = request.GET.get("from", None)
+    raw_to = request.GET.get("to", None)
+    hoy = timezone.localdate()
+
+    date_from = _parse_date(raw_from or "")
+    date_to = _parse_date(raw_to or "")
+
+    # default: hoy
+    if raw_from is None and raw_to is None:
+        date_from = hoy
+        date_to = hoy
+        raw_from = hoy.strftime("%Y-%m-%d")
+        raw_to = hoy.strftime("%Y-%m-%d")
+
+    return raw_from, raw_to, date_from, date_to
+
+
+def _balances_es_rango_largo(date_from, date_to) -> bool:
+    """Rangos largos (o abiertos) se calculan en segundo plano."""
+    limite = int(getattr(settings, "REPORTES_DIAS_SEGUNDO_PLANO", 31) or 31)
+    if date_from is None:
+        return True
+    hasta = date_to or timezone.localdate()
+    return (hasta - date_from).days > limite
+
+
+def _balances_ttl(date_to) -> int:
+    # Un rango cerrado en el pasado no cambia: su resultado puede vivir mucho más.
+    if date_to is not None and date_to < timezone.localdate():
+        return int(getattr(settings, "REPORTES_TTL_CERRADO", 60 * 60 * 24) or 0)
+    return int(getattr(settings, "REPORTES_TTL_ABIERTO", 60 * 10) or 0)
+
+
+def _balances_job(date_from, date_to):
+    parametros = {
+        "desde": date_from.strftime("%Y-%m-%d") if date_from else None,
+        "hasta": date_to.strftime("%Y-%m-%d") if date_to else None,
+    }
+    return obtener_o_encolar("balances", parametros, ttl_segundos=_balances_ttl(date_to))
+
+
+def _calcular_margenes(date_from, date_to) -> dict:
+    """
+    Márgenes del rango leyendo solo el acumulado MargenDiario
+    (costo y nombres son snapshots: no se consulta el catálogo).
+    """
+    qs = MargenDiario.objects.all()
+    if date_from:
+        qs = qs.filter(dia__gte=date_from)
+    if date_to:
+        qs = qs.filter(dia__lte=date_to)
+
+    metricas = {
+        "cantidad": Sum("cantidad"),
+        "venta_total": Sum("venta_total"),
+        "venta_neto": Sum("venta_neto"),
+        "costo_total": Sum("costo_total"),
+        "cantidad_sin_costo": Sum("cantidad_sin_costo"),
+    }
+
+    def _fila(row, label):
+        neto = Decimal(row.get("venta_neto") or 0).quantize(Decimal("0.01"))
+        costo = Decimal(row.get("costo_total") or 0).quantize(Decimal("0.01"))
+        margen = (neto - costo).quantize(Decimal("0.01"))
+        return {
+            "label": label,
+            "cantidad": int(row.get("cantidad") or 0),
+            "venta_total": Decimal(row.get("venta_total") or 0).quantize(Decimal("0.01")),
+            "venta_neto": neto,
+            "costo_total": costo,
+            "margen": margen,
+            "margen_pct": ((margen * 100) / neto).quantize(Decimal("0.1")) if neto else None,
+            "cantidad_sin_costo": int(row.get("cantidad_sin_costo") or 0),
+        }
+
+    por_categoria = [
+        _fila(r, r["categoria_nombre"] or "Sin categoría")
+        for r in qs.values("categoria_nombre").annotate(**metricas).order_by("-venta_neto")
+    ]
+    por_producto = [
+        _fila(r, r["producto_nombre"] or "Sin nombre")
+        for r in qs.values("producto_id", "producto_nombre").annotate(**metricas).order_by("-venta_neto")[:30]
+    ]
+    sucursales = referencia.nombres_sucursales()
+    por_sucursal = [
+        _fila(r, sucursales.get(r["sucursal_id"], f"Sucursal #{r['sucursal_id']}"))
+        for r in qs.values("sucursal_id").annotate(**metricas).order_by("-venta_neto")
+    ]
+    por_dia = [
+        _fila(r, r["dia"].strftime("%d/%m/%Y"))
+        for r in qs.values("dia").annotate(**metricas).order_by("dia")
+    ]
+
+    return {
+        "totales": _fila(qs.aggregate(**metricas), "Total"),
+        "por_categoria": por_categoria,
+        "por_producto": por_producto,
+        "por_sucursal": por_sucursal,
+        "por_dia": por_dia,
+    }
+
+
+@login_required
+@lectura_reportes
+def balances(request):
+    vista = (request.GET.get("vista") or "ventas").strip().lower()
+    if vista not in {"ventas", "productos", "pagos", "margenes"}:
+        vista = "ventas"
+
+    hoy = timezone.localdate()
+    raw_from, raw_to, date_from, date_to = _balances_filtros(request)
+
+    reporte_job = None
+    margenes = None
+    if vista == "margenes":
+        # Sale del acumulado diario: barato aun para rangos largos.
+        data = {}
+        margenes = _calcular_margenes(date_from, date_to)
+    elif _balances_es_rango_largo(date_from, date_to):
+        # No bloqueamos el worker de gunicorn: el cálculo corre en el pool de reportes.
+        reporte_job = _balances_job(date_from, date_to)
+        if reporte_job.estado == ReporteJob.Estado.LISTO:
+            data = reporte_job.resultado or {}
+        else:
+            data = {}
+    else:
+        data = _calcular_balances(
+            desde=date_from.strftime("%Y-%m-%d") if date_from else None,
+            hasta=date_to.strftime("%Y-%m-%d") if date_to else None,
+        )
+
     rangos_fecha = {
         "1m": {"label": "1 mes", "from": _shift_months(hoy, -1).strftime("%Y-%m-%d"), "to": hoy.strftime("%Y-%m-%d"), "vista": vista},
         "3m": {"label": "3 meses", "from": _shift_months(hoy, -3).strftime("%Y-%m-%d"), "to": hoy.strftime("%Y-%m-%d"), "vista": vista},
@@ -336,41 +469,72 @@ def balances(request):
         "to": raw_to or "",
         "vista": vista,
         "rangos_fecha": rangos_fecha,
+        "margenes": margenes,
+        "libro_iva_mes": (hoy.replace(day=1) - timedelta(days=1)).strftime("%Y-%m"),
+        "sucursales_disponibles": referencia.sucursales(solo_activas=False),
 
-        "total": total,
-        "cantidad": cantidad,
-        "ticket_prom": ticket_prom,
+        "reporte_pendiente": bool(reporte_job and reporte_job.pendiente),
+        "reporte_error": (
+            reporte_job.error or "No se pudo calcular el reporte."
+            if reporte_job and reporte_job.estado == ReporteJob.Estado.ERROR
+            else ""
+        ),
+
+        "total": data.get("total", 0),
+        "cantidad": data.get("cantidad", 0),
+        "ticket_prom": data.get("ticket_prom", 0),
 
         # JSON para charts
-        "labels_dia_json": json.dumps(labels_dia),
-        "data_total_dia_json": json.dumps(data_total_dia),
-        "data_cantidad_dia_json": json.dumps(data_cantidad_dia),
-        "labels_hora_json": json.dumps(labels_hora),
-        "data_hora_json": json.dumps(data_hora),
-        "data_hora_cantidad_json": json.dumps(data_hora_cantidad),
-
-        "labels_medio_json": json.dumps(labels_medio),
-        "data_medio_json": json.dumps(data_medio),
-        "data_medio_cantidad_ventas_json": json.dumps(data_medio_cantidad_ventas),
-
-        "labels_sucursal_json": json.dumps(labels_sucursal),
-        "data_sucursal_json": json.dumps(data_sucursal),
-        "data_sucursal_cantidad_json": json.dumps(data_sucursal_cantidad),
-
-        "labels_categoria_json": json.dumps(labels_categoria),
-        "data_categoria_json": json.dumps(data_categoria),
-        "data_categoria_cantidad_json": json.dumps(data_categoria_cantidad),
-        "labels_producto_json": json.dumps(labels_producto),
-        "data_producto_json": json.dumps(data_producto),
-        "data_producto_cantidad_json": json.dumps(data_producto_cantidad),
+        "labels_dia_json": json.dumps(data.get("labels_dia", [])),
+        "data_total_dia_json": json.dumps(data.get("data_total_dia", [])),
+        "data_cantidad_dia_json": json.dumps(data.get("data_cantidad_dia", [])),
+        "labels_hora_json": json.dumps(data.get("labels_hora", [])),
+        "data_hora_json": json.dumps(data.get("data_hora", [])),
+        "data_hora_cantidad_json": json.dumps(data.get("data_hora_cantidad", [])),
+
+        "labels_medio_json": json.dumps(data.get("labels_medio", [])),
+        "data_medio_json": json.dumps(data.get("data_medio", [])),
+        "data_medio_cantidad_ventas_json": json.dumps(data.get("data_medio_cantidad_ventas", [])),
+
+        "labels_sucursal_json": json.dumps(data.get("labels_sucursal", [])),
+        "data_sucursal_json": json.dumps(data.get("data_sucursal", [])),
+        "data_sucursal_cantidad_json": json.dumps(data.get("data_sucursal_cantidad", [])),
+
+        "labels_categoria_json": json.dumps(data.get("labels_categoria", [])),
+        "data_categoria_json": json.dumps(data.get("data_categoria", [])),
+        "data_categoria_cantidad_json": json.dumps(data.get("data_categoria_cantidad", [])),
+        "labels_producto_json": json.dumps(data.get("labels_producto", [])),
+        "data_producto_json": json.dumps(data.get("data_producto", [])),
+        "data_producto_cantidad_json": json.dumps(data.get("data_producto_cantidad", [])),
     })
 
+
+@login_required
+def balances_estado(request):
+    """
+    HTMX (polling): mientras el job siga en curso devuelve el mismo aviso;
+    cuando termina pide recargar la página, que ya lee el resultado guardado.
+    """
+    _, _, date_from, date_to = _balances_filtros(request)
+    reporte_job = _balances_job(date_from, date_to)
+
+    if reporte_job.pendiente:
+        return render(request, "admin_panel/_balances_pendiente.html", {
+            "query": request.GET.urlencode(),
+        })
+
+    resp = HttpResponse("")
+    resp["HX-Refresh"] = "true"
+    return resp
+
+
 @login_required
+@lectura_reportes
 def ventas_lista(request):
     q = (request.GET.get("q") or "").strip()
     sucursal_id = (request.GET.get("sucursal") or "").strip()
     estado = (request.GET.get("estado") or "").strip()
-    sucursales_disponibles = Sucursal.objects.filter(activa=True).order_by("nombre", "id")
+    sucursales_disponibles = referencia.sucursales()
 
     # None si NO viene en la URL
     raw_from = request.GET.get("from", None)
@@ -401,11 +565,15 @@ def ventas_lista(request):
         filtros = Q()
         if q.isdigit():
             numero = int(q)
-            filtros |= Q(id=numero) | Q(numero_sucursal=numero)
+            filtros |= Q(id=numero) | Q(numero_sucursal=numero) | Q(numero_terminal=numero)
         else:
             q_up = q.upper()
+            punto, _, numero = q_up.partition("-")
             if q_up.startswith("V") and q_up[1:].isdigit():
                 filtros |= Q(numero_sucursal=int(q_up[1:]))
+            elif punto.isdigit() and numero.isdigit():
+                # Código por terminal: "0002-00000015".
+                filtros |= Q(punto_venta=int(punto), numero_terminal=int(numero))
         filtros |= Q(sucursal__nombre__icontains=q)
         qs = qs.filter(filtros)
 
@@ -427,6 +595,47 @@ def ventas_lista(request):
         "estados": Venta.Estado.choices,
     })
 
+@login_required
+def stock_bajo(request):
+    """
+    Reporte de stock bajo: lee solo filas marcadas (bajo_minimo), sin recorrer todo el stock.
+    """
+    sucursal_id = (request.GET.get("sucursal") or "").strip()
+    q = (request.GET.get("q") or "").strip()
+    sucursales_disponibles = referencia.sucursales()
+
+    qs = (
+        StockSucursal.objects
+        .filter(
+            bajo_minimo=True,
+            sucursal__activa=True,
+            variante__activo=True,
+            variante__producto__activo=True,
+        )
+        .select_related("sucursal", "variante", "variante__producto")
+    )
+
+    if sucursal_id.isdigit():
+        qs = qs.filter(sucursal_id=int(sucursal_id))
+
+    if q:
+        qs = qs.filter(Q(variante__sku__icontains=q) | Q(variante__producto__nombre__icontains=q))
+
+    qs = qs.order_by("sucursal__nombre", "cantidad", "variante__producto__nombre", "variante__sku")
+
+    paginator = Paginator(qs, 30)
+    page_obj = paginator.get_page(request.GET.get("page") or 1)
+    for s in page_obj.object_list:
+        s.faltante = max(int(s.minimo or 0) - int(s.cantidad or 0), 0)
+
+    return render(request, "admin_panel/stock_bajo.html", {
+        "page_obj": page_obj,
+        "q": q,
+        "sucursal": sucursal_id,
+        "sucursales_disponibles": sucursales_disponibles,
+    })
+
+
 @login_required
 def ventas_detalle(request, venta_id: int):
     venta = get_object_or_404(
@@ -434,13 +643,8 @@ def ventas_detalle(request, venta_id: int):
         id=venta_id
     )
 
-    # gracias a related_name
-    items = (
-        venta.items
-        .select_related("variante", "variante__producto")
-        .prefetch_related("variante__atributos__atributo", "variante__atributos__valor")
-        .order_by("id")
-    )
+    # Descripción y SKU salen del snapshot de cada item (no del catálogo actual).
+    items = venta.items.order_by("id")
     pagos = venta.pagos.select_related("plan").order_by("id")
 
     total_items = Decimal("0.00")
@@ -448,7 +652,6 @@ def ventas_detalle(request, venta_id: int):
     total_pagado = Decimal("0.00")
 
     for it in items:
-        it.nombre_admin = _build_nombre_item_venta(it.variante)
         subtotal = Decimal(it.subtotal or 0).quantize(Decimal("0.01"))
         total_items += subtotal
 
@@ -472,7 +675,7 @@ def ventas_detalle(request, venta_id: int):
 @login_required
 @permission_required("core.change_appsetting", raise_exception=True)
 def settings_view(request):
-    sucursales_disponibles = list(Sucursal.objects.filter(activa=True).order_by("nombre", "id"))
+    sucursales_disponibles = referencia.sucursales()
     selected_sucursal_raw = (
         request.POST.get("sucursal") if request.method == "POST"
         else request.GET.get("sucursal")
@@ -575,6 +778,8 @@ def empresa_datos(request):
             sucursal_form = SucursalCreateForm(request.POST, instance=edit_sucursal, prefix="sucursal")
             if sucursal_form.is_valid():
                 sucursal = sucursal_form.save()
+                # La foto de autorización guarda nombre y estado de la sucursal asignada.
+                transaction.on_commit(invalidar_autorizaciones)
                 msg = (
                     f"Sucursal creada: {sucursal.nombre}."
                     if edit_sucursal is None
@@ -591,6 +796,7 @@ def empresa_datos(request):
             sucursal = get_object_or_404(Sucursal, id=request.POST.get("sucursal_id"))
             sucursal.activa = not sucursal.activa
             sucursal.save(update_fields=["activa"])
+            transaction.on_commit(invalidar_autorizaciones)
 
             estado = "activada" if sucursal.activa else "desactivada"
             messages.success(request, f"Sucursal {sucursal.nombre} {estado}.")
@@ -723,6 +929,7 @@ def tarjetas_view(request):
 
 
 @login_required
+@lectura_reportes
 def dashboard(request):
     return render(request, "admin_panel/dashboard.html")
 
@@ -787,6 +994,7 @@ def usuarios_lista(request):
             user_modal_form = AdminPanelUserForm(request.POST, instance=instance, prefix="user_modal")
             if user_modal_form.is_valid():
                 user_modal_form.save()
+                transaction.on_commit(invalidar_autorizaciones)
                 msg = "Usuario creado correctamente." if not user_id else "Usuario actualizado correctamente."
                 messages.success(request, msg)
                 return _admin_panel_redirect_with_tab("usuarios")
@@ -813,6 +1021,7 @@ def usuarios_lista(request):
             else:
                 user.is_active = not user.is_active
                 user.save(update_fields=["is_active"])
+                transaction.on_commit(invalidar_autorizaciones)
                 state = "activado" if user.is_active else "desactivado"
                 messages.success(request, f"Usuario {user.username} {state}.")
             return _admin_panel_redirect_with_tab("usuarios")
@@ -828,6 +1037,7 @@ def usuarios_lista(request):
             if role_form.is_valid():
                 role = role_form.save()
                 role.permissions.set(role_form.cleaned_data.get("permissions") or [])
+                transaction.on_commit(invalidar_autorizaciones)
                 msg = "Rol creado correctamente." if not role_id else "Rol actualizado correctamente."
                 messages.success(request, msg)
                 return _admin_panel_redirect_with_tab("roles")
@@ -844,6 +1054,7 @@ def usuarios_lista(request):
             else:
                 role_name = role.name
                 role.delete()
+                transaction.on_commit(invalidar_autorizaciones)
                 messages.success(request, f"Rol eliminado: {role_name}.")
             return _admin_panel_redirect_with_tab("roles")
 
@@ -904,6 +1115,13 @@ def usuarios_lista(request):
 
 #cuenta corriente
 from cuentas_corrientes.models import CuentaCorriente, MovimientoCuentaCorriente
+from cuentas_corrientes.services import (
+    antiguedad_saldos,
+    importar_pagos,
+    iterar_estado_cuenta,
+    leer_csv_pagos,
+    pagina_estado_cuenta,
+)
 
 
 class PagoCCForm(forms.Form):
@@ -913,37 +1131,15 @@ class PagoCCForm(forms.Form):
 
 
 @login_required
+@lectura_reportes
 def cc_lista(request):
     q = (request.GET.get("q") or "").strip()
     activa = request.GET.get("activa", "1")  # "1" activa, "0" inactiva, "" todas
 
-    saldo_field = DecimalField(max_digits=12, decimal_places=2)
-    zero = Value(0, output_field=saldo_field)
-
+    # El saldo está materializado en la cuenta: no se agregan movimientos.
     qs = (
         CuentaCorriente.objects
         .select_related("cliente")
-        .annotate(
-            debitos=Coalesce(
-                Sum(
-                    "movimientos__monto",
-                    filter=Q(movimientos__tipo=MovimientoCuentaCorriente.Tipo.DEBITO)
-                ),
-                zero,
-                output_field=saldo_field,
-            ),
-            creditos=Coalesce(
-                Sum(
-                    "movimientos__monto",
-                    filter=Q(movimientos__tipo=MovimientoCuentaCorriente.Tipo.CREDITO)
-                ),
-                zero,
-                output_field=saldo_field,
-            ),
-        )
-        .annotate(
-            saldo_calc=ExpressionWrapper(F("debitos") - F("creditos"), output_field=saldo_field)
-        )
         .order_by("cliente__apellido", "cliente__nombre")
     )
 
@@ -965,6 +1161,22 @@ def cc_lista(request):
     })
 
 
+def _cc_detalle_ctx(request, cuenta, form):
+    pagina = pagina_estado_cuenta(
+        cuenta,
+        antes=(request.GET.get("antes") or "").strip(),
+        despues=(request.GET.get("despues") or "").strip(),
+    )
+    return {
+        "cuenta": cuenta,
+        "cliente": cuenta.cliente,
+        "saldo": cuenta.saldo,
+        "form": form,
+        "es_primera_pagina": not (request.GET.get("antes") or request.GET.get("despues")),
+        **pagina,
+    }
+
+
 @login_required
 def cc_detalle(request, cuenta_id: int):
     cuenta = get_object_or_404(
@@ -972,21 +1184,150 @@ def cc_detalle(request, cuenta_id: int):
         id=cuenta_id
     )
 
-    movimientos = (cuenta.movimientos
-                   .select_related("venta")
-                   .order_by("-fecha", "-id")[:200])  # límite razonable al inicio
-
     form = PagoCCForm()
 
-    return render(request, "admin_panel/cc_detalle.html", {
-        "cuenta": cuenta,
-        "cliente": cuenta.cliente,
-        "saldo": cuenta.saldo(),  # usa tu método
-        "movimientos": movimientos,
-        "form": form,
+    return render(request, "admin_panel/cc_detalle.html", _cc_detalle_ctx(request, cuenta, form))
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: devuelve la línea en vez de escribirla."""
+
+    def write(self, value):
+        return value
+
+
+@login_required
+@lectura_reportes
+def cc_exportar(request, cuenta_id: int):
+    """
+    Estado de cuenta completo en CSV, generado en streaming (sin límite de movimientos).
+    """
+    cuenta = get_object_or_404(
+        CuentaCorriente.objects.select_related("cliente"),
+        id=cuenta_id
+    )
+    writer = csv.writer(_Echo(), delimiter=";")
+
+    def _filas():
+        yield "\ufeff"  # BOM: Excel abre el archivo como UTF-8
+        yield writer.writerow(["Fecha", "Tipo", "Venta", "Referencia", "Observación", "Debe", "Haber", "Saldo"])
+        for m in iterar_estado_cuenta(cuenta):
+            es_debito = m.tipo == MovimientoCuentaCorriente.Tipo.DEBITO
+            yield writer.writerow([
+                timezone.localtime(m.fecha).strftime("%d/%m/%Y %H:%M"),
+                m.get_tipo_display(),
+                m.venta.codigo_sucursal if m.venta_id else "",
+                m.referencia,
+                m.observacion,
+                m.monto if es_debito else "",
+                "" if es_debito else m.monto,
+                m.saldo_acumulado,
+            ])
+
+    filename = f"cuenta_corriente_{cuenta.cliente.dni}.csv"
+    resp = StreamingHttpResponse(_filas(), content_type="text/csv; charset=utf-8")
+    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return resp
+
+
+def _cc_antiguedad_sucursal(request):
+    raw = (request.GET.get("sucursal") or "").strip()
+    return int(raw) if raw.isdigit() else None
+
+
+@login_required
+@lectura_reportes
+def cc_antiguedad(request):
+    """
+    Antigüedad de saldos por cuenta (FIFO). El cálculo queda cacheado hasta el próximo movimiento.
+    """
+    sucursal_id = _cc_antiguedad_sucursal(request)
+    reporte = antiguedad_saldos(sucursal_id=sucursal_id)
+
+    return render(request, "admin_panel/cc_antiguedad.html", {
+        **reporte,
+        "sucursal": str(sucursal_id or ""),
+        "sucursales_disponibles": referencia.sucursales(solo_activas=False),
     })
 
 
+@login_required
+@lectura_reportes
+def cc_antiguedad_exportar(request):
+    sucursal_id = _cc_antiguedad_sucursal(request)
+    reporte = antiguedad_saldos(sucursal_id=sucursal_id)
+    writer = csv.writer(_Echo(), delimiter=";")
+
+    def _filas():
+        yield "\ufeff"
+        yield writer.writerow(["DNI", "Cliente", "0-30", "31-60", "61-90", "90+", "Total"])
+        for f in reporte["filas"]:
+            yield writer.writerow([f["dni"], f["cliente"], f["d0_30"], f["d31_60"], f["d61_90"], f["d90_mas"], f["total"]])
+
+    sufijo = f"_sucursal_{sucursal_id}" if sucursal_id else ""
+    resp = StreamingHttpResponse(_filas(), content_type="text/csv; charset=utf-8")
+    resp["Content-Disposition"] = f'attachment; filename="antiguedad_saldos{sufijo}.csv"'
+    return resp
+
+
+def _libro_iva_periodo(request):
+    """(año, mes) de ?mes=AAAA-MM; por defecto el mes anterior."""
+    raw = (request.GET.get("mes") or "").strip()
+    try:
+        anio, mes = (int(x) for x in raw.split("-"))
+        datetime(anio, mes, 1)
+        return anio, mes
+    except ValueError:
+        anterior = timezone.localdate().replace(day=1) - timedelta(days=1)
+        return anterior.year, anterior.month
+
+
+@login_required
+@lectura_reportes
+def libro_iva_exportar(request):
+    """
+    Libro IVA Ventas del mes (por día, sucursal y alícuota) en streaming.
+    ?mes=AAAA-MM&sucursal=<id>&formato=csv|txt
+    """
+    anio, mes = _libro_iva_periodo(request)
+    sucursal_raw = (request.GET.get("sucursal") or "").strip()
+    sucursal_id = int(sucursal_raw) if sucursal_raw.isdigit() else None
+    formato = "txt" if (request.GET.get("formato") or "").strip().lower() == "txt" else "csv"
+
+    filas = filas_libro_iva(anio, mes, sucursal_id)
+    nombre = f"libro_iva_ventas_{anio}{mes:02d}" + (f"_sucursal_{sucursal_id}" if sucursal_id else "")
+
+    if formato == "txt":
+        resp = StreamingHttpResponse((linea_txt(f) for f in filas), content_type="text/plain; charset=utf-8")
+        resp["Content-Disposition"] = f'attachment; filename="{nombre}.txt"'
+        return resp
+
+    nombres = referencia.nombres_sucursales()
+    writer = csv.writer(_Echo(), delimiter=";")
+
+    def _filas():
+        yield "\ufeff"
+        yield writer.writerow([
+            "Fecha", "Sucursal", "Alícuota IVA %", "Comprobantes",
+            "Neto gravado", "IVA", "Otros imp. nacionales", "Total",
+        ])
+        totales = {}
+        for f in filas:
+            acumular_total(totales, f)
+            yield writer.writerow([
+                f.dia.strftime("%d/%m/%Y"),
+                nombres.get(f.sucursal_id, f"#{f.sucursal_id}"),
+                f.alicuota, f.comprobantes, f.neto, f.iva, f.otros, f.total,
+            ])
+        for alicuota in sorted(totales):
+            t = totales[alicuota]
+            yield writer.writerow(["TOTAL", "", t.alicuota, t.comprobantes, t.neto, t.iva, t.otros, t.total])
+
+    resp = StreamingHttpResponse(_filas(), content_type="text/csv; charset=utf-8")
+    resp["Content-Disposition"] = f'attachment; filename="{nombre}.csv"'
+    return resp
+
+
 @login_required
 def cc_toggle_activa(request, cuenta_id: int):
     if request.method != "POST":
@@ -1009,14 +1350,7 @@ def cc_registrar_pago(request, cuenta_id: int):
     form = PagoCCForm(request.POST)
 
     if not form.is_valid():
-        movimientos = cuenta.movimientos.select_related("venta").order_by("-fecha", "-id")[:200]
-        return render(request, "admin_panel/cc_detalle.html", {
-            "cuenta": cuenta,
-            "cliente": cuenta.cliente,
-            "saldo": cuenta.saldo(),
-            "movimientos": movimientos,
-            "form": form,
-        })
+        return render(request, "admin_panel/cc_detalle.html", _cc_detalle_ctx(request, cuenta, form))
 
     MovimientoCuentaCorriente.objects.create(
         cuenta=cuenta,
@@ -1030,6 +1364,45 @@ def cc_registrar_pago(request, cuenta_id: int):
 
     messages.success(request, "Pago registrado en cuenta corriente.")
     return redirect("admin_panel:cc_detalle", cuenta_id=cuenta_id)
+
+
+@login_required
+def cc_importar_pagos(request):
+    """
+    Importa transferencias desde el CSV del banco (match por DNI o referencia).
+    Todo entra en una transacción; se muestran las filas que no se pudieron imputar.
+    """
+    resultado = None
+
+    if request.method == "POST":
+        archivo = request.FILES.get("archivo")
+        if not archivo:
+            messages.error(request, "Elegí un archivo CSV.")
+            return redirect("admin_panel:cc_importar_pagos")
+
+        raw = archivo.read()
+        try:
+            contenido = raw.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            contenido = raw.decode("latin-1")  # exportaciones de home banking en Windows
+
+        try:
+            filas = leer_csv_pagos(contenido)
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect("admin_panel:cc_importar_pagos")
+
+        observacion = (request.POST.get("observacion") or "").strip() or f"Importación {archivo.name}"
+        resultado = importar_pagos(filas, observacion=observacion[:200])
+        messages.success(
+            request,
+            f"Pagos importados: {resultado['creados']} por ${resultado['total']}. "
+            f"Sin imputar: {len(resultado['rechazados'])}. Duplicados: {resultado['duplicados']}.",
+        )
+
+    return render(request, "admin_panel/cc_importar_pagos.html", {"resultado": resultado})
+
+
 class NuevaCCForm(forms.Form):
     dni = forms.CharField(max_length=20)
     nombre = forms.CharField(max_length=80)
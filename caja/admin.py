@@ -1,6 +1,22 @@
 from django.contrib import admin
 
-from .models import CajaSesion
+from .models import CajaSesion, CajaSesionTotal, ConfirmacionVenta, FavoritoSucursal, Terminal, VentaEnEspera
+
+
+class CajaSesionTotalInline(admin.TabularInline):
+    model = CajaSesionTotal
+    extra = 0
+    can_delete = False
+    readonly_fields = ("tipo", "cantidad_pagos", "monto", "recargo")
+
+
+@admin.register(Terminal)
+class TerminalAdmin(admin.ModelAdmin):
+    list_display = ("sucursal", "numero", "nombre", "activa", "ultimo_numero_venta")
+    list_filter = ("sucursal", "activa")
+    search_fields = ("sucursal__nombre", "nombre")
+    readonly_fields = ("ultimo_numero_venta",)
+    list_select_related = ("sucursal",)
 
 
 @admin.register(CajaSesion)
@@ -8,11 +24,15 @@ class CajaSesionAdmin(admin.ModelAdmin):
     list_display = (
         "id",
         "sucursal",
+        "terminal",
         "cajero_apertura",
         "abierta_en",
         "cajero_cierre",
         "cerrada_en",
+        "ventas_cantidad",
+        "ventas_total",
     )
+    inlines = [CajaSesionTotalInline]
     list_filter = ("sucursal", "abierta_en", "cerrada_en")
     search_fields = (
         "sucursal__nombre",
@@ -20,4 +40,29 @@ class CajaSesionAdmin(admin.ModelAdmin):
         "cajero_cierre__username",
     )
     date_hierarchy = "abierta_en"
-    list_select_related = ("sucursal", "cajero_apertura", "cajero_cierre")
+    list_select_related = ("sucursal", "terminal", "cajero_apertura", "cajero_cierre")
+
+
+@admin.register(ConfirmacionVenta)
+class ConfirmacionVentaAdmin(admin.ModelAdmin):
+    list_display = ("token", "usuario", "estado", "venta", "creada_en", "actualizada_en")
+    list_filter = ("estado",)
+    search_fields = ("token", "usuario__username")
+    readonly_fields = ("token", "usuario", "estado", "venta", "mensaje", "creada_en", "actualizada_en")
+    list_select_related = ("usuario", "venta")
+
+
+@admin.register(VentaEnEspera)
+class VentaEnEsperaAdmin(admin.ModelAdmin):
+    list_display = ("id", "sucursal", "terminal", "cajero", "etiqueta", "items_cantidad", "total", "creada_en")
+    list_filter = ("sucursal",)
+    search_fields = ("etiqueta", "cajero__username")
+    list_select_related = ("sucursal", "terminal", "cajero")
+
+
+@admin.register(FavoritoSucursal)
+class FavoritoSucursalAdmin(admin.ModelAdmin):
+    list_display = ("sucursal", "posicion", "descripcion", "unidades", "calculado_en")
+    list_filter = ("sucursal",)
+    list_select_related = ("sucursal",)
+
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from caja.services import recalcular_favoritos
+from core import referencia
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula la grilla de favoritos del POS (variantes más vendidas) de cada "
+        "sucursal activa. Pensado para cron diario, fuera del horario de venta."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias",
+            type=int,
+            default=int(getattr(settings, "CAJA_FAVORITOS_DIAS", 60) or 60),
+            help="Ventana de ventas a considerar (días hacia atrás).",
+        )
+        parser.add_argument(
+            "--cantidad",
+            type=int,
+            default=int(getattr(settings, "CAJA_FAVORITOS_CANTIDAD", 24) or 24),
+            help="Teclas por sucursal.",
+        )
+        parser.add_argument("--sucursal", type=int, help="Solo esta sucursal (id).")
+
+    def handle(self, *args, **options):
+        dias = max(options["dias"], 1)
+        cantidad = max(options["cantidad"], 1)
+        sucursales = referencia.sucursales()
+        if options["sucursal"]:
+            sucursales = [s for s in sucursales if s.id == options["sucursal"]]
+
+        for sucursal in sucursales:
+            total = recalcular_favoritos(sucursal.id, dias=dias, cantidad=cantidad)
+            self.stdout.write(f"{sucursal.nombre}: {total} favoritos.")
+        self.stdout.write(self.style.SUCCESS(f"Sucursales procesadas: {len(sucursales)}."))
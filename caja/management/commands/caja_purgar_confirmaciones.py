@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from caja.services import purgar_confirmaciones
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra las claves de idempotencia del confirmar del POS más viejas que --dias "
+        "(por defecto CAJA_CONFIRMACION_RETENCION_DIAS). Pensado para cron diario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias",
+            type=int,
+            default=int(getattr(settings, "CAJA_CONFIRMACION_RETENCION_DIAS", 2) or 2),
+            help="Antigüedad mínima (en días) de las claves a borrar.",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=5000,
+            help="Filas por DELETE.",
+        )
+
+    def handle(self, *args, **options):
+        antes_de = timezone.now() - timedelta(days=max(options["dias"], 0))
+        borradas = purgar_confirmaciones(antes_de=antes_de, lote=max(options["lote"], 1))
+        self.stdout.write(self.style.SUCCESS(f"Claves borradas: {borradas}."))
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.14 on 2026-10-18 22:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cajasesion',
+            name='ventas_cantidad',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cajasesion',
+            name='ventas_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.CreateModel(
+            name='CajaSesionTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=20)),
+                ('cantidad_pagos', models.PositiveIntegerField(default=0)),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('recargo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sesion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='totales', to='caja.cajasesion')),
+            ],
+            options={
+                'verbose_name': 'Total de caja por medio de pago',
+                'verbose_name_plural': 'Totales de caja por medio de pago',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='cajasesiontotal',
+            constraint=models.UniqueConstraint(fields=('sesion', 'tipo'), name='caja_total_unico_por_sesion_tipo'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.14 on 2026-10-18 22:59
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def backfill_totales(apps, schema_editor):
+    CajaSesion = apps.get_model("caja", "CajaSesion")
+    CajaSesionTotal = apps.get_model("caja", "CajaSesionTotal")
+    Venta = apps.get_model("ventas", "Venta")
+    VentaPago = apps.get_model("ventas", "VentaPago")
+
+    ventas = (
+        Venta.objects
+        .filter(estado="CONFIRMADA", caja_sesion__isnull=False)
+        .values("caja_sesion_id")
+        .annotate(cantidad=Count("id"), total=Sum("total"))
+    )
+    for row in ventas:
+        CajaSesion.objects.filter(pk=row["caja_sesion_id"]).update(
+            ventas_cantidad=row["cantidad"] or 0,
+            ventas_total=row["total"] or Decimal("0.00"),
+        )
+
+    pagos = (
+        VentaPago.objects
+        .filter(venta__estado="CONFIRMADA", venta__caja_sesion__isnull=False)
+        .values("venta__caja_sesion_id", "tipo")
+        .annotate(cantidad=Count("id"), monto=Sum("monto"), recargo=Sum("recargo_monto"))
+    )
+    CajaSesionTotal.objects.bulk_create([
+        CajaSesionTotal(
+            sesion_id=row["venta__caja_sesion_id"],
+            tipo=row["tipo"],
+            cantidad_pagos=row["cantidad"] or 0,
+            monto=row["monto"] or Decimal("0.00"),
+            recargo=row["recargo"] or Decimal("0.00"),
+        )
+        for row in pagos
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0002_cajasesion_totales'),
+        ('ventas', '0012_alter_venta_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_totales, migrations.RunPython.noop),
+    ]
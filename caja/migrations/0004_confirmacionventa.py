@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0003_backfill_cajasesion_totales'),
+        ('ventas', '0016_backfill_ventaitem_descripcion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfirmacionVenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64, unique=True)),
+                ('estado', models.CharField(choices=[('EN_CURSO', 'En curso'), ('OK', 'Confirmada'), ('ERROR', 'Error')], default='EN_CURSO', max_length=10)),
+                ('mensaje', models.CharField(blank=True, max_length=255)),
+                ('creada_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actualizada_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='confirmaciones_pos', to=settings.AUTH_USER_MODEL)),
+                ('venta', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='ventas.venta')),
+            ],
+            options={
+                'verbose_name': 'Confirmación de venta (idempotencia)',
+                'verbose_name_plural': 'Confirmaciones de venta (idempotencia)',
+                'indexes': [models.Index(fields=['creada_en'], name='caja_confir_creada__e5f637_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def crear_terminales(apps, schema_editor):
+    """Una Caja 1 por sucursal; las sesiones existentes quedan en ella."""
+    Sucursal = apps.get_model("core", "Sucursal")
+    Terminal = apps.get_model("caja", "Terminal")
+    CajaSesion = apps.get_model("caja", "CajaSesion")
+
+    for sucursal_id in Sucursal.objects.values_list("id", flat=True):
+        terminal, _ = Terminal.objects.get_or_create(sucursal_id=sucursal_id, numero=1)
+        CajaSesion.objects.filter(sucursal_id=sucursal_id, terminal__isnull=True).update(terminal=terminal)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0004_confirmacionventa'),
+        ('core', '0002_appsetting'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Terminal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.PositiveSmallIntegerField(default=1)),
+                ('nombre', models.CharField(blank=True, default='', max_length=60)),
+                ('activa', models.BooleanField(default=True)),
+                ('ultimo_numero_venta', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Terminal (punto de venta)',
+                'verbose_name_plural': 'Terminales (puntos de venta)',
+                'ordering': ['sucursal', 'numero'],
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='cajasesion',
+            name='caja_unica_abierta_por_sucursal',
+        ),
+        migrations.AddField(
+            model_name='terminal',
+            name='sucursal',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='terminales', to='core.sucursal'),
+        ),
+        migrations.AddField(
+            model_name='cajasesion',
+            name='terminal',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='sesiones', to='caja.terminal'),
+        ),
+        migrations.RunPython(crear_terminales, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cajasesion',
+            index=models.Index(fields=['terminal', 'cerrada_en'], name='caja_cajase_termina_c93035_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cajasesion',
+            constraint=models.UniqueConstraint(condition=models.Q(('cerrada_en__isnull', True)), fields=('terminal',), name='caja_unica_abierta_por_terminal'),
+        ),
+        migrations.AddConstraint(
+            model_name='terminal',
+            constraint=models.UniqueConstraint(fields=('sucursal', 'numero'), name='terminal_numero_unico_por_sucursal'),
+        ),
+    ]
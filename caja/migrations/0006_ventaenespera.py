@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0005_terminales'),
+        ('core', '0002_appsetting'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaEnEspera',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('etiqueta', models.CharField(blank=True, default='', max_length=60)),
+                ('carrito', models.JSONField(blank=True, default=list)),
+                ('pagos', models.JSONField(blank=True, default=list)),
+                ('items_cantidad', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('creada_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cajero', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_en_espera', to=settings.AUTH_USER_MODEL)),
+                ('sucursal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.sucursal')),
+                ('terminal', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='caja.terminal')),
+            ],
+            options={
+                'verbose_name': 'Venta en espera',
+                'verbose_name_plural': 'Ventas en espera',
+                'ordering': ['creada_en'],
+                'indexes': [models.Index(fields=['cajero', 'sucursal', 'creada_en'], name='caja_ventae_cajero__2e77ee_idx')],
+            },
+        ),
+    ]
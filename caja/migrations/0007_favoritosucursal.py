@@ -0,0 +1,38 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0006_ventaenespera'),
+        ('catalogo', '0004_backfill_stock_bajo_minimo'),
+        ('core', '0002_appsetting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FavoritoSucursal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posicion', models.PositiveSmallIntegerField()),
+                ('descripcion', models.CharField(blank=True, max_length=255)),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('calculado_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sucursal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.sucursal')),
+                ('variante', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalogo.variante')),
+            ],
+            options={
+                'verbose_name': 'Favorito del POS',
+                'verbose_name_plural': 'Favoritos del POS',
+                'ordering': ['sucursal', 'posicion'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='favoritosucursal',
+            constraint=models.UniqueConstraint(fields=('sucursal', 'posicion'), name='favorito_posicion_unica_por_sucursal'),
+        ),
+    ]
@@ -6,12 +6,56 @@ from django.utils import timezone
 from core.models import Sucursal
 
 
+class Terminal(models.Model):
+    """
+    Punto de venta (caja física) de una sucursal.
+
+    Cada terminal tiene su propia sesión de caja, su correlativo de ventas y su
+    fila para bloquear: varias cajas de la misma sucursal venden en paralelo
+    sin esperarse entre sí.
+    """
+    sucursal = models.ForeignKey(
+        Sucursal,
+        on_delete=models.PROTECT,
+        related_name="terminales",
+    )
+    # Número de punto de venta dentro de la sucursal (0001 en el código de la venta).
+    numero = models.PositiveSmallIntegerField(default=1)
+    nombre = models.CharField(max_length=60, blank=True, default="")
+    activa = models.BooleanField(default=True)
+
+    # Último número de venta asignado en este terminal (solo se incrementa con F()).
+    ultimo_numero_venta = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Terminal (punto de venta)"
+        verbose_name_plural = "Terminales (puntos de venta)"
+        ordering = ["sucursal", "numero"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sucursal", "numero"],
+                name="terminal_numero_unico_por_sucursal",
+            )
+        ]
+
+    def __str__(self):
+        return self.nombre or f"Caja {self.numero}"
+
+
 class CajaSesion(models.Model):
     sucursal = models.ForeignKey(
         Sucursal,
         on_delete=models.PROTECT,
         related_name="cajas_sesiones",
     )
+    # Null solo en sesiones previas a los terminales (la migración las asigna a la Caja 1).
+    terminal = models.ForeignKey(
+        Terminal,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="sesiones",
+    )
     cajero_apertura = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.PROTECT,
@@ -28,19 +72,24 @@ class CajaSesion(models.Model):
     )
     cerrada_en = models.DateTimeField(null=True, blank=True)
 
+    # Acumulados de la sesión (se actualizan en cada venta confirmada).
+    ventas_cantidad = models.PositiveIntegerField(default=0)
+    ventas_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
     class Meta:
         verbose_name = "Sesión de caja"
         verbose_name_plural = "Sesiones de caja"
         ordering = ["-abierta_en"]
         constraints = [
             models.UniqueConstraint(
-                fields=["sucursal"],
+                fields=["terminal"],
                 condition=Q(cerrada_en__isnull=True),
-                name="caja_unica_abierta_por_sucursal",
+                name="caja_unica_abierta_por_terminal",
             )
         ]
         indexes = [
             models.Index(fields=["sucursal", "abierta_en"]),
+            models.Index(fields=["terminal", "cerrada_en"]),
             models.Index(fields=["cajero_apertura", "abierta_en"]),
         ]
 
@@ -56,4 +105,164 @@ class CajaSesion(models.Model):
 
     def __str__(self):
         estado = "Abierta" if self.esta_abierta else "Cerrada"
-        return f"Caja {self.sucursal} - {self.cajero_apertura} - {estado}"
+        caja = f"{self.sucursal} / {self.terminal}" if self.terminal_id else f"{self.sucursal}"
+        return f"Caja {caja} - {self.cajero_apertura} - {estado}"
+
+
+class CajaSesionTotal(models.Model):
+    """
+    Total acumulado de una sesión de caja por medio de pago.
+    Una fila por (sesión, tipo de pago); se incrementa al confirmar cada venta.
+    """
+    sesion = models.ForeignKey(
+        CajaSesion,
+        on_delete=models.CASCADE,
+        related_name="totales",
+    )
+    # Mismos códigos que VentaPago.Tipo (CONTADO, DEBITO, CREDITO, ...).
+    tipo = models.CharField(max_length=20)
+
+    cantidad_pagos = models.PositiveIntegerField(default=0)
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    recargo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Total de caja por medio de pago"
+        verbose_name_plural = "Totales de caja por medio de pago"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sesion", "tipo"],
+                name="caja_total_unico_por_sesion_tipo",
+            )
+        ]
+
+    @property
+    def total(self):
+        return (self.monto or 0) + (self.recargo or 0)
+
+    def __str__(self):
+        return f"{self.sesion_id} - {self.tipo}: {self.total}"
+
+
+class ConfirmacionVenta(models.Model):
+    """
+    Clave de idempotencia del confirmar del POS (el confirm_token del form).
+
+    Se reclama antes de la transacción de la venta y se marca OK dentro de
+    ella, junto con la venta creada. Un reintento con el mismo token devuelve
+    el resultado original sin volver a validar ni bloquear nada.
+    """
+
+    class Estado(models.TextChoices):
+        EN_CURSO = "EN_CURSO", "En curso"
+        OK = "OK", "Confirmada"
+        ERROR = "ERROR", "Error"
+
+    token = models.CharField(max_length=64, unique=True)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="confirmaciones_pos",
+    )
+    estado = models.CharField(max_length=10, choices=Estado.choices, default=Estado.EN_CURSO)
+    venta = models.ForeignKey(
+        "ventas.Venta",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    mensaje = models.CharField(max_length=255, blank=True)
+
+    creada_en = models.DateTimeField(default=timezone.now)
+    actualizada_en = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Confirmación de venta (idempotencia)"
+        verbose_name_plural = "Confirmaciones de venta (idempotencia)"
+        indexes = [models.Index(fields=["creada_en"])]
+
+    def __str__(self):
+        return f"{self.token} - {self.estado}"
+
+
+class VentaEnEspera(models.Model):
+    """
+    Carrito suspendido del POS (el cliente volvió al probador): carrito y pagos
+    de la sesión guardados en forma compacta para retomarlos con un click.
+    Al retomar se borra la fila y se revalidan precios y stock.
+    """
+    cajero = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="ventas_en_espera",
+    )
+    sucursal = models.ForeignKey(
+        Sucursal,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    terminal = models.ForeignKey(
+        Terminal,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    etiqueta = models.CharField(max_length=60, blank=True, default="")
+
+    # [[variante_id, cantidad, "precio", "precio de lista al suspender"], ...]
+    carrito = models.JSONField(default=list, blank=True)
+    # Filas de pagos de la sesión, tal cual (dicts de strings).
+    pagos = models.JSONField(default=list, blank=True)
+
+    items_cantidad = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    creada_en = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Venta en espera"
+        verbose_name_plural = "Ventas en espera"
+        ordering = ["creada_en"]
+        indexes = [models.Index(fields=["cajero", "sucursal", "creada_en"])]
+
+    def __str__(self):
+        return f"{self.etiqueta or 'En espera'} - {self.cajero} - {self.total}"
+
+
+class FavoritoSucursal(models.Model):
+    """
+    Variante más vendida de una sucursal, para la grilla de teclas rápidas del
+    POS. Las filas las rearma en lote `caja_favoritos` (cron) con las ventas
+    recientes; el POS solo las lee, con precio y stock vigentes.
+    """
+    sucursal = models.ForeignKey(
+        Sucursal,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    variante = models.ForeignKey(
+        "catalogo.Variante",
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_constraint=False,
+    )
+    posicion = models.PositiveSmallIntegerField()
+    # Snapshot de VentaItem.descripcion (el POS no consulta atributos).
+    descripcion = models.CharField(max_length=255, blank=True)
+    unidades = models.PositiveIntegerField(default=0)
+    calculado_en = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Favorito del POS"
+        verbose_name_plural = "Favoritos del POS"
+        ordering = ["sucursal", "posicion"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sucursal", "posicion"],
+                name="favorito_posicion_unica_por_sucursal",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.sucursal_id} #{self.posicion} - {self.descripcion}"
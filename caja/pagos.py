@@ -0,0 +1,249 @@
+"""
+Motor de pagos del POS (modal de pagos, card, carrito y confirmar).
+
+Los pagos viven en la sesión como dicts de strings. Acá se parsean una sola vez
+a filas tipadas con enteros (centavos y centésimos de punto) y un único cálculo
+arma las filas de la UI, los recargos y los totales. Los datos de clientes de
+cuenta corriente salen de una sola consulta (`cargar_clientes_cc`).
+
+El redondeo replica al de antes (Decimal.quantize con el contexto por defecto,
+ROUND_HALF_EVEN), así que los montos no cambian.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+
+TIPO_CREDITO = "CREDITO"
+TIPO_CUENTA_CORRIENTE = "CUENTA_CORRIENTE"
+
+_CENTAVO = Decimal("0.01")
+
+
+# ======================================================================
+# Enteros <-> Decimal
+# ======================================================================
+
+def a_centavos(valor):
+    """'123.45' -> 12345; None si no es un número."""
+    try:
+        return int(Decimal(str(valor)).quantize(_CENTAVO).scaleb(2))
+    except (InvalidOperation, ValueError, TypeError):
+        return None
+
+
+def a_decimal(centavos: int) -> Decimal:
+    """12345 -> Decimal('123.45') (siempre con dos decimales)."""
+    return Decimal(int(centavos)).scaleb(-2)
+
+
+def dividir_redondeado(numerador: int, divisor: int) -> int:
+    """División entera con redondeo al par (igual que quantize por defecto)."""
+    signo = -1 if (numerador < 0) != (divisor < 0) else 1
+    cociente, resto = divmod(abs(numerador), abs(divisor))
+    doble = 2 * resto
+    if doble > abs(divisor) or (doble == abs(divisor) and cociente % 2):
+        cociente += 1
+    return signo * cociente
+
+
+def recargo_centavos(monto: int, recargo_pct: int) -> int:
+    """Recargo en centavos; recargo_pct en centésimos de punto (12,50 % -> 1250)."""
+    return dividir_redondeado(monto * recargo_pct, 10000)
+
+
+# ======================================================================
+# Filas
+# ======================================================================
+
+@dataclass(frozen=True)
+class FilaPago:
+    tipo: str
+    monto: int                  # centavos
+    cuotas: int
+    recargo_pct: int            # centésimos de punto
+    recargo: int                # centavos
+    plan_id: str = ""
+    cc_cliente_id: int | None = None
+    monto_valido: bool = True
+
+    @property
+    def es_credito(self) -> bool:
+        return self.tipo == TIPO_CREDITO
+
+    @property
+    def total(self) -> int:
+        return self.monto + self.recargo
+
+    @property
+    def cobrado(self) -> int:
+        """Lo que entra a caja: monto (+ recargo si es crédito); 0 si no tiene monto."""
+        if self.monto <= 0:
+            return 0
+        return self.total if self.es_credito else self.monto
+
+    @property
+    def cuota(self) -> int:
+        return dividir_redondeado(self.total, max(self.cuotas, 1))
+
+    @property
+    def coeficiente(self) -> Decimal:
+        return Decimal(10000 + self.recargo_pct).scaleb(-4)
+
+
+def parsear_fila(p: dict) -> FilaPago:
+    monto = a_centavos(p.get("monto", "0") or "0")
+
+    try:
+        cuotas = int(p.get("cuotas") or 1)
+    except (TypeError, ValueError):
+        cuotas = 1
+
+    recargo_pct = a_centavos(p.get("recargo_pct") or "0") or 0
+
+    cc_raw = str(p.get("cc_cliente_id") or "").strip()
+    return FilaPago(
+        tipo=(p.get("tipo") or "").strip(),
+        monto=monto or 0,
+        cuotas=cuotas,
+        recargo_pct=recargo_pct,
+        recargo=recargo_centavos(monto or 0, recargo_pct),
+        plan_id=(p.get("plan_id") or "").strip(),
+        cc_cliente_id=int(cc_raw) if cc_raw.isdigit() else None,
+        monto_valido=monto is not None,
+    )
+
+
+def ids_clientes_cc(filas) -> list:
+    return sorted({f.cc_cliente_id for f in filas if f.tipo == TIPO_CUENTA_CORRIENTE and f.cc_cliente_id})
+
+
+# ======================================================================
+# Clientes de cuenta corriente (una consulta)
+# ======================================================================
+
+@dataclass(frozen=True)
+class ClienteCC:
+    id: int
+    activo: bool
+    apellido: str
+    nombre: str
+    dni: str
+    cuenta_activa: bool = False
+    saldo: Decimal | None = None
+
+    @property
+    def etiqueta(self) -> str:
+        return f"{self.apellido}, {self.nombre}"
+
+    @property
+    def referencia(self) -> str:
+        """Lo que queda en VentaPago.referencia: 'Apellido, Nombre - DNI'."""
+        return f"{self.apellido}, {self.nombre} - {self.dni}"
+
+
+def cargar_clientes_cc(ids) -> dict:
+    """{cliente_id: ClienteCC} con la cuenta (saldo materializado) en el mismo query."""
+    from cuentas_corrientes.models import Cliente
+
+    ids = sorted({int(i) for i in ids if i})
+    if not ids:
+        return {}
+    filas = Cliente.objects.filter(id__in=ids).values_list(
+        "id", "activo", "apellido", "nombre", "dni",
+        "cuenta_corriente__activa", "cuenta_corriente__saldo",
+    )
+    return {
+        cid: ClienteCC(
+            id=cid,
+            activo=bool(activo),
+            apellido=apellido,
+            nombre=nombre,
+            dni=dni,
+            cuenta_activa=bool(cuenta_activa),
+            saldo=Decimal(saldo).quantize(_CENTAVO) if cuenta_activa and saldo is not None else None,
+        )
+        for cid, activo, apellido, nombre, dni, cuenta_activa, saldo in filas
+    }
+
+
+# ======================================================================
+# Cálculo
+# ======================================================================
+
+@dataclass
+class ResultadoPagos:
+    filas: list          # FilaPago, mismo orden que la sesión
+    ui: list             # dicts para los templates
+    total_base: int      # centavos
+    recargos: int
+    pagado: int
+    clientes: dict
+
+    @property
+    def base_cargada(self) -> int:
+        return sum(f.monto for f in self.filas if f.monto > 0)
+
+    @property
+    def total_cobrar(self) -> int:
+        return self.total_base + self.recargos
+
+    @property
+    def saldo(self) -> int:
+        return self.total_cobrar - self.pagado
+
+    def contexto(self) -> dict:
+        return {
+            "ui_payments": self.ui,
+            "recargos": a_decimal(self.recargos),
+            "total_cobrar": a_decimal(self.total_cobrar),
+            "pagado": a_decimal(self.pagado),
+            "saldo": a_decimal(self.saldo),
+        }
+
+
+def _fila_ui(p: dict, fila: FilaPago, clientes: dict) -> dict:
+    p_ui = dict(p)
+    p_ui.update(
+        monto=str(a_decimal(fila.monto)),
+        cuotas=fila.cuotas,
+        recargo_pct=str(a_decimal(fila.recargo_pct)),
+        recargo_monto_calc=a_decimal(fila.recargo),
+        total_tarjeta_calc=a_decimal(fila.total),
+        cuota_calc=a_decimal(fila.cuota),
+        tipo_locked=fila.monto > 0,
+        selected_plan_id=fila.plan_id,
+        cc_q=(p.get("cc_q") or "").strip(),
+        cc_cliente_nombre="",
+        cc_cliente_dni="",
+        cc_ok=False,
+        cc_saldo=None,
+    )
+
+    cliente = clientes.get(fila.cc_cliente_id) if fila.tipo == TIPO_CUENTA_CORRIENTE else None
+    if cliente is not None:
+        if cliente.activo:
+            p_ui["cc_cliente_nombre"] = cliente.etiqueta
+            p_ui["cc_cliente_dni"] = cliente.dni
+        if cliente.cuenta_activa:
+            p_ui["cc_ok"] = True
+            p_ui["cc_saldo"] = cliente.saldo
+    return p_ui
+
+
+def calcular_pagos(payments: list, total_base, *, buscar_clientes=cargar_clientes_cc) -> ResultadoPagos:
+    """
+    Filas UI + totales de los pagos de la sesión. `buscar_clientes(ids)` carga
+    los clientes CC de todas las filas de una vez (la vista lo memoriza por request).
+    """
+    payments = payments or []
+    filas = [parsear_fila(p) for p in payments]
+    clientes = buscar_clientes(ids_clientes_cc(filas))
+
+    return ResultadoPagos(
+        filas=filas,
+        ui=[_fila_ui(p, fila, clientes) for p, fila in zip(payments, filas)],
+        total_base=a_centavos(total_base) or 0,
+        recargos=sum(f.recargo for f in filas if f.es_credito and f.monto > 0),
+        pagado=sum(f.cobrado for f in filas),
+        clientes=clientes,
+    )
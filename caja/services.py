@@ -0,0 +1,343 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from catalogo.models import StockSucursal, Variante
+from ventas.models import Venta, VentaItem, VentaPago
+from .models import CajaSesion, CajaSesionTotal, ConfirmacionVenta, FavoritoSucursal, Terminal, VentaEnEspera
+
+
+# Orden fijo para el arqueo (el mismo que ve el cajero en el POS).
+ORDEN_TIPOS_PAGO = [
+    VentaPago.Tipo.CONTADO,
+    VentaPago.Tipo.DEBITO,
+    VentaPago.Tipo.CREDITO,
+    VentaPago.Tipo.TRANSFERENCIA,
+    VentaPago.Tipo.QR,
+    VentaPago.Tipo.CUENTA_CORRIENTE,
+]
+
+
+def _acumular_pagos(pagos) -> dict:
+    acumulado = {}
+    for p in pagos:
+        tipo = str(p.tipo)
+        row = acumulado.setdefault(tipo, {"cantidad": 0, "monto": Decimal("0.00"), "recargo": Decimal("0.00")})
+        row["cantidad"] += 1
+        row["monto"] += Decimal(p.monto or 0)
+        row["recargo"] += Decimal(p.recargo_monto or 0)
+    return acumulado
+
+
+@transaction.atomic
+def registrar_venta_en_caja(venta) -> None:
+    """
+    Suma una venta confirmada a los acumulados de su sesión de caja.
+
+    Se llama dentro de la misma transacción que confirma la venta, con la
+    sesión ya bloqueada (select_for_update), así que los incrementos con F()
+    no compiten con otro cobro de la misma caja.
+    """
+    if not venta.caja_sesion_id:
+        return
+
+    CajaSesion.objects.filter(pk=venta.caja_sesion_id).update(
+        ventas_cantidad=F("ventas_cantidad") + 1,
+        ventas_total=F("ventas_total") + Decimal(venta.total or 0),
+    )
+
+    for tipo, row in _acumular_pagos(venta.pagos.all()).items():
+        actualizados = (
+            CajaSesionTotal.objects
+            .filter(sesion_id=venta.caja_sesion_id, tipo=tipo)
+            .update(
+                cantidad_pagos=F("cantidad_pagos") + row["cantidad"],
+                monto=F("monto") + row["monto"],
+                recargo=F("recargo") + row["recargo"],
+            )
+        )
+        if not actualizados:
+            CajaSesionTotal.objects.create(
+                sesion_id=venta.caja_sesion_id,
+                tipo=tipo,
+                cantidad_pagos=row["cantidad"],
+                monto=row["monto"],
+                recargo=row["recargo"],
+            )
+
+
+def resumen_caja(sesion: CajaSesion) -> dict:
+    """
+    Estado de caja para el arqueo: lee las filas acumuladas, sin recorrer ventas.
+    """
+    labels = dict(VentaPago.Tipo.choices)
+    filas = {t.tipo: t for t in CajaSesionTotal.objects.filter(sesion=sesion)}
+
+    orden = [str(t) for t in ORDEN_TIPOS_PAGO]
+    orden += sorted(t for t in filas if t not in orden)
+
+    medios = []
+    for tipo in orden:
+        fila = filas.get(tipo)
+        if fila is None:
+            continue
+        medios.append({
+            "tipo": tipo,
+            "label": labels.get(tipo, tipo),
+            "cantidad": int(fila.cantidad_pagos or 0),
+            "monto": Decimal(fila.monto or 0).quantize(Decimal("0.01")),
+            "recargo": Decimal(fila.recargo or 0).quantize(Decimal("0.01")),
+            "total": Decimal(fila.total or 0).quantize(Decimal("0.01")),
+        })
+
+    return {
+        "cantidad": int(sesion.ventas_cantidad or 0),
+        "total": Decimal(sesion.ventas_total or 0).quantize(Decimal("0.01")),
+        "medios": medios,
+    }
+
+
+# ======================================================================
+# Terminales
+# ======================================================================
+
+def terminales_sucursal(sucursal) -> list:
+    """
+    Terminales activas de la sucursal. Una sucursal sin ninguna (recién creada)
+    arranca con la Caja 1.
+    """
+    terminales = list(Terminal.objects.filter(sucursal=sucursal, activa=True).order_by("numero"))
+    if not terminales and not Terminal.objects.filter(sucursal=sucursal).exists():
+        terminal, _ = Terminal.objects.get_or_create(sucursal=sucursal, numero=1)
+        terminales = [terminal]
+    return terminales
+
+
+def sesiones_abiertas_por_terminal(terminales) -> dict:
+    """{terminal_id: CajaSesion abierta} en una consulta (para el selector del POS)."""
+    ids = [t.id for t in terminales]
+    if not ids:
+        return {}
+    qs = CajaSesion.objects.select_related("cajero_apertura").filter(terminal_id__in=ids, cerrada_en__isnull=True)
+    return {s.terminal_id: s for s in qs}
+
+
+# ======================================================================
+# Ventas en espera
+# ======================================================================
+
+def ventas_en_espera(user, sucursal) -> list:
+    return list(VentaEnEspera.objects.filter(cajero=user, sucursal=sucursal).order_by("creada_en"))
+
+
+def poner_en_espera(*, user, sucursal, terminal, cart: dict, payments: list, etiqueta: str = "") -> VentaEnEspera:
+    """
+    Guarda el carrito y los pagos de la sesión como una venta en espera.
+    Con cada línea va el precio de lista del momento, para saber al retomar
+    si el precio lo había cambiado el cajero.
+    """
+    filas = []
+    for vid, item in (cart or {}).items():
+        try:
+            filas.append((int(vid), int(item.get("qty") or 0), Decimal(str(item.get("precio") or "0")).quantize(Decimal("0.01"))))
+        except (TypeError, ValueError, ArithmeticError):
+            continue
+    filas = [f for f in filas if f[1] > 0]
+    if not filas:
+        raise ValidationError("El carrito está vacío: no hay nada para poner en espera.")
+
+    maximo = int(getattr(settings, "CAJA_ESPERA_MAX", 10) or 10)
+    if VentaEnEspera.objects.filter(cajero=user, sucursal=sucursal).count() >= maximo:
+        raise ValidationError(f"Ya tenés {maximo} ventas en espera. Retomá o descartá alguna.")
+
+    listas = dict(Variante.objects.filter(id__in=[f[0] for f in filas]).values_list("id", "precio"))
+    return VentaEnEspera.objects.create(
+        cajero=user,
+        sucursal=sucursal,
+        terminal=terminal,
+        etiqueta=(etiqueta or "").strip()[:60],
+        carrito=[[vid, qty, str(precio), str(listas.get(vid, precio))] for vid, qty, precio in filas],
+        pagos=list(payments or []),
+        items_cantidad=sum(qty for _, qty, _ in filas),
+        total=sum((precio * qty for _, qty, precio in filas), Decimal("0.00")),
+    )
+
+
+def retomar_venta_en_espera(espera_id, *, user, sucursal, permitir_sin_stock: bool, permitir_cambiar_precio: bool):
+    """
+    Saca la venta de espera y devuelve (carrito, pagos, ajustes) listos para la sesión.
+
+    La fila se borra al reclamarla (un doble click no la retoma dos veces).
+    Precio de lista, estado y stock de todas las variantes salen de una sola
+    consulta: un precio que no cambió el cajero pasa al de lista vigente y la
+    cantidad se ajusta al stock. `ajustes` lista cada cambio como
+    {"sku", "motivo": inactiva|precio|stock|sin_stock, "antes", "ahora"}.
+    """
+    espera = VentaEnEspera.objects.filter(pk=espera_id, cajero=user, sucursal=sucursal).first()
+    if espera is None or not VentaEnEspera.objects.filter(pk=espera.pk).delete()[0]:
+        raise ValidationError("Esa venta en espera ya no existe (puede que ya se haya retomado).")
+
+    stock = StockSucursal.objects.filter(sucursal=sucursal, variante=OuterRef("pk")).values("cantidad")[:1]
+    vigentes = {
+        vid: (sku, precio, disponible)
+        for vid, sku, precio, disponible in (
+            Variante.objects
+            .filter(id__in=[fila[0] for fila in espera.carrito], activo=True)
+            .annotate(disponible=Subquery(stock))
+            .values_list("id", "sku", "precio", "disponible")
+        )
+    }
+
+    cart, ajustes = {}, []
+    for vid, qty, precio, lista in espera.carrito:
+        vigente = vigentes.get(vid)
+        if vigente is None:
+            ajustes.append({"sku": f"#{vid}", "motivo": "inactiva", "antes": qty, "ahora": 0})
+            continue
+        sku, lista_vigente, disponible = vigente
+
+        precio = Decimal(precio)
+        manual = permitir_cambiar_precio and precio != Decimal(lista)
+        if not manual and precio != lista_vigente:
+            ajustes.append({"sku": sku, "motivo": "precio", "antes": precio, "ahora": lista_vigente})
+            precio = lista_vigente
+
+        if not permitir_sin_stock:
+            disponible = int(disponible or 0)
+            if disponible <= 0:
+                ajustes.append({"sku": sku, "motivo": "sin_stock", "antes": qty, "ahora": 0})
+                continue
+            if qty > disponible:
+                ajustes.append({"sku": sku, "motivo": "stock", "antes": qty, "ahora": disponible})
+                qty = disponible
+
+        cart[str(vid)] = {"qty": qty, "precio": str(precio)}
+
+    return cart, list(espera.pagos or []), ajustes
+
+
+# ======================================================================
+# Favoritos (teclas rápidas del POS)
+# ======================================================================
+
+def recalcular_favoritos(sucursal_id: int, *, dias: int, cantidad: int) -> int:
+    """
+    Rearma la grilla de la sucursal con las variantes activas más vendidas en
+    los últimos `dias` (unidades de ventas confirmadas). Devuelve cuántas quedaron.
+    """
+    desde = timezone.now() - timedelta(days=dias)
+    ranking = list(
+        VentaItem.objects
+        .filter(
+            venta__estado=Venta.Estado.CONFIRMADA,
+            venta__sucursal_id=sucursal_id,
+            venta__fecha__gte=desde,
+            variante__activo=True,
+        )
+        .values("variante_id")
+        .annotate(unidades=Sum("cantidad"), descripcion=Max("descripcion"))
+        .order_by("-unidades", "variante_id")[:cantidad]
+    )
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        FavoritoSucursal.objects.filter(sucursal_id=sucursal_id).delete()
+        FavoritoSucursal.objects.bulk_create([
+            FavoritoSucursal(
+                sucursal_id=sucursal_id,
+                variante_id=fila["variante_id"],
+                posicion=posicion,
+                descripcion=(fila["descripcion"] or "")[:255],
+                unidades=int(fila["unidades"] or 0),
+                calculado_en=ahora,
+            )
+            for posicion, fila in enumerate(ranking, start=1)
+        ])
+    return len(ranking)
+
+
+def favoritos_pos(sucursal) -> list:
+    """Grilla del POS con precio (variante) y stock vigentes, en una consulta."""
+    stock = StockSucursal.objects.filter(sucursal=sucursal, variante=OuterRef("variante_id")).values("cantidad")[:1]
+    return list(
+        FavoritoSucursal.objects
+        .filter(sucursal=sucursal, variante__activo=True)
+        .select_related("variante")
+        .annotate(stock=Coalesce(Subquery(stock), 0))
+        .order_by("posicion")
+    )
+
+
+# ======================================================================
+# Idempotencia del confirmar
+# ======================================================================
+
+def reclamar_confirmacion(token: str, usuario):
+    """
+    Reserva el token para confirmar una venta. Devuelve (confirmacion, reclamada).
+
+    reclamada=False: el token ya existe y no se puede reusar (OK -> reenviar el
+    resultado; EN_CURSO -> otro request lo está procesando). Un token en ERROR,
+    o EN_CURSO colgado (worker reiniciado), se puede volver a reclamar.
+    """
+    ahora = timezone.now()
+    try:
+        with transaction.atomic():
+            return ConfirmacionVenta.objects.create(token=token, usuario=usuario, creada_en=ahora, actualizada_en=ahora), True
+    except IntegrityError:
+        conf = ConfirmacionVenta.objects.get(token=token)
+
+    timeout = int(getattr(settings, "CAJA_CONFIRMACION_TIMEOUT", 120) or 120)
+    reintentable = conf.estado == ConfirmacionVenta.Estado.ERROR or (
+        conf.estado == ConfirmacionVenta.Estado.EN_CURSO
+        and conf.actualizada_en < ahora - timedelta(seconds=timeout)
+    )
+    if not reintentable or conf.usuario_id != usuario.id:
+        return conf, False
+
+    # Reclamo condicional: solo un request gana el reintento.
+    tomada = (
+        ConfirmacionVenta.objects
+        .filter(pk=conf.pk, estado=conf.estado, actualizada_en=conf.actualizada_en)
+        .update(estado=ConfirmacionVenta.Estado.EN_CURSO, mensaje="", actualizada_en=ahora)
+    )
+    conf.refresh_from_db()
+    return conf, bool(tomada)
+
+
+def marcar_confirmacion_ok(conf: ConfirmacionVenta, venta) -> None:
+    """Llamar dentro de la transacción de la venta: se commitea (o no) junto con ella."""
+    ConfirmacionVenta.objects.filter(pk=conf.pk).update(
+        estado=ConfirmacionVenta.Estado.OK,
+        venta=venta,
+        actualizada_en=timezone.now(),
+    )
+
+
+def marcar_confirmacion_error(conf: ConfirmacionVenta, mensaje: str) -> None:
+    ConfirmacionVenta.objects.filter(pk=conf.pk).update(
+        estado=ConfirmacionVenta.Estado.ERROR,
+        mensaje=(mensaje or "")[:255],
+        actualizada_en=timezone.now(),
+    )
+
+
+def purgar_confirmaciones(*, antes_de, lote: int = 5000) -> int:
+    """Borra claves viejas por lotes de PK (borrados cortos, sin bloquear la tabla)."""
+    borradas = 0
+    while True:
+        ids = list(
+            ConfirmacionVenta.objects
+            .filter(creada_en__lt=antes_de)
+            .order_by("id")
+            .values_list("id", flat=True)[:lote]
+        )
+        if not ids:
+            return borradas
+        borradas += ConfirmacionVenta.objects.filter(id__in=ids).delete()[0]
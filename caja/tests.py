@@ -1,3 +1,315 @@
-from django.test import TestCase
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from caja import pagos
+from admin_panel.models import UsuarioPerfil
+from caja.models import CajaSesion, CajaSesionTotal, ConfirmacionVenta, FavoritoSucursal, Terminal, VentaEnEspera
+from caja.services import (
+    favoritos_pos,
+    marcar_confirmacion_error,
+    purgar_confirmaciones,
+    reclamar_confirmacion,
+    registrar_venta_en_caja,
+    resumen_caja,
+)
+from catalogo.models import Producto, StockSucursal, Variante
+from core.models import Sucursal
+from cuentas_corrientes.models import Cliente, CuentaCorriente
+from ventas.models import Venta, VentaItem, VentaPago
+from ventas.services import confirmar_venta
+
+
+class CajaTotalesTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("cajero", password="x")
+        self.sucursal = Sucursal.objects.create(nombre="Centro")
+        self.sesion = CajaSesion.objects.create(sucursal=self.sucursal, cajero_apertura=self.user)
+
+    def _venta(self, total, pagos):
+        venta = Venta.objects.create(
+            sucursal=self.sucursal,
+            caja_sesion=self.sesion,
+            cajero=self.user,
+            estado=Venta.Estado.CONFIRMADA,
+            total=Decimal(total),
+        )
+        for tipo, monto, recargo in pagos:
+            VentaPago.objects.create(venta=venta, tipo=tipo, monto=Decimal(monto), recargo_monto=Decimal(recargo))
+        return venta
+
+    def test_acumula_por_medio_de_pago(self):
+        registrar_venta_en_caja(self._venta("110.00", [("CONTADO", "50.00", "0"), ("CREDITO", "50.00", "10.00")]))
+        registrar_venta_en_caja(self._venta("30.00", [("CONTADO", "30.00", "0")]))
+
+        self.sesion.refresh_from_db()
+        resumen = resumen_caja(self.sesion)
+
+        self.assertEqual(resumen["cantidad"], 2)
+        self.assertEqual(resumen["total"], Decimal("140.00"))
+        self.assertEqual(CajaSesionTotal.objects.filter(sesion=self.sesion).count(), 2)
+
+        medios = {m["tipo"]: m for m in resumen["medios"]}
+        self.assertEqual(medios["CONTADO"]["total"], Decimal("80.00"))
+        self.assertEqual(medios["CONTADO"]["cantidad"], 2)
+        self.assertEqual(medios["CREDITO"]["recargo"], Decimal("10.00"))
+        self.assertEqual(medios["CREDITO"]["total"], Decimal("60.00"))
+
+
+class TicketTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser("admin", "admin@example.com", "x")
+        self.client.force_login(self.user)
+        self.venta = Venta.objects.create(
+            sucursal=Sucursal.objects.create(nombre="Centro"),
+            cajero=self.user,
+            estado=Venta.Estado.CONFIRMADA,
+            numero_sucursal=7,
+            total=Decimal("100.00"),
+        )
+        VentaPago.objects.create(venta=self.venta, tipo="CONTADO", monto=Decimal("100.00"))
+
+    def test_ticket_cacheado_con_etag(self):
+        url = reverse("caja:ticket", args=[self.venta.id])
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        etag = resp["ETag"]
+
+        # Segunda vista: sale del cache (solo sesión/usuario + estado de la venta).
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(url + "?print=1").content, resp.content)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        escpos = self.client.get(reverse("caja:ticket_escpos", args=[self.venta.id]))
+        self.assertTrue(escpos.content.startswith(b"\x1b@"))
+        self.assertIn(b"V00", escpos.content)
+
+    def test_borrador_sin_etag(self):
+        Venta.objects.filter(pk=self.venta.pk).update(estado=Venta.Estado.BORRADOR)
+        url = reverse("caja:ticket", args=[self.venta.id])
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(resp.has_header("ETag"))
+
+
+class ConfirmacionIdempotenteTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser("admin", "admin@example.com", "x")
+        self.client.force_login(self.user)
+
+    def test_reintento_devuelve_la_venta_original(self):
+        conf, reclamada = reclamar_confirmacion("tok-1", self.user)
+        self.assertTrue(reclamada)
+        self.assertFalse(reclamar_confirmacion("tok-1", self.user)[1])  # en curso
+
+        marcar_confirmacion_error(conf, "Stock insuficiente")
+        conf, reclamada = reclamar_confirmacion("tok-1", self.user)
+        self.assertTrue(reclamada)
+        self.assertEqual(conf.estado, ConfirmacionVenta.Estado.EN_CURSO)
+
+        venta = Venta.objects.create(sucursal=Sucursal.objects.create(nombre="Centro"), estado=Venta.Estado.CONFIRMADA)
+        ConfirmacionVenta.objects.filter(pk=conf.pk).update(estado=ConfirmacionVenta.Estado.OK, venta=venta)
+
+        # El cajero ya arrancó otro carrito (token rotado) cuando llega el reintento.
+        session = self.client.session
+        session["pos_cart"] = {"1": {"cantidad": 1}}
+        session["pos_confirm_token"] = "tok-2"
+        session.save()
+
+        # Sin caja abierta ni carrito: solo puede responder OK si no vuelve a validar.
+        resp = self.client.post(reverse("caja:confirmar"), {"confirm_token": "tok-1"})
+        self.assertEqual(resp["HX-Redirect"], "/caja/")
+        self.assertEqual(self.client.session["pos_last_sale_id"], venta.id)
+        self.assertEqual(Venta.objects.count(), 1)
+        self.assertEqual(self.client.session["pos_cart"], {"1": {"cantidad": 1}})
+        self.assertEqual(self.client.session["pos_confirm_token"], "tok-2")
+
+    def test_purga_por_antiguedad(self):
+        reclamar_confirmacion("viejo", self.user)
+        reclamar_confirmacion("nuevo", self.user)
+        ConfirmacionVenta.objects.filter(token="viejo").update(creada_en=timezone.now() - timezone.timedelta(days=5))
+
+        self.assertEqual(purgar_confirmaciones(antes_de=timezone.now() - timezone.timedelta(days=2), lote=1), 1)
+        self.assertEqual(list(ConfirmacionVenta.objects.values_list("token", flat=True)), ["nuevo"])
+
+
+class MotorPagosTests(TestCase):
+    def test_redondeo_igual_que_decimal(self):
+        for monto, pct in [("100.05", "10.00"), ("0.25", "2.00"), ("33.35", "15.00"), ("-12.50", "1.00"), ("999.99", "12.34")]:
+            esperado = (Decimal(monto) * Decimal(pct) / Decimal("100")).quantize(Decimal("0.01"))
+            fila = pagos.parsear_fila({"tipo": "CREDITO", "monto": monto, "recargo_pct": pct, "cuotas": 3})
+            self.assertEqual(pagos.a_decimal(fila.recargo), esperado)
+            total = (Decimal(monto) + esperado).quantize(Decimal("0.01"))
+            self.assertEqual(pagos.a_decimal(fila.cuota), (total / Decimal("3")).quantize(Decimal("0.01")))
+        self.assertEqual(pagos.parsear_fila({"recargo_pct": "12.50"}).coeficiente, Decimal("1.1250"))
+        self.assertFalse(pagos.parsear_fila({"monto": "abc"}).monto_valido)
+
+    def test_totales_y_clientes_en_una_consulta(self):
+        cli = Cliente.objects.create(dni="30111222", nombre="Ana", apellido="Paz")
+        CuentaCorriente.objects.create(cliente=cli, saldo=Decimal("150.00"))
+        payments = [
+            {"tipo": "CONTADO", "monto": "50.00"},
+            {"tipo": "CREDITO", "monto": "100.00", "recargo_pct": "10.00", "cuotas": 3},
+            {"tipo": "CUENTA_CORRIENTE", "monto": "30.00", "cc_cliente_id": str(cli.id)},
+        ]
+
+        with self.assertNumQueries(1):
+            resultado = pagos.calcular_pagos(payments, Decimal("180.00"))
+
+        ctx = resultado.contexto()
+        self.assertEqual(ctx["recargos"], Decimal("10.00"))
+        self.assertEqual(ctx["total_cobrar"], Decimal("190.00"))
+        self.assertEqual(ctx["pagado"], Decimal("190.00"))
+        self.assertEqual(ctx["saldo"], Decimal("0.00"))
+
+        cc = ctx["ui_payments"][2]
+        self.assertTrue(cc["cc_ok"])
+        self.assertEqual(cc["cc_cliente_nombre"], "Paz, Ana")
+        self.assertEqual(cc["cc_saldo"], Decimal("150.00"))
+        self.assertEqual(resultado.clientes[cli.id].referencia, "Paz, Ana - 30111222")
+
+
+class TerminalesTests(TestCase):
+    def setUp(self):
+        self.sucursal = Sucursal.objects.create(nombre="Centro")
+        self.caja1 = Terminal.objects.create(sucursal=self.sucursal, numero=1)
+        self.caja2 = Terminal.objects.create(sucursal=self.sucursal, numero=2)
+
+    def _cajero(self, username):
+        user = get_user_model().objects.create_superuser(username, f"{username}@example.com", "x")
+        UsuarioPerfil.objects.create(user=user, sucursal=self.sucursal)
+        client = Client()
+        client.force_login(user)
+        return user, client
+
+    def _abrir(self, client, terminal):
+        client.post(reverse("caja:terminal_elegir"), {"terminal_id": terminal.id}, HTTP_HX_REQUEST="true")
+        return client.post(reverse("caja:caja_abrir"), HTTP_HX_REQUEST="true")
+
+    def test_dos_cajeros_en_paralelo_con_numeracion_propia(self):
+        ana, cli_ana = self._cajero("ana")
+        beto, cli_beto = self._cajero("beto")
+
+        self.assertEqual(self._abrir(cli_ana, self.caja1)["HX-Redirect"], "/caja/")
+        self.assertEqual(self._abrir(cli_beto, self.caja1).status_code, 400)  # la tiene Ana
+        self.assertEqual(self._abrir(cli_beto, self.caja2)["HX-Redirect"], "/caja/")
+        self.assertEqual(CajaSesion.objects.filter(sucursal=self.sucursal, cerrada_en__isnull=True).count(), 2)
+
+        # Con la caja abierta no puede pasarse a otra terminal.
+        resp = cli_beto.post(reverse("caja:terminal_elegir"), {"terminal_id": self.caja1.id}, HTTP_HX_REQUEST="true")
+        self.assertEqual(resp.status_code, 400)
+        self.assertContains(cli_beto.get(reverse("caja:pos")), "Caja 2 abierta por vos")
+
+        codigos = []
+        for terminal, cajero in ((self.caja1, ana), (self.caja2, beto), (self.caja1, ana)):
+            venta = Venta.objects.create(
+                sucursal=self.sucursal,
+                terminal=terminal,
+                caja_sesion=terminal.sesiones.get(cerrada_en__isnull=True),
+                cajero=cajero,
+            )
+            confirmar_venta(venta)
+            codigos.append(venta.codigo_sucursal)
+
+        self.assertEqual(codigos, ["0001-00000001", "0002-00000001", "0001-00000002"])
+        self.assertIsNone(Venta.objects.filter(terminal=self.caja2).get().numero_sucursal)
+
+
+class VentasEnEsperaTests(TestCase):
+    def setUp(self):
+        self.sucursal = Sucursal.objects.create(nombre="Centro")
+        self.user = get_user_model().objects.create_superuser("ana", "ana@example.com", "x")
+        UsuarioPerfil.objects.create(user=self.user, sucursal=self.sucursal)
+        self.client.force_login(self.user)
+        self.client.post(reverse("caja:caja_abrir"))
+
+        producto = Producto.objects.create(nombre="Jean")
+        self.jean = Variante.objects.create(producto=producto, sku="JEAN-40", precio=Decimal("100.00"))
+        self.remera = Variante.objects.create(producto=producto, sku="REM-M", precio=Decimal("50.00"))
+        for v, cantidad in ((self.jean, 5), (self.remera, 5)):
+            StockSucursal.objects.create(sucursal=self.sucursal, variante=v, cantidad=cantidad)
+
+    def _agregar(self, variante, veces=1):
+        for _ in range(veces):
+            self.client.post(reverse("caja:carrito_agregar", args=[variante.id]))
+
+    def test_suspender_y_retomar_revalida_precio_y_stock(self):
+        self._agregar(self.jean)
+        self._agregar(self.remera, 3)
+        self.client.post(reverse("caja:espera_guardar"), HTTP_HX_REQUEST="true", HTTP_HX_PROMPT="Probador 2")
+
+        espera = VentaEnEspera.objects.get()
+        self.assertEqual(espera.etiqueta, "Probador 2")
+        self.assertEqual(espera.total, Decimal("250.00"))
+        self.assertEqual(self.client.session["pos_cart"], {})
+
+        # Mientras tanto: cambia el precio del jean y se venden remeras.
+        Variante.objects.filter(pk=self.jean.pk).update(precio=Decimal("120.00"))
+        StockSucursal.objects.filter(variante=self.remera).update(cantidad=2)
+        self._agregar(self.remera)  # otro cliente
+
+        resp = self.client.post(reverse("caja:espera_retomar", args=[espera.id]), HTTP_HX_REQUEST="true")
+        self.assertEqual(resp["HX-Redirect"], "/caja/")
+
+        cart = self.client.session["pos_cart"]
+        self.assertEqual(cart[str(self.jean.id)], {"qty": 1, "precio": "120.00"})
+        self.assertEqual(cart[str(self.remera.id)]["qty"], 2)
+        self.assertEqual(len(self.client.session["pos_espera_avisos"]), 2)
+
+        # La venta que estaba en curso quedó en espera en el mismo click.
+        self.assertEqual(list(VentaEnEspera.objects.values_list("items_cantidad", flat=True)), [1])
+        resp = self.client.post(reverse("caja:espera_retomar", args=[espera.id]), HTTP_HX_REQUEST="true")
+        self.assertEqual(resp.status_code, 400)
+
+
+class FavoritosTests(TestCase):
+    def setUp(self):
+        self.sucursal = Sucursal.objects.create(nombre="Centro")
+        producto = Producto.objects.create(nombre="Medias")
+        self.variantes = {
+            sku: Variante.objects.create(producto=producto, sku=sku, precio=Decimal("10.00"))
+            for sku in ("MED-1", "MED-2", "MED-3", "MED-4")
+        }
+        StockSucursal.objects.create(sucursal=self.sucursal, variante=self.variantes["MED-2"], cantidad=4)
+
+    def _vendido(self, sku, cantidad, dias_atras=0):
+        venta = Venta.objects.create(
+            sucursal=self.sucursal,
+            estado=Venta.Estado.CONFIRMADA,
+            fecha=timezone.now() - timezone.timedelta(days=dias_atras),
+        )
+        VentaItem.objects.create(
+            venta=venta,
+            variante=self.variantes[sku],
+            cantidad=cantidad,
+            precio_unitario=Decimal("10.00"),
+            descripcion=f"Medias {sku}",
+        )
+
+    def test_ranking_por_unidades_recientes(self):
+        self._vendido("MED-1", 2)
+        self._vendido("MED-2", 3)
+        self._vendido("MED-2", 1)
+        self._vendido("MED-3", 50, dias_atras=90)  # fuera de la ventana
+        self._vendido("MED-4", 9)
+        Variante.objects.filter(sku="MED-4").update(activo=False)
+
+        call_command("caja_favoritos", dias=30, cantidad=10, stdout=StringIO())
+        self.assertEqual(
+            list(FavoritoSucursal.objects.values_list("posicion", "descripcion", "unidades")),
+            [(1, "Medias MED-2", 4), (2, "Medias MED-1", 2)],
+        )
+
+        # El precio vigente y el stock salen en la misma consulta que la grilla.
+        Variante.objects.filter(sku="MED-1").update(precio=Decimal("12.50"))
+        with self.assertNumQueries(1):
+            grilla = favoritos_pos(self.sucursal)
+            filas = [(f.variante.sku, f.variante.precio, f.stock) for f in grilla]
+        self.assertEqual(filas, [("MED-2", Decimal("10.00"), 4), ("MED-1", Decimal("12.50"), 0)])
 
-# Create your tests here.
@@ -0,0 +1,260 @@
+"""
+Tickets de venta: HTML para imprimir desde el navegador y ESC/POS para térmicas.
+
+Una venta confirmada (o anulada) no cambia más, así que el ticket se arma una
+sola vez y queda en cache por (venta, estado, versión de formato). Los
+reimpresos y el auto-print leen el cache y el navegador revalida con ETag.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from caja.templatetags.caja_extras import num_ar
+from core.fiscal import (
+    CondicionFiscalEmpresa,
+    DesgloseFiscalMonto,
+    IVA_GENERAL_PCT,
+    desglosar_monto_final_gravado_con_iva,
+    get_empresa_condicion_fiscal,
+)
+from core.models import AppSetting
+from ventas.models import Venta
+
+# Subir cuando cambie ticket.html o el formato ESC/POS (invalida todo lo cacheado).
+TICKET_VERSION = 1
+
+_TICKET_KEY = "caja:ticket:{formato}:{venta_id}:{estado}:v{version}"
+
+# Estados en los que la venta ya no cambia.
+ESTADOS_FINALES = (Venta.Estado.CONFIRMADA, Venta.Estado.ANULADA)
+
+
+def _empresa_nombre(sucursal=None) -> str:
+    """
+    Nombre de empresa para el ticket.
+    Prioridad:
+    1) AppSetting key='empresa.nombre' (value_str)
+    2) settings.EMPRESA_NOMBRE
+    3) nombre de sucursal (fallback)
+    """
+    setting = AppSetting.objects.filter(key="empresa.nombre").only("value_str").first()
+    if setting and (setting.value_str or "").strip():
+        return setting.value_str.strip()
+
+    cfg = (getattr(settings, "EMPRESA_NOMBRE", "") or "").strip()
+    if cfg:
+        return cfg
+
+    if sucursal is not None:
+        return (getattr(sucursal, "nombre", "") or "").strip() or "Mi empresa"
+
+    return "Mi empresa"
+
+
+def empresa_datos(sucursal=None, venta=None) -> dict:
+    def _get_setting_str(key: str) -> str:
+        row = AppSetting.objects.filter(key=key).only("value_str").first()
+        return (getattr(row, "value_str", "") or "").strip()
+
+    snap_cond = (getattr(venta, "empresa_condicion_fiscal_snapshot", "") or "").strip() if venta else ""
+    condicion_code = snap_cond or get_empresa_condicion_fiscal()
+    condicion_label = dict(CondicionFiscalEmpresa.CHOICES).get(condicion_code, condicion_code or "-")
+
+    snap_nombre = (getattr(venta, "empresa_nombre_snapshot", "") or "").strip() if venta else ""
+    snap_razon_social = (getattr(venta, "empresa_razon_social_snapshot", "") or "").strip() if venta else ""
+    snap_cuit = (getattr(venta, "empresa_cuit_snapshot", "") or "").strip() if venta else ""
+    snap_direccion = (getattr(venta, "empresa_direccion_snapshot", "") or "").strip() if venta else ""
+
+    return {
+        "nombre": snap_nombre or _empresa_nombre(sucursal),
+        "razon_social": snap_razon_social or _get_setting_str("empresa.razon_social"),
+        "cuit": snap_cuit or _get_setting_str("empresa.cuit"),
+        "direccion": snap_direccion or _get_setting_str("empresa.direccion"),
+        "condicion_fiscal_code": condicion_code,
+        "condicion_fiscal_label": condicion_label,
+        "es_responsable_inscripto": (
+            condicion_code == CondicionFiscalEmpresa.RESPONSABLE_INSCRIPTO
+        ),
+        "es_monotributista": (
+            condicion_code == CondicionFiscalEmpresa.MONOTRIBUTISTA
+        ),
+    }
+
+
+# ======================================================================
+# Armado
+# ======================================================================
+
+def _cargar_venta(venta_id: int) -> Venta:
+    return (
+        Venta.objects
+        .select_related("sucursal", "cajero")
+        .prefetch_related("items", "pagos__plan")
+        .get(id=venta_id)
+    )
+
+
+def _contexto(venta: Venta) -> dict:
+    # La descripción de cada línea es el snapshot guardado al confirmar (no se toca el catálogo).
+    total_items = sum((it.subtotal or Decimal("0.00")) for it in venta.items.all())
+    total_items = Decimal(total_items).quantize(Decimal("0.01"))
+    total_recargos = sum((p.recargo_monto or Decimal("0.00")) for p in venta.pagos.all())
+    total_recargos = Decimal(total_recargos).quantize(Decimal("0.01"))
+    total_final = (venta.total or Decimal("0.00")).quantize(Decimal("0.01"))
+    empresa = empresa_datos(venta.sucursal, venta=venta)
+
+    if (
+        getattr(venta, "fiscal_items_sin_impuestos_nacionales", None) is not None
+        and getattr(venta, "fiscal_items_iva_contenido", None) is not None
+    ):
+        fiscal_items = DesgloseFiscalMonto(
+            monto_final=total_items,
+            monto_sin_impuestos_nacionales=Decimal(venta.fiscal_items_sin_impuestos_nacionales or 0).quantize(Decimal("0.01")),
+            iva_contenido=Decimal(venta.fiscal_items_iva_contenido or 0).quantize(Decimal("0.01")),
+            iva_alicuota_pct=IVA_GENERAL_PCT,
+            otros_impuestos_nacionales_indirectos=Decimal(
+                getattr(venta, "fiscal_items_otros_impuestos_nacionales_indirectos", 0) or 0
+            ).quantize(Decimal("0.01")),
+        )
+    else:
+        fiscal_items = desglosar_monto_final_gravado_con_iva(total_items)
+
+    cajero_nombre = "-"
+    cajero_id = None
+    if getattr(venta, "cajero", None):
+        cajero_id = venta.cajero_id
+        cajero_nombre = (venta.cajero.get_full_name() or "").strip() or venta.cajero.username
+
+    return {
+        "venta": venta,
+        "empresa_nombre": empresa["nombre"],
+        "empresa_razon_social": empresa["razon_social"],
+        "empresa_cuit": empresa["cuit"],
+        "empresa_direccion": empresa["direccion"],
+        "empresa_condicion_fiscal_code": empresa["condicion_fiscal_code"],
+        "empresa_condicion_fiscal_label": empresa["condicion_fiscal_label"],
+        "empresa_es_ri": empresa["es_responsable_inscripto"],
+        "empresa_es_monotributista": empresa["es_monotributista"],
+        "fiscal_items": fiscal_items,
+        "cajero_nombre": cajero_nombre,
+        "cajero_id": cajero_id,
+        "total_items": total_items,
+        "total_recargos": total_recargos,
+        "total_final": total_final,
+    }
+
+
+def _render_html(venta: Venta) -> str:
+    # Sin request: el HTML no depende de quién lo pide (el auto-print lo resuelve el JS del template).
+    return render_to_string("caja/ticket.html", _contexto(venta))
+
+
+# Comandos ESC/POS (subset común a Epson/Xprinter/3nStar).
+_ESC_INIT = b"\x1b@"
+_ESC_CODEPAGE_PC850 = b"\x1bt\x02"
+_ESC_ALIGN_LEFT = b"\x1ba\x00"
+_ESC_ALIGN_CENTER = b"\x1ba\x01"
+_ESC_BOLD_ON = b"\x1bE\x01"
+_ESC_BOLD_OFF = b"\x1bE\x00"
+_ESC_DOUBLE_ON = b"\x1d!\x11"
+_ESC_DOUBLE_OFF = b"\x1d!\x00"
+_GS_CUT_FEED = b"\x1dVB\x03"
+
+
+def _render_escpos(venta: Venta) -> bytes:
+    ctx = _contexto(venta)
+    ancho = int(getattr(settings, "TICKET_ESCPOS_ANCHO", 42) or 42)
+
+    def txt(s) -> bytes:
+        return (str(s) + "\n").encode("cp850", errors="replace")
+
+    def fila(izq, der) -> bytes:
+        izq, der = str(izq), str(der)
+        return txt(izq[: max(ancho - len(der) - 1, 1)].ljust(ancho - len(der)) + der)
+
+    linea = txt("-" * ancho)
+    out = bytearray(_ESC_INIT + _ESC_CODEPAGE_PC850)
+
+    out += _ESC_ALIGN_CENTER + _ESC_BOLD_ON + _ESC_DOUBLE_ON
+    out += txt(ctx["empresa_nombre"][: ancho // 2])
+    out += _ESC_DOUBLE_OFF + _ESC_BOLD_OFF
+    if ctx["empresa_razon_social"]:
+        out += txt(ctx["empresa_razon_social"][:ancho])
+    if ctx["empresa_cuit"]:
+        out += txt(f"CUIT {ctx['empresa_cuit']}")
+    if ctx["empresa_direccion"]:
+        out += txt(ctx["empresa_direccion"][:ancho])
+    out += txt(ctx["empresa_condicion_fiscal_label"])
+
+    out += _ESC_ALIGN_LEFT + linea
+    out += fila("Venta", venta.codigo_sucursal)
+    out += fila("Sucursal", venta.sucursal.nombre)
+    out += fila("Fecha", timezone.localtime(venta.fecha).strftime("%d/%m/%Y %H:%M"))
+    out += fila("Cajero", ctx["cajero_nombre"])
+    if venta.estado == Venta.Estado.ANULADA:
+        out += _ESC_BOLD_ON + txt("*** VENTA ANULADA ***") + _ESC_BOLD_OFF
+    out += linea
+
+    for it in venta.items.all():
+        out += txt(it.descripcion_display[:ancho])
+        out += fila(f"  {it.cantidad} x ${num_ar(it.precio_unitario)}", f"${num_ar(it.subtotal)}")
+    out += linea
+    out += fila("Total por items", f"${num_ar(ctx['total_items'])}")
+
+    for p in venta.pagos.all():
+        out += fila(p.get_tipo_display(), f"${num_ar(p.monto)}")
+    if ctx["total_recargos"]:
+        out += fila("Recargos", f"${num_ar(ctx['total_recargos'])}")
+
+    out += _ESC_BOLD_ON + fila("TOTAL VENTA", f"${num_ar(ctx['total_final'])}") + _ESC_BOLD_OFF + linea
+
+    fiscal = ctx["fiscal_items"]
+    if ctx["empresa_es_ri"]:
+        out += txt("Reg. Transparencia Fiscal (Ley 27.743)")
+    out += fila("Precio sin imp. nacionales", f"${num_ar(fiscal.monto_sin_impuestos_nacionales)}")
+    out += fila("IVA contenido", f"${num_ar(fiscal.iva_contenido)}")
+    out += fila("Otros imp. nac. indirectos", f"${num_ar(fiscal.otros_impuestos_nacionales_indirectos)}")
+
+    out += _ESC_ALIGN_CENTER + txt("") + txt("Gracias por su compra")
+    out += _GS_CUT_FEED
+    return bytes(out)
+
+
+_RENDERERS = {
+    "html": _render_html,
+    "escpos": _render_escpos,
+}
+
+
+# ======================================================================
+# API
+# ======================================================================
+
+def estado_venta(venta_id: int):
+    """Estado de la venta (una consulta chica) o None si no existe."""
+    return Venta.objects.filter(id=venta_id).values_list("estado", flat=True).first()
+
+
+def ticket_etag(venta_id: int, estado: str, formato: str = "html") -> str:
+    return f'"ticket-{formato}-{venta_id}-{estado}-v{TICKET_VERSION}"'
+
+
+def obtener_ticket(venta_id: int, estado: str, formato: str = "html"):
+    """
+    Ticket ya armado (str para html, bytes para escpos).
+    Solo se cachea si la venta está en un estado final.
+    """
+    render = _RENDERERS[formato]
+    if estado not in ESTADOS_FINALES:
+        return render(_cargar_venta(venta_id))
+
+    key = _TICKET_KEY.format(formato=formato, venta_id=venta_id, estado=estado, version=TICKET_VERSION)
+    contenido = cache.get(key)
+    if contenido is None:
+        contenido = render(_cargar_venta(venta_id))
+        cache.set(key, contenido, timeout=int(getattr(settings, "TICKET_CACHE_TTL", 7 * 86400) or 86400))
+    return contenido
@@ -10,6 +10,8 @@ urlpatterns = [
     path("", views.pos, name="pos"),
     path("abrir/", views.caja_abrir, name="caja_abrir"),
     path("cerrar/", views.caja_cerrar, name="caja_cerrar"),
+    path("estado/", views.caja_estado, name="caja_estado"),
+    path("terminal/", views.terminal_elegir, name="terminal_elegir"),
 
     # =========================
     # Buscar / Scanner
@@ -26,11 +28,19 @@ urlpatterns = [
     path("carrito/quitar/<int:variante_id>/", views.carrito_quitar, name="carrito_quitar"),
     path("carrito/vaciar/", views.carrito_vaciar, name="carrito_vaciar"),
 
+    # =========================
+    # Ventas en espera
+    # =========================
+    path("espera/guardar/", views.espera_guardar, name="espera_guardar"),
+    path("espera/<int:espera_id>/retomar/", views.espera_retomar, name="espera_retomar"),
+    path("espera/<int:espera_id>/descartar/", views.espera_descartar, name="espera_descartar"),
+
     # =========================
     # Confirmar / Ticket
     # =========================
     path("confirmar/", views.confirmar, name="confirmar"),
     path("ticket/<int:venta_id>/", views.ticket, name="ticket"),
+    path("ticket/<int:venta_id>/escpos/", views.ticket_escpos, name="ticket_escpos"),
 
     # =========================
     # Pagos: cuotas
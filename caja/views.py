@@ -3,35 +3,54 @@
 
 import uuid
 import json
-from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from decimal import Decimal, ROUND_HALF_UP
 
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError, ObjectDoesNotExist, PermissionDenied
 from django.db import transaction
-from django.db.models import Q, Count, Sum
-from django.http import HttpResponse
+from django.db.models import Q
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, render, redirect
 from django.template.loader import render_to_string
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.views.decorators.http import require_POST
 
-from core.models import Sucursal
-from core.models import AppSetting
+from core import referencia
+from core.autorizacion import autorizacion, usuario_tiene_permiso
+from core.reintentos import con_reintentos, es_reintentable
 from core.fiscal import (
     CondicionFiscalEmpresa,
-    DesgloseFiscalMonto,
-    IVA_GENERAL_PCT,
-    desglosar_monto_final_gravado_con_iva,
+    centavos,
+    desglosar_centavos,
     get_empresa_condicion_fiscal,
+    parse_decimal_ar,
 )
 from catalogo.models import Variante, StockSucursal
-from ventas.models import Venta, VentaItem, VentaPago, PlanCuotas
+from ventas.models import Venta, VentaItem, VentaPago
 from ventas.services import confirmar_venta
-from cuentas_corrientes.models import Cliente, CuentaCorriente, MovimientoCuentaCorriente
+from cuentas_corrientes.models import CuentaCorriente, MovimientoCuentaCorriente
+from cuentas_corrientes.services import buscar_clientes
 
 from admin_panel.services import permitir_vender_sin_stock, permitir_cambiar_precio_venta
-from .models import CajaSesion
+from . import pagos
+from .models import CajaSesion, ConfirmacionVenta, Terminal, VentaEnEspera
+from .services import (
+    favoritos_pos,
+    marcar_confirmacion_error,
+    marcar_confirmacion_ok,
+    poner_en_espera,
+    reclamar_confirmacion,
+    registrar_venta_en_caja,
+    resumen_caja,
+    retomar_venta_en_espera,
+    sesiones_abiertas_por_terminal,
+    terminales_sucursal,
+    ventas_en_espera,
+)
+from .tickets import ESTADOS_FINALES, estado_venta, obtener_ticket, ticket_etag
 from .utils import handle_pos_errors
 
 CAJA_POS_PERMISSION = "ventas.usar_caja_pos"
@@ -42,7 +61,7 @@ def _usuario_puede_usar_caja(user) -> bool:
         return False
     if getattr(user, "is_superuser", False):
         return True
-    return user.has_perm(CAJA_POS_PERMISSION)
+    return usuario_tiene_permiso(user, CAJA_POS_PERMISSION)
 
 
 def _require_pos_permission(user):
@@ -113,6 +132,7 @@ def _payments_get(request) -> list:
 def _payments_save(request, payments: list):
     request.session["pos_payments"] = payments
     request.session.modified = True
+    request.__dict__.pop("_ctx_pagos_pos", None)
 
 
 def _payments_default() -> dict:
@@ -144,166 +164,49 @@ def _payments_default() -> dict:
 
 
 def _parse_decimal_ar(raw) -> Decimal:
-    s = (raw or "").strip()
-    if not s:
-        return Decimal("0.00")
-
-    s = s.replace("$", "").replace(" ", "")
-
-    # Caso típico AR: 23.648,00  -> 23648.00
-    if "," in s and "." in s:
-        s = s.replace(".", "").replace(",", ".")
-    elif "," in s:
-        s = s.replace(",", ".")
+    valor = parse_decimal_ar(raw)
+    return valor if valor is not None else Decimal("0.00")
 
-    allowed = set("0123456789.-")
-    s = "".join(ch for ch in s if ch in allowed)
 
-    if s in ("", "-", ".", "-."):
-        return Decimal("0.00")
-
-    try:
-        return Decimal(s).quantize(Decimal("0.01"))
-    except InvalidOperation:
-        return Decimal("0.00")
-
-
-def _payments_total(payments: list) -> Decimal:
+def _clientes_cc_pos(request, ids) -> dict:
     """
-    Total realmente cobrado (lo que entra a caja).
-    - CREDITO: monto + recargo
-    - resto: monto
+    Clientes de cuenta corriente del request: cada id se consulta una sola vez
+    (pagos_set_modal y el render del modal comparten la misma carga).
     """
-    total = Decimal("0.00")
-
-    for p in payments:
-        tipo = (p.get("tipo") or "").strip()
-
-        try:
-            monto = Decimal(str(p.get("monto", "0") or "0")).quantize(Decimal("0.01"))
-        except Exception:
-            monto = Decimal("0.00")
-
-        if monto <= 0:
-            continue
-
-        if tipo == "CREDITO":
-            try:
-                recargo_pct = Decimal(str(p.get("recargo_pct") or "0")).quantize(Decimal("0.01"))
-            except Exception:
-                recargo_pct = Decimal("0.00")
-
-            recargo_monto = (monto * recargo_pct / Decimal("100")).quantize(Decimal("0.01"))
-            total += (monto + recargo_monto)
-        else:
-            total += monto
-
-    return total.quantize(Decimal("0.01"))
+    cargados = request.__dict__.setdefault("_pos_clientes_cc", {})
+    faltan = [cid for cid in ids if cid not in cargados]
+    if faltan:
+        encontrados = pagos.cargar_clientes_cc(faltan)
+        for cid in faltan:
+            cargados[cid] = encontrados.get(cid)
+    return {cid: cargados[cid] for cid in ids if cargados.get(cid) is not None}
+
+
+def _payments_calcular(request, payments: list, total_base) -> pagos.ResultadoPagos:
+    return pagos.calcular_pagos(
+        payments,
+        total_base,
+        buscar_clientes=lambda ids: _clientes_cc_pos(request, ids),
+    )
 
 
-def _payments_build_ui_and_totals(payments: list, total_base: Decimal) -> dict:
-    ui_payments = []
-    recargos_credito = Decimal("0")
-
-    # ---- preparar CC (pocos pagos = simple y seguro) ----
-    cc_ids = []
-    for p in payments:
-        if (p.get("tipo") or "").strip() == "CUENTA_CORRIENTE":
-            raw = (p.get("cc_cliente_id") or "").strip()
-            if raw.isdigit():
-                cc_ids.append(int(raw))
-
-    clientes_map = {}
-    cc_map = {}
-    if cc_ids:
-        clientes_map = {c.id: c for c in Cliente.objects.filter(id__in=cc_ids, activo=True)}
-        cc_map = {
-            cc.cliente_id: cc
-            for cc in CuentaCorriente.objects.select_related("cliente").filter(cliente_id__in=cc_ids, activa=True)
-        }
+def _payments_build_ui_and_totals(request, payments: list, total_base: Decimal) -> dict:
+    return _payments_calcular(request, payments or [], total_base).contexto()
 
-    for p in payments:
-        tipo = (p.get("tipo") or "").strip()
-
-        try:
-            monto = Decimal(str(p.get("monto", "0") or "0"))
-        except Exception:
-            monto = Decimal("0")
-
-        try:
-            cuotas = int(p.get("cuotas") or 1)
-        except Exception:
-            cuotas = 1
 
+def _desgloses_fiscales_pos_safe(montos) -> list:
+    """Desglose fiscal de varios montos en un lote; inválidos o negativos van como 0."""
+    montos_centavos = []
+    for monto in montos:
         try:
-            recargo_pct = Decimal(str(p.get("recargo_pct") or "0"))
-        except Exception:
-            recargo_pct = Decimal("0")
-
-        recargo_monto = (monto * recargo_pct / Decimal("100")).quantize(Decimal("0.01"))
-        total_tarjeta = (monto + recargo_monto).quantize(Decimal("0.01"))
-        cuota_est = (total_tarjeta / Decimal(str(max(cuotas, 1)))).quantize(Decimal("0.01"))
-
-        if tipo == "CREDITO" and monto > 0:
-            recargos_credito += recargo_monto
-
-        p_ui = dict(p)
-        p_ui["monto"] = str(monto.quantize(Decimal("0.01")))
-        p_ui["cuotas"] = cuotas
-        p_ui["recargo_pct"] = str(recargo_pct.quantize(Decimal("0.01")))
-        p_ui["recargo_monto_calc"] = recargo_monto
-        p_ui["total_tarjeta_calc"] = total_tarjeta
-        p_ui["cuota_calc"] = cuota_est
-        p_ui["tipo_locked"] = bool(monto > 0)
-        p_ui["selected_plan_id"] = (p.get("plan_id") or "").strip()
-
-        # ---- campos UI Cuenta Corriente ----
-        p_ui["cc_q"] = (p.get("cc_q") or "").strip()
-        p_ui["cc_cliente_nombre"] = ""
-        p_ui["cc_cliente_dni"] = ""
-        p_ui["cc_ok"] = False
-        p_ui["cc_saldo"] = Decimal("0.00")
-
-        if tipo == "CUENTA_CORRIENTE":
-            raw_id = (p.get("cc_cliente_id") or "").strip()
-            if raw_id.isdigit():
-                cid = int(raw_id)
-                cli = clientes_map.get(cid)
-                if cli:
-                    p_ui["cc_cliente_nombre"] = f"{cli.apellido}, {cli.nombre}"
-                    p_ui["cc_cliente_dni"] = cli.dni
-
-                cc = cc_map.get(cid)
-                if cc:
-                    p_ui["cc_ok"] = True
-                    try:
-                        p_ui["cc_saldo"] = Decimal(str(cc.saldo())).quantize(Decimal("0.01"))
-                    except Exception:
-                        p_ui["cc_saldo"] = Decimal("0.00")
-
-        ui_payments.append(p_ui)
-
-    recargos_credito = recargos_credito.quantize(Decimal("0.01"))
-    total_base = Decimal(total_base).quantize(Decimal("0.01"))
-    total_cobrar = (total_base + recargos_credito).quantize(Decimal("0.01"))
-
-    pagado = _payments_total(payments)
-    saldo = (total_cobrar - pagado).quantize(Decimal("0.01"))
-
-    return {
-        "ui_payments": ui_payments,
-        "recargos": recargos_credito,
-        "total_cobrar": total_cobrar,
-        "pagado": pagado,
-        "saldo": saldo,
-    }
+            montos_centavos.append(max(centavos(monto), 0))
+        except ValueError:
+            montos_centavos.append(0)
+    return desglosar_centavos(montos_centavos)
 
 
 def _desglose_fiscal_pos_safe(monto_final):
-    try:
-        return desglosar_monto_final_gravado_con_iva(monto_final)
-    except Exception:
-        return desglosar_monto_final_gravado_con_iva(Decimal("0.00"))
+    return _desgloses_fiscales_pos_safe([monto_final])[0]
 
 
 def _ctx_fiscal_empresa_pos() -> dict:
@@ -332,80 +235,28 @@ def _ctx_fiscal_totales_pos(total_items) -> dict:
 
 
 def _decorar_variantes_con_fiscal(results):
-    for v in (results or []):
-        try:
-            v.fiscal_precio = _desglose_fiscal_pos_safe(getattr(v, "precio", Decimal("0.00")))
-        except Exception:
-            v.fiscal_precio = _desglose_fiscal_pos_safe(Decimal("0.00"))
+    results = results or []
+    fiscales = _desgloses_fiscales_pos_safe([getattr(v, "precio", Decimal("0.00")) for v in results])
+    for v, fiscal_precio in zip(results, fiscales):
+        v.fiscal_precio = fiscal_precio
     return results
 
 
 
 def _ctx_pagos_pos(request) -> dict:
+    """
+    Contexto de pagos (modal + card). Se arma una vez por request: el body del
+    modal y los OOB lo comparten; _payments_save / _cart_save lo descartan.
+    """
+    ctx = getattr(request, "_ctx_pagos_pos", None)
+    if ctx is not None:
+        return ctx
+
     payments = _payments_get(request) or []
     total_base = _cart_total(_cart_get(request))
-    pay_ctx = _payments_build_ui_and_totals(payments, total_base)
-        # =========================
-    # Enriquecer pagos CC (cliente + saldo)
-    # =========================
-    cc_ids = []
-    for p in pay_ctx["ui_payments"]:
-        if (p.get("tipo") == "CUENTA_CORRIENTE") and str(p.get("cc_cliente_id") or "").isdigit():
-            cc_ids.append(int(p["cc_cliente_id"]))
-
-    clientes_map = {}
-    cuentas_map = {}
-
-    if cc_ids:
-        clientes = Cliente.objects.filter(id__in=cc_ids, activo=True)
-        clientes_map = {c.id: c for c in clientes}
-
-        cuentas = CuentaCorriente.objects.filter(cliente_id__in=cc_ids)
-        cuentas_map = {cc.cliente_id: cc for cc in cuentas}
-
-        for p in pay_ctx["ui_payments"]:
-            if p.get("tipo") != "CUENTA_CORRIENTE":
-                continue
-
-            cid_raw = p.get("cc_cliente_id") or ""
-            if not str(cid_raw).isdigit():
-                p["cc_cliente_nombre"] = ""
-                p["cc_cliente_dni"] = ""
-                p["cc_saldo"] = None
-                p["cc_ok"] = False
-                continue
-
-            cid = int(cid_raw)
-            cli = clientes_map.get(cid)
-            cc = cuentas_map.get(cid)
-
-            if cli:
-                p["cc_cliente_nombre"] = f"{cli.apellido}, {cli.nombre}"
-                p["cc_cliente_dni"] = cli.dni
-            else:
-                p["cc_cliente_nombre"] = ""
-                p["cc_cliente_dni"] = ""
-
-            if cc and cc.activa:
-                # saldo() hace aggregate; como son pocos, OK
-                p["cc_saldo"] = cc.saldo()
-                p["cc_ok"] = True
-            else:
-                p["cc_saldo"] = None
-                p["cc_ok"] = False
-                
+    pay_ctx = _payments_build_ui_and_totals(request, payments, total_base)
 
-
-    tarjetas = list(
-        PlanCuotas.objects.filter(activo=True)
-        .values_list("tarjeta", flat=True)
-        .distinct()
-        .order_by("tarjeta")
-    )
-
-    tipos = list(VentaPago.Tipo.choices)
-
-    return {
+    ctx = {
         "payments_session": payments,
         "payments": pay_ctx["ui_payments"],     # <- para templates
         "ui_payments": pay_ctx["ui_payments"],  # <- por si lo venías usando
@@ -414,10 +265,12 @@ def _ctx_pagos_pos(request) -> dict:
         "total_cobrar": pay_ctx["total_cobrar"],
         "pagado": pay_ctx["pagado"],
         "saldo": pay_ctx["saldo"],
-        "tarjetas": tarjetas,
-        "tipos": tipos,
+        "tarjetas": referencia.tarjetas(),
+        "tipos": list(VentaPago.Tipo.choices),
         **_ctx_fiscal_totales_pos(total_base),
     }
+    request._ctx_pagos_pos = ctx
+    return ctx
 
 
 def _oob_pagos_html(request) -> str:
@@ -539,9 +392,9 @@ def pagos_set_modal(request, idx: int):
         ref = ""
         cc_id = p.get("cc_cliente_id") or ""
         if str(cc_id).isdigit():
-            cli = Cliente.objects.filter(id=int(cc_id)).only("apellido", "nombre", "dni").first()
+            cli = _clientes_cc_pos(request, [int(cc_id)]).get(int(cc_id))
             if cli:
-                ref = f"{cli.apellido}, {cli.nombre} - {cli.dni}"
+                ref = cli.referencia
 
         p["referencia"] = ref
 
@@ -575,7 +428,7 @@ def pagos_set_modal(request, idx: int):
             p["plan_id"] = plan_id
 
             if plan_id:
-                plan = PlanCuotas.objects.filter(id=int(plan_id), activo=True).first()
+                plan = referencia.plan_activo(plan_id)
                 if plan:
                     p["cuotas"] = int(plan.cuotas)
                     p["recargo_pct"] = str(Decimal(str(plan.recargo_pct)).quantize(Decimal("0.01")))
@@ -651,11 +504,7 @@ def pagos_cuotas(request, idx: int):
     _validar_caja_usuario(request)
     tarjeta = (request.GET.get("tarjeta") or "").strip()
 
-    planes = (
-        PlanCuotas.objects
-        .filter(activo=True, tarjeta=tarjeta)
-        .order_by("cuotas")
-    )
+    planes = referencia.planes_tarjeta(tarjeta)
 
     payments = _payments_get(request) or []
     selected_plan_id = ""
@@ -678,14 +527,11 @@ def _get_pos_sucursal(request):
     user = getattr(request, "user", None)
     _require_pos_permission(user)
 
-    if user is not None and getattr(user, "is_authenticated", False):
-        try:
-            profile = user.panel_profile
-        except ObjectDoesNotExist:
-            profile = None
-
-        if profile and profile.sucursal_id:
-            sucursal = profile.sucursal
+    # Sucursal asignada desde la foto de autorización cacheada (sin consultas).
+    snapshot = autorizacion(user)
+    if snapshot is not None:
+        sucursal = snapshot.sucursal_obj()
+        if sucursal is not None:
             if not sucursal.activa:
                 raise ValidationError(
                     "Tu usuario tiene una sucursal asignada pero está inactiva. "
@@ -698,10 +544,9 @@ def _get_pos_sucursal(request):
     if getattr(settings, "POS_SUCURSAL_FALLBACK_TO_SETTINGS", True):
         sid = getattr(settings, "POS_SUCURSAL_ID", None)
         if sid is not None:
-            try:
-                return Sucursal.objects.get(id=sid, activa=True)
-            except Sucursal.DoesNotExist:
-                pass
+            sucursal = referencia.sucursal_activa(int(sid))
+            if sucursal is not None:
+                return sucursal
 
     raise ValidationError(
         "No tenés una sucursal asignada para operar en Caja. "
@@ -716,9 +561,65 @@ def _nombre_usuario_caja(user) -> str:
     return full_name or getattr(user, "username", "") or f"Usuario #{getattr(user, 'id', '')}"
 
 
-def _get_caja_sesion_activa(sucursal, for_update: bool = False):
+def _nombre_caja(terminal, sucursal) -> str:
+    if terminal is None:
+        return f"La caja de {sucursal.nombre}"
+    return f"{terminal} ({sucursal.nombre})"
+
+
+# ======================================================================
+# Helpers: Terminal (caja física; el usuario queda vinculado por sesión)
+# ======================================================================
+
+def _terminales_pos(request, sucursal) -> list:
+    terminales = request.__dict__.get("_pos_terminales")
+    if terminales is None:
+        terminales = terminales_sucursal(sucursal)
+        request._pos_terminales = terminales
+    return terminales
+
+
+def _get_pos_terminal(request, sucursal):
+    """
+    Terminal en la que opera el usuario: la de su caja abierta, la elegida en
+    la sesión o la única de la sucursal. None si tiene que elegir.
+    Se memoriza por request (junto con la caja abierta propia, si hay).
+    """
+    if "_pos_terminal" in request.__dict__:
+        return request._pos_terminal
+
+    propia = (
+        CajaSesion.objects
+        .select_related("terminal", "cajero_apertura")
+        .filter(
+            sucursal=sucursal,
+            terminal__isnull=False,
+            cajero_apertura_id=request.user.id,
+            cerrada_en__isnull=True,
+        )
+        .first()
+    )
+    if propia is not None:
+        terminal = propia.terminal
+    else:
+        terminales = _terminales_pos(request, sucursal)
+        elegida = request.session.get("pos_terminal_id")
+        terminal = next((t for t in terminales if t.id == elegida), None)
+        if terminal is None and len(terminales) == 1:
+            terminal = terminales[0]
+
+    if terminal is not None and request.session.get("pos_terminal_id") != terminal.id:
+        request.session["pos_terminal_id"] = terminal.id
+    request._pos_sesion_propia = propia
+    request._pos_terminal = terminal
+    return terminal
+
+
+def _get_caja_sesion_activa(terminal, for_update: bool = False):
+    if terminal is None:
+        return None
     qs = CajaSesion.objects.select_related("cajero_apertura").filter(
-        sucursal=sucursal,
+        terminal=terminal,
         cerrada_en__isnull=True,
     )
     if for_update:
@@ -728,8 +629,8 @@ def _get_caja_sesion_activa(sucursal, for_update: bool = False):
 
 def _validar_caja_usuario(request, sucursal=None, for_update: bool = False):
     """
-    Devuelve la sesión de caja abierta si el usuario autenticado es quien la abrió.
-    Si no hay caja abierta o está abierta por otro cajero, levanta ValidationError.
+    Devuelve la sesión de caja abierta del terminal del usuario si él la abrió.
+    Si no eligió terminal, está cerrada o la abrió otro cajero, levanta ValidationError.
     """
     if sucursal is None:
         sucursal = _get_pos_sucursal(request)
@@ -738,47 +639,73 @@ def _validar_caja_usuario(request, sucursal=None, for_update: bool = False):
             f"La sucursal {sucursal.nombre} está inactiva. No se puede vender."
         )
 
-    sesion = _get_caja_sesion_activa(sucursal, for_update=for_update)
+    terminal = _get_pos_terminal(request, sucursal)
+    if terminal is None:
+        raise ValidationError(f"Elegí en qué caja de {sucursal.nombre} vas a operar.")
+
+    # Sin lock alcanza con la caja propia que ya se leyó al resolver el terminal.
+    propia = request._pos_sesion_propia
+    if not for_update and propia is not None and propia.terminal_id == terminal.id:
+        return propia
+
+    sesion = _get_caja_sesion_activa(terminal, for_update=for_update)
     if not sesion:
         raise ValidationError(
-            f"La caja de {sucursal.nombre} está cerrada. Abrila para poder vender."
+            f"{_nombre_caja(terminal, sucursal)} está cerrada. Abrila para poder vender."
         )
 
     if sesion.cajero_apertura_id != request.user.id:
         raise ValidationError(
-            f"La caja de {sucursal.nombre} está abierta por {_nombre_usuario_caja(sesion.cajero_apertura)}. "
-            "Solo ese cajero puede vender hasta cerrar caja."
+            f"{_nombre_caja(terminal, sucursal)} está abierta por {_nombre_usuario_caja(sesion.cajero_apertura)}. "
+            "Solo ese cajero puede vender en esta caja hasta cerrarla."
         )
 
     return sesion
 
 
 def _build_caja_estado(request, sucursal):
-    sesion = _get_caja_sesion_activa(sucursal)
+    terminal = _get_pos_terminal(request, sucursal)
+    terminales = _terminales_pos(request, sucursal)
+    abiertas = sesiones_abiertas_por_terminal(terminales)
+
+    estado = {
+        "pos_terminal": terminal,
+        "pos_terminales": [{"terminal": t, "sesion": abiertas.get(t.id)} for t in terminales],
+        # Puede cambiar de terminal mientras no tenga una caja abierta.
+        "pos_puede_elegir_terminal": len(terminales) > 1 and request._pos_sesion_propia is None,
+    }
+
+    sesion = abiertas.get(terminal.id) if terminal is not None else None
     if not sesion:
+        if terminal is None:
+            texto = "Elegí en qué caja (terminal) de la sucursal vas a operar."
+        else:
+            texto = f"{terminal} cerrada. Abrila para habilitar ventas en esta caja."
         return {
+            **estado,
             "caja_sesion_activa": None,
             "caja_activa": False,
             "caja_puede_vender": False,
             "caja_abierta_por_otro": False,
             "caja_cajero_activo": None,
-            "caja_estado_texto": "Caja cerrada. Abrí caja para habilitar ventas en esta sucursal.",
+            "caja_estado_texto": texto,
         }
 
     es_cajero_actual = sesion.cajero_apertura_id == getattr(request.user, "id", None)
     if es_cajero_actual:
         texto = (
-            f"Caja abierta por vos desde {timezone.localtime(sesion.abierta_en):%d/%m/%Y %H:%M}. "
+            f"{terminal} abierta por vos desde {timezone.localtime(sesion.abierta_en):%d/%m/%Y %H:%M}. "
             "Podés operar ventas."
         )
     else:
         texto = (
-            f"Caja abierta por {_nombre_usuario_caja(sesion.cajero_apertura)} desde "
+            f"{terminal} abierta por {_nombre_usuario_caja(sesion.cajero_apertura)} desde "
             f"{timezone.localtime(sesion.abierta_en):%d/%m/%Y %H:%M}. "
-            "No podés vender hasta que cierre caja."
+            "Elegí otra caja o esperá a que la cierre."
         )
 
     return {
+        **estado,
         "caja_sesion_activa": sesion,
         "caja_activa": True,
         "caja_puede_vender": es_cajero_actual,
@@ -788,59 +715,6 @@ def _build_caja_estado(request, sucursal):
     }
 
 
-def _get_ticket_empresa_nombre(sucursal=None) -> str:
-    """
-    Nombre de empresa para el ticket.
-    Prioridad:
-    1) AppSetting key='empresa.nombre' (value_str)
-    2) settings.EMPRESA_NOMBRE
-    3) nombre de sucursal (fallback)
-    """
-    setting = AppSetting.objects.filter(key="empresa.nombre").only("value_str").first()
-    if setting and (setting.value_str or "").strip():
-        return setting.value_str.strip()
-
-    cfg = (getattr(settings, "EMPRESA_NOMBRE", "") or "").strip()
-    if cfg:
-        return cfg
-
-    if sucursal is not None:
-        return (getattr(sucursal, "nombre", "") or "").strip() or "Mi empresa"
-
-    return "Mi empresa"
-
-
-def _get_ticket_empresa_datos(sucursal=None, venta=None) -> dict:
-    def _get_setting_str(key: str) -> str:
-        row = AppSetting.objects.filter(key=key).only("value_str").first()
-        return (getattr(row, "value_str", "") or "").strip()
-
-    venta = venta or None
-    snap_cond = (getattr(venta, "empresa_condicion_fiscal_snapshot", "") or "").strip() if venta else ""
-    condicion_code = snap_cond or get_empresa_condicion_fiscal()
-    condicion_label = dict(CondicionFiscalEmpresa.CHOICES).get(condicion_code, condicion_code or "-")
-
-    snap_nombre = (getattr(venta, "empresa_nombre_snapshot", "") or "").strip() if venta else ""
-    snap_razon_social = (getattr(venta, "empresa_razon_social_snapshot", "") or "").strip() if venta else ""
-    snap_cuit = (getattr(venta, "empresa_cuit_snapshot", "") or "").strip() if venta else ""
-    snap_direccion = (getattr(venta, "empresa_direccion_snapshot", "") or "").strip() if venta else ""
-
-    return {
-        "nombre": snap_nombre or _get_ticket_empresa_nombre(sucursal),
-        "razon_social": snap_razon_social or _get_setting_str("empresa.razon_social"),
-        "cuit": snap_cuit or _get_setting_str("empresa.cuit"),
-        "direccion": snap_direccion or _get_setting_str("empresa.direccion"),
-        "condicion_fiscal_code": condicion_code,
-        "condicion_fiscal_label": condicion_label,
-        "es_responsable_inscripto": (
-            condicion_code == CondicionFiscalEmpresa.RESPONSABLE_INSCRIPTO
-        ),
-        "es_monotributista": (
-            condicion_code == CondicionFiscalEmpresa.MONOTRIBUTISTA
-        ),
-    }
-
-
 # ======================================================================
 # Helpers: Carrito (session)
 # ======================================================================
@@ -852,6 +726,7 @@ def _cart_get(request) -> dict:
 def _cart_save(request, cart: dict):
     request.session["pos_cart"] = cart
     request.session.modified = True
+    request.__dict__.pop("_ctx_pagos_pos", None)
 
 
 def _cart_total(cart: dict) -> Decimal:
@@ -927,10 +802,14 @@ def _build_cart_context(request):
             "subtotal_bruto": subtotal_bruto,
             "descuento": descuento,
             "subtotal": subtotal,
-            "fiscal_precio": _desglose_fiscal_pos_safe(precio),
-            "fiscal_subtotal": _desglose_fiscal_pos_safe(subtotal),
         })
 
+    # Desglose fiscal de precios y subtotales en un solo lote.
+    fiscales = _desgloses_fiscales_pos_safe([m for row in rows for m in (row["precio"], row["subtotal"])])
+    for row, fiscal_precio, fiscal_subtotal in zip(rows, fiscales[0::2], fiscales[1::2]):
+        row["fiscal_precio"] = fiscal_precio
+        row["fiscal_subtotal"] = fiscal_subtotal
+
     total = total.quantize(Decimal("0.01"))
     return {"items": rows, "total": total}
 
@@ -960,7 +839,7 @@ def _render_cart(request):
     # Totales de pagos para los OOB del carrito
     payments = _payments_get(request) or []
     total_base = Decimal(cart_ctx["total"]).quantize(Decimal("0.01"))
-    pay_ctx = _payments_build_ui_and_totals(payments, total_base)
+    pay_ctx = _payments_build_ui_and_totals(request, payments, total_base)
 
     return render(request, "caja/_carrito.html", {
         "items": cart_ctx["items"],
@@ -1009,20 +888,18 @@ def pos(request):
     sucursal = _get_pos_sucursal(request)
     caja_estado = _build_caja_estado(request, sucursal)
     caja_cierre_resumen = request.session.pop("pos_caja_cierre_resumen", None)
+    caja_resumen = None
+    if caja_estado["caja_sesion_activa"] is not None:
+        caja_resumen = resumen_caja(caja_estado["caja_sesion_activa"])
     cart_ctx = _build_cart_context(request)
     cart_variante_ids = [row["variante"].id for row in cart_ctx["items"]]
     stock_map = _build_stock_map(sucursal, cart_variante_ids)
 
     payments = _payments_get(request) or []
     total_base = Decimal(cart_ctx["total"]).quantize(Decimal("0.01"))
-    pay_ctx = _payments_build_ui_and_totals(payments, total_base)
+    pay_ctx = _payments_build_ui_and_totals(request, payments, total_base)
 
-    tarjetas = list(
-        PlanCuotas.objects.filter(activo=True)
-        .values_list("tarjeta", flat=True)
-        .distinct()
-        .order_by("tarjeta")
-    )
+    tarjetas = referencia.tarjetas()
 
     # Venta recién confirmada (para mostrar modal una sola vez)
     last_sale = None
@@ -1082,12 +959,20 @@ def pos(request):
         "saldo": pay_ctx["saldo"],
         "tarjetas": tarjetas,
 
+        # teclas rápidas (precio y stock vigentes)
+        "favoritos": favoritos_pos(sucursal),
+
         # modal venta confirmada
         "last_sale": last_sale,
         "last_sale_total_items": last_sale_total_items,
         "last_sale_pagos": last_sale_pagos,
         "last_sale_total_final": last_sale_total_final,
         "caja_cierre_resumen": caja_cierre_resumen,
+        "caja_resumen": caja_resumen,
+
+        # ventas en espera del cajero
+        "ventas_en_espera": ventas_en_espera(request.user, sucursal),
+        "espera_avisos": request.session.pop("pos_espera_avisos", None),
         **_ctx_fiscal_totales_pos(total_base),
         **caja_estado,
     })
@@ -1098,21 +983,41 @@ def pos(request):
 @require_POST
 def caja_abrir(request):
     sucursal = _get_pos_sucursal(request)
-
-    with transaction.atomic():
-        # MySQL no soporta la unique constraint condicional; serializamos por sucursal.
-        Sucursal.objects.select_for_update().only("id").get(id=sucursal.id)
-        sesion = _get_caja_sesion_activa(sucursal, for_update=True)
+    terminal = _get_pos_terminal(request, sucursal)
+    if terminal is None:
+        raise ValidationError("Elegí en qué caja vas a operar antes de abrirla.")
+
+    def _abrir():
+        # MySQL no soporta la unique constraint condicional; serializamos por
+        # cajero (una caja abierta por usuario) y por terminal (las otras cajas
+        # de la sucursal no se bloquean). Siempre en este orden.
+        get_user_model().objects.select_for_update().only("id").get(pk=request.user.pk)
+        Terminal.objects.select_for_update().only("id").get(id=terminal.id)
+        sesion = _get_caja_sesion_activa(terminal, for_update=True)
         if sesion:
             if sesion.cajero_apertura_id != request.user.id:
                 raise ValidationError(
-                    f"La caja de {sucursal.nombre} ya está abierta por {_nombre_usuario_caja(sesion.cajero_apertura)}."
+                    f"{_nombre_caja(terminal, sucursal)} ya está abierta por {_nombre_usuario_caja(sesion.cajero_apertura)}."
                 )
-        else:
-            CajaSesion.objects.create(
-                sucursal=sucursal,
-                cajero_apertura=request.user,
+            return
+
+        otra = (
+            CajaSesion.objects
+            .select_related("terminal", "sucursal")
+            .filter(cajero_apertura=request.user, cerrada_en__isnull=True)
+            .first()
+        )
+        if otra is not None:
+            raise ValidationError(
+                f"Ya tenés abierta {_nombre_caja(otra.terminal, otra.sucursal)}. Cerrala antes de abrir otra caja."
             )
+        CajaSesion.objects.create(
+            sucursal=sucursal,
+            terminal=terminal,
+            cajero_apertura=request.user,
+        )
+
+    con_reintentos(_abrir, operacion="caja_abrir")
 
     request.session["pos_confirm_token"] = str(uuid.uuid4())
     request.session.modified = True
@@ -1136,18 +1041,23 @@ def caja_cerrar(request):
         sesion.cerrar(user=request.user)
         sesion.save(update_fields=["cajero_cierre", "cerrada_en"])
 
-        resumen = (
-            Venta.objects
-            .filter(caja_sesion=sesion, estado=Venta.Estado.CONFIRMADA)
-            .aggregate(cantidad=Count("id"), total=Sum("total"))
-        )
+        # Acumulados mantenidos en cada confirmación: no recorremos las ventas.
+        resumen = resumen_caja(sesion)
 
     _cart_save(request, {})
     _payments_save(request, [])
     request.session["pos_confirm_token"] = str(uuid.uuid4())
     request.session["pos_caja_cierre_resumen"] = {
-        "cantidad": int(resumen.get("cantidad") or 0),
-        "total": str((resumen.get("total") or Decimal("0.00")).quantize(Decimal("0.01"))),
+        "cantidad": resumen["cantidad"],
+        "total": str(resumen["total"]),
+        "medios": [
+            {
+                "label": m["label"],
+                "cantidad": m["cantidad"],
+                "total": str(m["total"]),
+            }
+            for m in resumen["medios"]
+        ],
     }
     request.session.modified = True
 
@@ -1159,6 +1069,53 @@ def caja_cerrar(request):
     return redirect("caja:pos")
 
 
+@handle_pos_errors
+@login_required
+@require_POST
+def terminal_elegir(request):
+    """Vincula al usuario con otra caja (terminal) de su sucursal."""
+    sucursal = _get_pos_sucursal(request)
+    _get_pos_terminal(request, sucursal)
+    propia = request._pos_sesion_propia
+    if propia is not None:
+        raise ValidationError(
+            f"Tenés abierta {_nombre_caja(propia.terminal, sucursal)}. Cerrala antes de cambiar de caja."
+        )
+
+    try:
+        terminal_id = int(request.POST.get("terminal_id") or 0)
+    except (TypeError, ValueError):
+        terminal_id = 0
+    terminal = next((t for t in _terminales_pos(request, sucursal) if t.id == terminal_id), None)
+    if terminal is None:
+        raise ValidationError("La caja elegida no existe o está inactiva.")
+
+    request.session["pos_terminal_id"] = terminal.id
+    request.session["pos_confirm_token"] = str(uuid.uuid4())
+    request.session.modified = True
+
+    is_hx = request.headers.get("HX-Request") == "true" or request.META.get("HTTP_HX_REQUEST") == "true"
+    if is_hx:
+        resp = HttpResponse("")
+        resp["HX-Redirect"] = "/caja/"
+        return resp
+    return redirect("caja:pos")
+
+
+@handle_pos_errors
+@login_required
+def caja_estado(request):
+    """
+    HTMX: panel de estado de caja (totales por medio de pago de la sesión abierta).
+    """
+    sucursal = _get_pos_sucursal(request)
+    sesion = _get_caja_sesion_activa(_get_pos_terminal(request, sucursal))
+
+    return render(request, "caja/_caja_estado.html", {
+        "caja_resumen": resumen_caja(sesion) if sesion else None,
+    })
+
+
 # ======================================================================
 # Búsqueda / Scanner
 # ======================================================================
@@ -1400,6 +1357,104 @@ def carrito_vaciar(request):
     return _render_cart(request)
 
 
+# ======================================================================
+# Ventas en espera (cliente en el probador)
+# ======================================================================
+
+def _aviso_espera(ajuste: dict) -> str:
+    sku, motivo = ajuste["sku"], ajuste["motivo"]
+    if motivo == "precio":
+        return f"{sku}: precio actualizado de ${_fmt_ar(ajuste['antes'])} a ${_fmt_ar(ajuste['ahora'])}."
+    if motivo == "stock":
+        return f"{sku}: cantidad ajustada al stock disponible ({ajuste['ahora']})."
+    if motivo == "sin_stock":
+        return f"{sku}: sin stock en la sucursal, se quitó."
+    return f"Artículo {sku}: ya no está activo, se quitó."
+
+
+@handle_pos_errors
+@login_required
+@require_POST
+def espera_guardar(request):
+    """Suspende la venta en curso (carrito + pagos) y deja el POS libre."""
+    sucursal = _get_pos_sucursal(request)
+    _validar_caja_usuario(request, sucursal=sucursal)
+
+    poner_en_espera(
+        user=request.user,
+        sucursal=sucursal,
+        terminal=_get_pos_terminal(request, sucursal),
+        cart=_cart_get(request),
+        payments=_payments_get(request),
+        etiqueta=request.headers.get("HX-Prompt") or request.POST.get("etiqueta") or "",
+    )
+    _cart_save(request, {})
+    _payments_save(request, [])
+
+    is_hx = request.headers.get("HX-Request") == "true" or request.META.get("HTTP_HX_REQUEST") == "true"
+    if is_hx:
+        resp = HttpResponse("")
+        resp["HX-Redirect"] = "/caja/"
+        return resp
+    return redirect("caja:pos")
+
+
+@handle_pos_errors
+@login_required
+@require_POST
+def espera_retomar(request, espera_id: int):
+    """
+    Retoma una venta en espera con precios y stock revalidados. Si hay una
+    venta en curso, pasa a espera en la misma operación (un solo click).
+    """
+    sucursal = _get_pos_sucursal(request)
+    _validar_caja_usuario(request, sucursal=sucursal)
+
+    with transaction.atomic():
+        cart, payments, ajustes = retomar_venta_en_espera(
+            espera_id,
+            user=request.user,
+            sucursal=sucursal,
+            permitir_sin_stock=permitir_vender_sin_stock(sucursal),
+            permitir_cambiar_precio=permitir_cambiar_precio_venta(sucursal),
+        )
+        en_curso = _cart_get(request)
+        if en_curso:
+            poner_en_espera(
+                user=request.user,
+                sucursal=sucursal,
+                terminal=_get_pos_terminal(request, sucursal),
+                cart=en_curso,
+                payments=_payments_get(request),
+            )
+
+    _cart_save(request, cart)
+    _payments_save(request, payments)
+    request.session["pos_espera_avisos"] = [_aviso_espera(a) for a in ajustes]
+
+    is_hx = request.headers.get("HX-Request") == "true" or request.META.get("HTTP_HX_REQUEST") == "true"
+    if is_hx:
+        resp = HttpResponse("")
+        resp["HX-Redirect"] = "/caja/"
+        return resp
+    return redirect("caja:pos")
+
+
+@handle_pos_errors
+@login_required
+@require_POST
+def espera_descartar(request, espera_id: int):
+    sucursal = _get_pos_sucursal(request)
+    VentaEnEspera.objects.filter(pk=espera_id, cajero=request.user, sucursal=sucursal).delete()
+
+    is_hx = request.headers.get("HX-Request") == "true" or request.META.get("HTTP_HX_REQUEST") == "true"
+    if is_hx:
+        resp = HttpResponse("")
+        resp["HX-Redirect"] = "/caja/"
+        return resp
+    return redirect("caja:pos")
+
+
 # ======================================================================
 # Confirmar
 # ======================================================================
@@ -1408,16 +1463,22 @@ def carrito_vaciar(request):
 @login_required
 @require_POST
 def confirmar(request):
-    sent_token = (request.POST.get("confirm_token") or "").strip()
+    sent_token = (request.POST.get("confirm_token") or "").strip()[:64]
     session_token = request.session.get("pos_confirm_token")
 
-    if not session_token or sent_token != session_token:
-        resp = HttpResponse("Operación ya procesada o token inválido.", status=409)
-        is_hx = request.headers.get("HX-Request") == "true" or request.META.get("HTTP_HX_REQUEST") == "true"
-        if is_hx:
-            # Refresca el POS para resincronizar token y estado en caso de doble click o token viejo.
-            resp["HX-Redirect"] = "/caja/"
-        return resp
+    # Reintento (doble click, timeout del navegador): si este token ya confirmó una
+    # venta, se devuelve ese resultado sin volver a validar ni tomar locks.
+    previa = (
+        ConfirmacionVenta.objects.filter(token=sent_token, usuario=request.user).first()
+        if sent_token else None
+    )
+    if previa is not None and previa.estado == ConfirmacionVenta.Estado.OK:
+        return _confirmar_ok_response(request, previa.venta_id, sent_token)
+    if previa is not None and previa.estado == ConfirmacionVenta.Estado.EN_CURSO:
+        return _confirmar_conflicto_response(request, "La venta se está confirmando. Esperá un momento.")
+
+    if previa is None and (not session_token or sent_token != session_token):
+        return _confirmar_conflicto_response(request, "Operación ya procesada o token inválido.")
 
     sucursal = _get_pos_sucursal(request)
     _validar_caja_usuario(request, sucursal=sucursal)
@@ -1432,56 +1493,34 @@ def confirmar(request):
     if not payments:
         return HttpResponse("No hay pagos cargados.", status=400)
 
-    pagos_limpios = []
-    suma_montos_base = Decimal("0.00")
-    suma_recargos = Decimal("0.00")
+    # Un solo cálculo (montos en centavos + clientes CC en una consulta) para
+    # validar, totalizar y después grabar.
+    calculo = _payments_calcular(request, payments, total_base)
 
-    for p in payments:
-        tipo = (p.get("tipo") or "").strip()
-        if not tipo:
+    pagos_limpios = []
+    for p, fila in zip(payments, calculo.filas):
+        if not fila.tipo:
             return HttpResponse("Pago sin tipo.", status=400)
-
-        try:
-            monto = Decimal(str(p.get("monto", "0") or "0")).quantize(Decimal("0.01"))
-        except Exception:
+        if not fila.monto_valido:
             return HttpResponse("Monto inválido en pagos.", status=400)
 
-        if monto <= 0:
+        if fila.monto <= 0:
             continue
 
-        try:
-            cuotas = int(p.get("cuotas") or 1)
-        except Exception:
-            cuotas = 1
-
-        try:
-            recargo_pct = Decimal(str(p.get("recargo_pct") or "0")).quantize(Decimal("0.01"))
-        except Exception:
-            recargo_pct = Decimal("0.00")
-
-        referencia = (p.get("referencia") or "").strip()
-
-        if tipo == "CREDITO":
-            if cuotas < 1:
+        if fila.es_credito:
+            if fila.cuotas < 1:
                 return HttpResponse("Cuotas inválidas en pago con crédito.", status=400)
-            if recargo_pct < 0:
+            if fila.recargo_pct < 0:
                 return HttpResponse("Recargo % inválido en crédito.", status=400)
 
-        recargo_monto = (monto * recargo_pct / Decimal("100")).quantize(Decimal("0.01"))
-        coeficiente = (Decimal("1.00") + (recargo_pct / Decimal("100"))).quantize(Decimal("0.0001"))
-
-        suma_montos_base += monto
-        if tipo == "CREDITO":
-            suma_recargos += recargo_monto
-
         pagos_limpios.append({
-            "tipo": tipo,
-            "monto": monto,
-            "cuotas": cuotas,
-            "recargo_pct": recargo_pct,
-            "recargo_monto": recargo_monto,
-            "coeficiente": coeficiente,
-            "referencia": referencia,
+            "tipo": fila.tipo,
+            "monto": pagos.a_decimal(fila.monto),
+            "cuotas": fila.cuotas,
+            "recargo_pct": pagos.a_decimal(fila.recargo_pct),
+            "recargo_monto": pagos.a_decimal(fila.recargo),
+            "coeficiente": fila.coeficiente,
+            "referencia": (p.get("referencia") or "").strip(),
 
             "pos_proveedor": (p.get("pos_proveedor") or "").strip(),
             "pos_terminal_id": (p.get("pos_terminal_id") or "").strip(),
@@ -1491,21 +1530,19 @@ def confirmar(request):
             "pos_marca": (p.get("pos_marca") or "").strip(),
             "pos_ultimos4": (p.get("pos_ultimos4") or "").strip(),
 
-            "cc_cliente_id": (p.get("cc_cliente_id") or "").strip(),
-            "plan_id": (p.get("plan_id") or "").strip(),
+            "cc_cliente_id": fila.cc_cliente_id,
+            "plan_id": fila.plan_id,
         })
 
-    suma_montos_base = suma_montos_base.quantize(Decimal("0.01"))
-    suma_recargos = suma_recargos.quantize(Decimal("0.01"))
-
+    suma_montos_base = pagos.a_decimal(calculo.base_cargada)
     if suma_montos_base != total_base:
         return HttpResponse(
             f"Pagos base incompletos. Total ${total_base} - Base cargada ${suma_montos_base}.",
             status=400
         )
 
-    total_cobrar = (total_base + suma_recargos).quantize(Decimal("0.01"))
-    total_pagado = _payments_total(pagos_limpios).quantize(Decimal("0.01"))
+    total_cobrar = pagos.a_decimal(calculo.total_cobrar)
+    total_pagado = pagos.a_decimal(calculo.pagado)
 
     if total_pagado != total_cobrar:
         return HttpResponse(
@@ -1513,140 +1550,152 @@ def confirmar(request):
             status=400
         )
 
-    # Validación previa (sin lock) de CC
+    # Validación previa (sin lock) de CC, con los clientes ya cargados.
     for p in pagos_limpios:
         if p["tipo"] == "CUENTA_CORRIENTE":
-            if not str(p.get("cc_cliente_id") or "").isdigit():
+            if not p["cc_cliente_id"]:
                 return HttpResponse("Cuenta corriente: falta seleccionar cliente.", status=400)
 
-            cuenta = CuentaCorriente.objects.filter(
-                cliente_id=int(p["cc_cliente_id"]),
-                activa=True
-            ).first()
-
-            if not cuenta:
+            cli = calculo.clientes.get(p["cc_cliente_id"])
+            if not (cli and cli.cuenta_activa):
                 return HttpResponse("Cuenta corriente: el cliente no tiene cuenta corriente activa.", status=400)
 
-    try:
-        with transaction.atomic():
-            caja_sesion = _validar_caja_usuario(request, sucursal=sucursal, for_update=True)
-            # =========================
-            # Venta
-            # =========================
-            venta = Venta.objects.create(
-                sucursal=sucursal,
-                caja_sesion=caja_sesion,
-                cajero=request.user,
-                estado=Venta.Estado.BORRADOR,
-                medio_pago=Venta.MedioPago.EFECTIVO,
-                total=total_cobrar,
+            # Label en referencia (Apellido, Nombre - DNI)
+            p["referencia"] = cli.referencia if cli.activo else ""
+
+    confirmacion, reclamada = reclamar_confirmacion(sent_token, request.user)
+    if not reclamada:
+        if confirmacion.estado == ConfirmacionVenta.Estado.OK:
+            return _confirmar_ok_response(request, confirmacion.venta_id, sent_token)
+        return _confirmar_conflicto_response(request, "La venta se está confirmando. Esperá un momento.")
+
+    # Todo lo que escribe la venta va en una función: ante un conflicto de escritura
+    # (TiDB/MySQL) se re-ejecuta completa en una transacción nueva.
+    def _crear_y_confirmar():
+        caja_sesion = _validar_caja_usuario(request, sucursal=sucursal, for_update=True)
+        # =========================
+        # Venta
+        # =========================
+        venta = Venta.objects.create(
+            sucursal=sucursal,
+            caja_sesion=caja_sesion,
+            terminal_id=caja_sesion.terminal_id,
+            cajero=request.user,
+            estado=Venta.Estado.BORRADOR,
+            medio_pago=Venta.MedioPago.EFECTIVO,
+            total=total_cobrar,
+        )
+
+        # =========================
+        # Items
+        # =========================
+        for vid_str, item in cart.items():
+            v = get_object_or_404(Variante, id=int(vid_str), activo=True)
+            qty = int(item["qty"])
+            precio = Decimal(item["precio"]).quantize(Decimal("0.01"))
+            VentaItem.objects.create(
+                venta=venta,
+                variante=v,
+                cantidad=qty,
+                precio_unitario=precio,
             )
 
-            # =========================
-            # Items
-            # =========================
-            for vid_str, item in cart.items():
-                v = get_object_or_404(Variante, id=int(vid_str), activo=True)
-                qty = int(item["qty"])
-                precio = Decimal(item["precio"]).quantize(Decimal("0.01"))
-                VentaItem.objects.create(
-                    venta=venta,
-                    variante=v,
-                    cantidad=qty,
-                    precio_unitario=precio,
-                )
+        # =========================
+        # Pagos
+        # =========================
+        for p in pagos_limpios:
+            plan_obj = None
+            if p.get("plan_id"):
+                plan_obj = referencia.plan_activo(p["plan_id"])
+
+            VentaPago.objects.create(
+                venta=venta,
+                plan=plan_obj,
+                tipo=p["tipo"],
+                monto=p["monto"],
+                cuotas=p["cuotas"],
+                recargo_pct=p["recargo_pct"],
+                recargo_monto=p["recargo_monto"],
+                coeficiente=p["coeficiente"],
+                referencia=p["referencia"],
+                pos_proveedor=p.get("pos_proveedor", ""),
+                pos_terminal_id=p.get("pos_terminal_id", ""),
+                pos_lote=p.get("pos_lote", ""),
+                pos_cupon=p.get("pos_cupon", ""),
+                pos_autorizacion=p.get("pos_autorizacion", ""),
+                pos_marca=p.get("pos_marca", ""),
+                pos_ultimos4=(p.get("pos_ultimos4", "") or "")[:4],
+            )
 
-            # =========================
-            # Pagos
-            # =========================
-            for p in pagos_limpios:
-                plan_obj = None
-                if p.get("plan_id"):
-                    try:
-                        plan_obj = PlanCuotas.objects.filter(id=int(p["plan_id"]), activo=True).first()
-                    except (TypeError, ValueError):
-                        plan_obj = None
-                        # Si es Cuenta Corriente, guardamos el label en referencia (Apellido, Nombre - DNI)
-                if p.get("tipo") == "CUENTA_CORRIENTE":
-                    cc_id = (p.get("cc_cliente_id") or "").strip()
-                    if cc_id.isdigit():
-                        cli = Cliente.objects.filter(id=int(cc_id), activo=True).first()
-                        if cli:
-                            p["referencia"] = f"{cli.apellido}, {cli.nombre} - {cli.dni}"
-                        else:
-                            p["referencia"] = ""
-                    else:
-                        p["referencia"] = ""
-
-
-                VentaPago.objects.create(
-                    venta=venta,
-                    plan=plan_obj,
-                    tipo=p["tipo"],
-                    monto=p["monto"],
-                    cuotas=p["cuotas"],
-                    recargo_pct=p["recargo_pct"],
-                    recargo_monto=p["recargo_monto"],
-                    coeficiente=p["coeficiente"],
-                    referencia=p["referencia"],
-                    pos_proveedor=p.get("pos_proveedor", ""),
-                    pos_terminal_id=p.get("pos_terminal_id", ""),
-                    pos_lote=p.get("pos_lote", ""),
-                    pos_cupon=p.get("pos_cupon", ""),
-                    pos_autorizacion=p.get("pos_autorizacion", ""),
-                    pos_marca=p.get("pos_marca", ""),
-                    pos_ultimos4=(p.get("pos_ultimos4", "") or "")[:4],
-                )
+        # =========================
+        # Confirmar venta (stock/estado/etc)
+        # =========================
+        confirmar_venta(venta)
 
-            # =========================
-            # Confirmar venta (stock/estado/etc)
-            # =========================
-            confirmar_venta(venta)
-
-            # =========================
-            # Cuenta Corriente: generar DÉBITO (con lock)
-            # =========================
-            for p in pagos_limpios:
-                if p.get("tipo") != "CUENTA_CORRIENTE":
-                    continue
-
-                cc_cliente_id = p.get("cc_cliente_id")
-                if not str(cc_cliente_id or "").isdigit():
-                    raise ValidationError("Cuenta corriente: falta seleccionar cliente.")
-
-                cc_cliente_id = int(cc_cliente_id)
-
-                cuenta = (
-                    CuentaCorriente.objects
-                    .select_for_update()
-                    .filter(cliente_id=cc_cliente_id, activa=True)
-                    .first()
-                )
+        # =========================
+        # Cuenta Corriente: generar DÉBITO (con lock)
+        # =========================
+        for p in pagos_limpios:
+            if p.get("tipo") != "CUENTA_CORRIENTE":
+                continue
 
-                if not cuenta:
-                    raise ValidationError("Cuenta corriente: el cliente no tiene cuenta corriente activa.")
+            cc_cliente_id = p.get("cc_cliente_id")
+            if not cc_cliente_id:
+                raise ValidationError("Cuenta corriente: falta seleccionar cliente.")
 
-                MovimientoCuentaCorriente.objects.create(
-                    cuenta=cuenta,
-                    tipo=MovimientoCuentaCorriente.Tipo.DEBITO,
-                    monto=p["monto"].quantize(Decimal("0.01")),
-                    venta=venta,
-                    referencia=f"Venta #{venta.id}",
-                    observacion="Débito generado desde POS",
-                )
+            cuenta = (
+                CuentaCorriente.objects
+                .select_for_update()
+                .filter(cliente_id=cc_cliente_id, activa=True)
+                .first()
+            )
+
+            if not cuenta:
+                raise ValidationError("Cuenta corriente: el cliente no tiene cuenta corriente activa.")
+
+            MovimientoCuentaCorriente.objects.create(
+                cuenta=cuenta,
+                tipo=MovimientoCuentaCorriente.Tipo.DEBITO,
+                monto=p["monto"].quantize(Decimal("0.01")),
+                venta=venta,
+                referencia=f"Venta #{venta.id}",
+                observacion="Débito generado desde POS",
+            )
 
-            # Por si confirmar_venta() recalcula y pisa el total:
-            venta.total = total_cobrar
-            venta.save(update_fields=["total"])
+        # Por si confirmar_venta() recalcula y pisa el total:
+        venta.total = total_cobrar
+        venta.save(update_fields=["total"])
 
+        # Acumulados de la sesión de caja (misma transacción, sesión bloqueada)
+        registrar_venta_en_caja(venta)
+
+        # La clave queda OK solo si la venta se commitea.
+        marcar_confirmacion_ok(confirmacion, venta)
+        return venta
+
+    try:
+        venta = con_reintentos(_crear_y_confirmar, operacion="confirmar")
     except ValidationError as e:
+        marcar_confirmacion_error(confirmacion, str(e))
         return HttpResponse(str(e), status=400)
+    except Exception as e:
+        marcar_confirmacion_error(confirmacion, str(e))
+        if es_reintentable(e):
+            return HttpResponse("La caja está con mucha demanda. Reintentá confirmar en unos segundos.", status=503)
+        raise
 
-    request.session["pos_last_sale_id"] = venta.id
+    return _confirmar_ok_response(request, venta.id, sent_token)
 
-    _cart_save(request, {})
-    _payments_save(request, [])
-    request.session["pos_confirm_token"] = str(uuid.uuid4())
+
+def _confirmar_ok_response(request, venta_id, sent_token):
+    request.session["pos_last_sale_id"] = venta_id
+
+    # Un reintento tardío con un token ya rotado no toca el carrito que el
+    # cajero armó (o retomó de espera) después de esa venta.
+    if sent_token == request.session.get("pos_confirm_token"):
+        _cart_save(request, {})
+        _payments_save(request, [])
+        request.session["pos_confirm_token"] = str(uuid.uuid4())
     request.session.modified = True
 
     resp = HttpResponse("")
@@ -1654,100 +1703,60 @@ def confirmar(request):
     return resp
 
 
+def _confirmar_conflicto_response(request, mensaje: str):
+    resp = HttpResponse(mensaje, status=409)
+    is_hx = request.headers.get("HX-Request") == "true" or request.META.get("HTTP_HX_REQUEST") == "true"
+    if is_hx:
+        # Refresca el POS para resincronizar token y estado en caso de doble click o token viejo.
+        resp["HX-Redirect"] = "/caja/"
+    return resp
+
+
 # ======================================================================
 # Ticket
 # ======================================================================
 
-@login_required
-def ticket(request, venta_id: int):
+def _ticket_respuesta(request, venta_id: int, formato: str):
     if not _usuario_puede_usar_caja(request.user):
         raise PermissionDenied(
             "No tenés permisos para acceder a tickets de Caja."
         )
 
-    venta = get_object_or_404(
-        Venta.objects
-        .select_related("sucursal", "cajero")
-        .prefetch_related(
-            "items__variante__producto",
-            "items__variante__atributos__atributo",
-            "items__variante__atributos__valor",
-            "pagos__plan",
-        ),
-        id=venta_id
-    )
+    estado = estado_venta(venta_id)
+    if estado is None:
+        raise Http404("Venta inexistente.")
+
+    # Reimpresión: si el navegador ya tiene esta versión, 304 sin armar nada.
+    # Solo estados finales: un borrador todavía puede cambiar con el mismo estado.
+    etag = ticket_etag(venta_id, estado, formato) if estado in ESTADOS_FINALES else None
+    if etag is not None:
+        no_modificado = get_conditional_response(request, etag=etag)
+        if no_modificado is not None:
+            return no_modificado
+
+    contenido = obtener_ticket(venta_id, estado, formato)
+    if formato == "escpos":
+        resp = HttpResponse(contenido, content_type="application/octet-stream")
+        resp["Content-Disposition"] = f'attachment; filename="ticket_{venta_id}.bin"'
+    else:
+        resp = HttpResponse(contenido)
+    if etag is not None:
+        resp["ETag"] = etag
+    patch_cache_control(resp, private=True, no_cache=True)
+    return resp
 
-    def build_nombre_cliente(variante):
-        base = (variante.producto.nombre or "").strip()
 
-        color = ""
-        talle = ""
+@login_required
+def ticket(request, venta_id: int):
+    return _ticket_respuesta(request, venta_id, "html")
+
+
+@login_required
+def ticket_escpos(request, venta_id: int):
+    """Mismo ticket como bytes ESC/POS (para mandar directo a la térmica)."""
+    return _ticket_respuesta(request, venta_id, "escpos")
 
-        for va in variante.atributos.all():
-            nom = (va.atributo.nombre or "").strip().lower()
-            val = (va.valor.valor or "").strip()
-            if not val:
-                continue
 
-            if nom == "color":
-                color = val
-            elif nom in ("talle", "tamaño", "tamanio", "size"):
-                talle = val
-
-        partes = [p for p in (base, color, talle) if p]
-        return " - ".join(partes) if partes else (variante.sku or base or "Item")
-
-    # pegamos el nombre “cliente” directo en cada item (lo más confiable)
-    for it in venta.items.all():
-        it.nombre_cliente = build_nombre_cliente(it.variante)
-
-    total_items = sum((it.subtotal or Decimal("0.00")) for it in venta.items.all()).quantize(Decimal("0.01"))
-    total_recargos = sum((p.recargo_monto or Decimal("0.00")) for p in venta.pagos.all()).quantize(Decimal("0.01"))
-    total_final = (venta.total or Decimal("0.00")).quantize(Decimal("0.01"))
-    empresa_datos = _get_ticket_empresa_datos(venta.sucursal, venta=venta)
-
-    if (
-        getattr(venta, "fiscal_items_sin_impuestos_nacionales", None) is not None
-        and getattr(venta, "fiscal_items_iva_contenido", None) is not None
-    ):
-        fiscal_items = DesgloseFiscalMonto(
-            monto_final=total_items,
-            monto_sin_impuestos_nacionales=Decimal(venta.fiscal_items_sin_impuestos_nacionales or 0).quantize(Decimal("0.01")),
-            iva_contenido=Decimal(venta.fiscal_items_iva_contenido or 0).quantize(Decimal("0.01")),
-            iva_alicuota_pct=IVA_GENERAL_PCT,
-            otros_impuestos_nacionales_indirectos=Decimal(
-                getattr(venta, "fiscal_items_otros_impuestos_nacionales_indirectos", 0) or 0
-            ).quantize(Decimal("0.01")),
-        )
-    else:
-        fiscal_items = desglosar_monto_final_gravado_con_iva(total_items)
-
-    cajero_nombre = "-"
-    cajero_id = None
-    if getattr(venta, "cajero", None):
-        cajero_id = venta.cajero_id
-        cajero_nombre = (venta.cajero.get_full_name() or "").strip() or venta.cajero.username
-
-    auto_print = (request.GET.get("print") == "1")
-
-    return render(request, "caja/ticket.html", {
-        "venta": venta,
-        "empresa_nombre": empresa_datos["nombre"],
-        "empresa_razon_social": empresa_datos["razon_social"],
-        "empresa_cuit": empresa_datos["cuit"],
-        "empresa_direccion": empresa_datos["direccion"],
-        "empresa_condicion_fiscal_code": empresa_datos["condicion_fiscal_code"],
-        "empresa_condicion_fiscal_label": empresa_datos["condicion_fiscal_label"],
-        "empresa_es_ri": empresa_datos["es_responsable_inscripto"],
-        "empresa_es_monotributista": empresa_datos["es_monotributista"],
-        "fiscal_items": fiscal_items,
-        "cajero_nombre": cajero_nombre,
-        "cajero_id": cajero_id,
-        "total_items": total_items,
-        "total_recargos": total_recargos,
-        "total_final": total_final,
-        "auto_print": auto_print,
-    })
 # ======================================================================
 # Compatibilidad: Endpoints viejos (pagos_add / pagos_del / pagos_set)
 # ======================================================================
@@ -1855,26 +1864,19 @@ def cc_buscar_clientes(request, idx: int):
     _validar_caja_usuario(request)
     q = (request.GET.get("q") or "").strip()
 
+    # La cuenta viene en el mismo query (select_related): saldo materializado, sin consultas por fila.
     results = []
-    if q:
-        qs = Cliente.objects.filter(activo=True)
-        if q.isdigit():
-            qs = qs.filter(dni__icontains=q)
-        else:
-            qs = qs.filter(Q(apellido__icontains=q) | Q(nombre__icontains=q))
-        results = list(qs.order_by("apellido", "nombre")[:20])
-
-    # Para pintar si tiene CC activa (sin calcular saldo acá)
-    cc_activa_ids = set(
-        CuentaCorriente.objects.filter(activa=True, cliente__in=results)
-        .values_list("cliente_id", flat=True)
-    )
+    for cliente in buscar_clientes(q) if q else []:
+        try:
+            cliente.cc = cliente.cuenta_corriente
+        except ObjectDoesNotExist:
+            cliente.cc = None
+        results.append(cliente)
 
     return render(request, "caja/_cc_results.html", {
         "idx": idx,
         "q": q,
         "results": results,
-        "cc_activa_ids": cc_activa_ids,
     })
 
 
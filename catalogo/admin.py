@@ -50,6 +50,7 @@ class VarianteAdmin(admin.ModelAdmin):
 
 @admin.register(StockSucursal)
 class StockSucursalAdmin(admin.ModelAdmin):
-    list_display = ("sucursal", "variante", "cantidad", "updated_at")
-    list_filter = ("sucursal",)
+    list_display = ("sucursal", "variante", "cantidad", "minimo", "bajo_minimo", "updated_at")
+    list_filter = ("sucursal", "bajo_minimo")
+    readonly_fields = ("bajo_minimo",)
     search_fields = ("variante__sku", "variante__producto__nombre")
@@ -91,4 +91,4 @@ class GeneradorVariantesForm(forms.Form):
 class StockSucursalForm(forms.ModelForm):
     class Meta:
         model = StockSucursal
-        fields = ["sucursal", "cantidad"]
+        fields = ["sucursal", "cantidad", "minimo"]
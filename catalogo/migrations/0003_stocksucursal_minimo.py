@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0002_alter_variante_codigo_barras'),
+        ('core', '0002_appsetting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stocksucursal',
+            name='bajo_minimo',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='stocksucursal',
+            name='minimo',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='stocksucursal',
+            index=models.Index(fields=['bajo_minimo', 'sucursal'], name='catalogo_st_bajo_mi_547f88_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:10
+
+from django.db import migrations
+from django.db.models import F
+
+
+def backfill_bajo_minimo(apps, schema_editor):
+    StockSucursal = apps.get_model("catalogo", "StockSucursal")
+    StockSucursal.objects.filter(cantidad__gt=F("minimo")).update(bajo_minimo=False)
+    StockSucursal.objects.filter(cantidad__lte=F("minimo")).update(bajo_minimo=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0003_stocksucursal_minimo'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_bajo_minimo, migrations.RunPython.noop),
+    ]
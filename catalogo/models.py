@@ -1,8 +1,8 @@
 from django.db import models
-from core.models import Sucursal
+from core.models import InvalidaReferenciaMixin, Sucursal
 
 
-class Categoria(models.Model):
+class Categoria(InvalidaReferenciaMixin, models.Model):
     nombre = models.CharField(max_length=80, unique=True)
     activa = models.BooleanField(default=True)
 
@@ -10,7 +10,7 @@ class Categoria(models.Model):
         return self.nombre
 
 
-class Producto(models.Model):
+class Producto(InvalidaReferenciaMixin, models.Model):
     # Producto “base” (sin talle/color). Las variantes cuelgan de acá.
     nombre = models.CharField(max_length=150)
     descripcion = models.TextField(blank=True)
@@ -31,7 +31,7 @@ class Producto(models.Model):
         return self.nombre
 
 
-class Atributo(models.Model):
+class Atributo(InvalidaReferenciaMixin, models.Model):
     # Ej: "Talle", "Color", "Material"
     nombre = models.CharField(max_length=60, unique=True)
     activo = models.BooleanField(default=True)
@@ -40,7 +40,7 @@ class Atributo(models.Model):
         return self.nombre
 
 
-class AtributoValor(models.Model):
+class AtributoValor(InvalidaReferenciaMixin, models.Model):
     # Ej: atributo="Talle" valor="M"
     atributo = models.ForeignKey(Atributo, on_delete=models.CASCADE, related_name="valores")
     valor = models.CharField(max_length=60)
@@ -101,6 +101,10 @@ class StockSucursal(models.Model):
     variante = models.ForeignKey(Variante, on_delete=models.CASCADE)
 
     cantidad = models.IntegerField(default=0)
+    # Mínimo de reposición para esta sucursal (0 = solo avisar cuando se agota).
+    minimo = models.PositiveIntegerField(default=0)
+    # Se mantiene en save(): los reportes de stock bajo leen solo filas marcadas.
+    bajo_minimo = models.BooleanField(default=True)
 
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -109,7 +113,20 @@ class StockSucursal(models.Model):
         indexes = [
             models.Index(fields=["sucursal", "variante"]),
             models.Index(fields=["variante"]),
+            models.Index(fields=["bajo_minimo", "sucursal"]),
         ]
 
+    @staticmethod
+    def calcular_bajo_minimo(cantidad, minimo) -> bool:
+        return int(cantidad or 0) <= int(minimo or 0)
+
+    def save(self, *args, **kwargs):
+        self.bajo_minimo = self.calcular_bajo_minimo(self.cantidad, self.minimo)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = set(update_fields) | {"bajo_minimo"}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.sucursal.nombre} - {self.variante.sku}: {self.cantidad}"
@@ -1,3 +1,31 @@
 from django.test import TestCase
 
-# Create your tests here.
+from catalogo.models import Producto, StockSucursal, Variante
+from core.models import Sucursal
+
+
+class StockBajoMinimoTests(TestCase):
+    def setUp(self):
+        self.sucursal = Sucursal.objects.create(nombre="Centro")
+        producto = Producto.objects.create(nombre="Jean")
+        self.variante = Variante.objects.create(producto=producto, sku="JEAN-40")
+
+    def test_flag_se_mantiene_en_cada_escritura(self):
+        stock, _ = StockSucursal.objects.update_or_create(
+            sucursal=self.sucursal,
+            variante=self.variante,
+            defaults={"cantidad": 10, "minimo": 3},
+        )
+        self.assertFalse(stock.bajo_minimo)
+
+        stock.cantidad = 3
+        stock.save(update_fields=["cantidad"])
+        stock.refresh_from_db()
+        self.assertTrue(stock.bajo_minimo)
+
+        StockSucursal.objects.update_or_create(
+            sucursal=self.sucursal,
+            variante=self.variante,
+            defaults={"cantidad": 4},
+        )
+        self.assertFalse(StockSucursal.objects.get(pk=stock.pk).bajo_minimo)
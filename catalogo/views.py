@@ -4,9 +4,8 @@ from itertools import product as cartesian_product
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
-from django.db.models import Count, Sum
+from django.db.models import Sum
 from django.db.models.deletion import ProtectedError
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
@@ -15,7 +14,10 @@ from django.template.loader import render_to_string
 from django.views.decorators.clickjacking import xframe_options_sameorigin
 from django.views.decorators.http import require_http_methods
 
+from core import referencia
+from core.autorizacion import autorizacion, usuario_tiene_permiso
 from core.models import Sucursal
+from core.reintentos import con_reintentos
 
 from .forms import (
     CategoriaForm,
@@ -45,13 +47,20 @@ def _is_htmx(request) -> bool:
 
 
 def _get_or_create_atributo(nombre: str) -> Atributo:
-    """Obtiene o crea un Atributo (ej: Talle, Color)."""
+    """Obtiene o crea un Atributo (ej: Talle, Color). Los existentes salen de la foto de referencia."""
+    atributo_id = referencia.atributo_id(nombre)
+    if atributo_id is not None:
+        return Atributo(id=atributo_id, nombre=nombre)
     obj, _ = Atributo.objects.get_or_create(nombre=nombre, defaults={"activo": True})
     return obj
 
 
 def _get_or_create_valor(atributo: Atributo, valor: str) -> AtributoValor:
-    """Obtiene o crea un AtributoValor (ej: Talle=M)."""
+    """Obtiene o crea un AtributoValor (ej: Talle=M). Los existentes salen de la foto de referencia."""
+    existente = referencia.atributo_valor(atributo.id, valor)
+    if existente is not None:
+        valor_id, activo = existente
+        return AtributoValor(id=valor_id, atributo=atributo, valor=valor, activo=activo)
     obj, _ = AtributoValor.objects.get_or_create(
         atributo=atributo,
         valor=valor,
@@ -256,23 +265,12 @@ def productos(request):
             active_tab = "categorias"
             open_categoria_modal = True
 
-    can_access_admin_panel = request.user.is_superuser or request.user.has_perm(
-        "admin_panel.view_usuarioperfil"
-    )
-    can_access_caja = request.user.is_superuser or request.user.has_perm("ventas.usar_caja_pos")
-    sucursal_nav = None
-    try:
-        profile = request.user.panel_profile
-        if getattr(profile, "sucursal_id", None):
-            sucursal_nav = profile.sucursal
-    except ObjectDoesNotExist:
-        sucursal_nav = None
-    except Exception:
-        sucursal_nav = None
-
-    categorias = (
-        Categoria.objects.annotate(productos_count=Count("producto")).order_by("-activa", "nombre")
-    )
+    can_access_admin_panel = usuario_tiene_permiso(request.user, "admin_panel.view_usuarioperfil")
+    can_access_caja = usuario_tiene_permiso(request.user, "ventas.usar_caja_pos")
+    snapshot = autorizacion(request.user)
+    sucursal_nav = snapshot.sucursal_obj() if snapshot else None
+
+    categorias = referencia.categorias()
     productos = Producto.objects.select_related("categoria").order_by("-created_at")[:100]
     return render(
         request,
@@ -610,16 +608,22 @@ def variante_stock_detalle(request, variante_id: int):
     """Modal: muestra stock por sucursal de una variante."""
     variante = get_object_or_404(Variante.objects.select_related("producto"), pk=variante_id)
 
-    sucursales = Sucursal.objects.filter(activa=True).order_by("nombre")
+    sucursales = referencia.sucursales()
     stocks = StockSucursal.objects.filter(variante=variante).select_related("sucursal")
-    stock_map = {s.sucursal_id: s.cantidad for s in stocks}
+    stock_map = {s.sucursal_id: s for s in stocks}
 
     rows = []
     total = 0
     for s in sucursales:
-        qty = int(stock_map.get(s.id, 0))
+        stock = stock_map.get(s.id)
+        qty = int(stock.cantidad) if stock else 0
         total += qty
-        rows.append({"sucursal": s, "cantidad": qty})
+        rows.append({
+            "sucursal": s,
+            "cantidad": qty,
+            "minimo": int(stock.minimo) if stock else 0,
+            "bajo_minimo": stock.bajo_minimo if stock else True,
+        })
 
     return render(
         request,
@@ -631,10 +635,11 @@ def variante_stock_detalle(request, variante_id: int):
 @login_required
 @require_http_methods(["POST"])
 def variante_stock_set(request):
-    """HTMX: setea stock (variante + sucursal) y refresca panel para actualizar stock total."""
+    """HTMX: setea stock (y mínimo, si viene) de variante + sucursal y refresca panel para actualizar stock total."""
     variante_id = request.POST.get("variante_id")
     sucursal_id = request.POST.get("sucursal_id")
     cantidad = request.POST.get("cantidad")
+    minimo = request.POST.get("minimo")
 
     if not variante_id or not sucursal_id:
         return HttpResponse("Faltan datos", status=400)
@@ -647,13 +652,25 @@ def variante_stock_set(request):
     if qty < 0:
         return HttpResponse("Cantidad inválida", status=400)
 
+    defaults = {"cantidad": qty}
+    if minimo is not None and str(minimo).strip() != "":
+        try:
+            minimo_int = int(minimo)
+        except ValueError:
+            return HttpResponse("Mínimo inválido", status=400)
+        if minimo_int < 0:
+            return HttpResponse("Mínimo inválido", status=400)
+        defaults["minimo"] = minimo_int
+
     variante = get_object_or_404(Variante, pk=variante_id)
     sucursal = get_object_or_404(Sucursal, pk=sucursal_id, activa=True)
 
-    StockSucursal.objects.update_or_create(
+    con_reintentos(
+        StockSucursal.objects.update_or_create,
         variante=variante,
         sucursal=sucursal,
-        defaults={"cantidad": qty},
+        defaults=defaults,
+        operacion="stock",
     )
 
     resp = _render_variantes_panel(request, variante.producto_id)
@@ -752,10 +769,12 @@ def stock_set(request):
     sucursal = get_object_or_404(Sucursal, pk=sucursal_id, activa=True)
     variante = get_object_or_404(Variante, pk=variante_id)
 
-    obj, _ = StockSucursal.objects.update_or_create(
+    obj, _ = con_reintentos(
+        StockSucursal.objects.update_or_create,
         sucursal=sucursal,
         variante=variante,
         defaults={"cantidad": cantidad_int},
+        operacion="stock",
     )
 
     return HttpResponse(f"{obj.cantidad}")
@@ -769,10 +788,15 @@ def stock_modal(request, variante_id: int):
     form = StockSucursalForm(request.POST or None)
 
     if request.method == "POST" and form.is_valid():
-        StockSucursal.objects.update_or_create(
+        con_reintentos(
+            StockSucursal.objects.update_or_create,
             variante=variante,
             sucursal=form.cleaned_data["sucursal"],
-            defaults={"cantidad": form.cleaned_data["cantidad"]},
+            defaults={
+                "cantidad": form.cleaned_data["cantidad"],
+                "minimo": form.cleaned_data["minimo"],
+            },
+            operacion="stock",
         )
         resp = _render_variantes_panel(request, variante.producto_id)
         resp.headers["HX-Trigger"] = "closeModal"
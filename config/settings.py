@@ -110,7 +110,71 @@ def _build_database_config() -> dict:
     db["CONN_MAX_AGE"] = _env_int("DB_CONN_MAX_AGE", 60)
     db["CONN_HEALTH_CHECKS"] = _env_bool("DB_CONN_HEALTH_CHECKS", True)
 
-    return {"default": db}
+    # Pool de conexiones por worker (core.db.mysql_pool): conexiones TLS ya
+    # abiertas, calentadas al bootear y mantenidas con keepalive.
+    if _env_bool("DB_POOL", True):
+        db["ENGINE"] = "core.db.mysql_pool"
+        db["POOL"] = {
+            "minimo": _env_int("DB_POOL_MIN", 2),
+            "maximo": _env_int("DB_POOL_MAX", 4),
+            "keepalive": _env_int("DB_POOL_KEEPALIVE", 45),
+            "vida_max": _env_int("DB_POOL_VIDA_MAX", 1800),
+        }
+        # Al terminar cada request la conexión vuelve al pool (no queda atada al hilo)
+        # y el keepalive reemplaza al health check por request.
+        db["CONN_MAX_AGE"] = _env_int("DB_CONN_MAX_AGE", 0)
+        db["CONN_HEALTH_CHECKS"] = _env_bool("DB_CONN_HEALTH_CHECKS", False)
+
+    databases = {"default": db}
+    reportes = _build_reportes_config(db)
+    if reportes:
+        databases[DB_REPORTES_ALIAS] = reportes
+    return databases
+
+
+DB_REPORTES_ALIAS = "reportes"
+
+
+def _build_reportes_config(default: dict) -> dict | None:
+    """
+    Base de solo lectura para reportes (core.db.replica):
+    - DB_REPORTES_URL=mysql://... (réplica) o sqlite:///ruta (pruebas locales)
+    - DB_REPORTES_STALE_SEGUNDOS=N: misma TiDB con stale read de N segundos
+      (lee de cualquier réplica TiKV sin competir con las escrituras del POS).
+    Sin ninguna de las dos no hay alias y todo se lee de "default".
+    """
+    url = os.getenv("DB_REPORTES_URL", "").strip()
+    stale = _env_int("DB_REPORTES_STALE_SEGUNDOS", 0)
+    if not url and stale <= 0:
+        return None
+
+    db = {**default, "OPTIONS": dict(default.get("OPTIONS") or {})}
+    if url:
+        parsed = urlparse(url)
+        scheme = (parsed.scheme or "").lower()
+        if scheme.startswith("sqlite"):
+            return {
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": parsed.path or ":memory:",
+                "TEST": {"MIRROR": "default"},
+            }
+        if not scheme.startswith("mysql"):
+            raise RuntimeError("DB_REPORTES_URL debe ser mysql://... o sqlite:///...")
+        db.update(
+            {
+                "NAME": (parsed.path or "/").lstrip("/") or default["NAME"],
+                "USER": _strip_wrapping_quotes(unquote(parsed.username or "")) or default["USER"],
+                "PASSWORD": unquote(parsed.password or "") or default["PASSWORD"],
+                "HOST": parsed.hostname or default["HOST"],
+                "PORT": str(parsed.port or default["PORT"]),
+            }
+        )
+    if stale > 0:
+        db["OPTIONS"]["init_command"] = f"SET SESSION tidb_read_staleness = -{stale}"
+
+    # En tests es la misma base que default (no se crea otra).
+    db["TEST"] = {"MIRROR": "default"}
+    return db
 
 
 # Quick-start development settings - unsuitable for production
@@ -167,6 +231,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.db.replica.PrimariaTrasEscrituraMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -206,6 +271,73 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 DATABASES = _build_database_config()
 
+# Lecturas de reportes a la réplica solo en las vistas marcadas (core.db.replica).
+DATABASE_ROUTERS = ["core.db.replica.ReplicaRouter"]
+# Segundos que un usuario sigue leyendo de la primaria después de escribir.
+DB_REPORTES_PRIMARIA_SEGUNDOS = _env_int("DB_REPORTES_PRIMARIA_SEGUNDOS", 10)
+
+# Cache compartido entre workers de gunicorn (en disco) para que la
+# invalidación de KPIs al confirmar una venta la vean todos los procesos.
+# En desarrollo alcanza con memoria local.
+CACHE_DIR = os.getenv("DJANGO_CACHE_DIR", "").strip()
+if CACHE_DIR or not DEBUG:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": CACHE_DIR or "/tmp/ventas-ropa-cache",
+            "TIMEOUT": 300,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "ventas-ropa",
+        }
+    }
+
+DASHBOARD_KPIS_TTL = _env_int("DASHBOARD_KPIS_TTL", 60)
+
+# Reportes en segundo plano (admin_panel.reportes): hilos por worker, segundos
+# antes de relanzar un job colgado y de reintentar uno con error, rango (días)
+# desde el que Balances se calcula en segundo plano y vida del resultado para
+# rangos cerrados en el pasado / que incluyen hoy.
+REPORTES_WORKERS = _env_int("REPORTES_WORKERS", 1)
+REPORTES_JOB_TIMEOUT = _env_int("REPORTES_JOB_TIMEOUT", 300)
+REPORTES_ERROR_REINTENTO = _env_int("REPORTES_ERROR_REINTENTO", 60)
+REPORTES_DIAS_SEGUNDO_PLANO = _env_int("REPORTES_DIAS_SEGUNDO_PLANO", 31)
+REPORTES_TTL_CERRADO = _env_int("REPORTES_TTL_CERRADO", 60 * 60 * 24)
+REPORTES_TTL_ABIERTO = _env_int("REPORTES_TTL_ABIERTO", 60 * 10)
+
+# Foto de permisos/sucursal por usuario (core.autorizacion). Admin Panel la
+# invalida al editar; el TTL cubre cambios hechos por fuera (admin de Django).
+AUTORIZACION_TTL = _env_int("AUTORIZACION_TTL", 300)
+
+# Tickets ya armados (HTML / ESC/POS) de ventas confirmadas.
+TICKET_CACHE_TTL = _env_int("TICKET_CACHE_TTL", 7 * 24 * 3600)
+# Columnas de la térmica: 42 para 80 mm (fuente A), 32 para 58 mm.
+TICKET_ESCPOS_ANCHO = _env_int("TICKET_ESCPOS_ANCHO", 42)
+
+# Idempotencia del confirmar del POS: segundos antes de considerar colgado un
+# confirmar "en curso" y días de retención para caja_purgar_confirmaciones.
+CAJA_CONFIRMACION_TIMEOUT = _env_int("CAJA_CONFIRMACION_TIMEOUT", 120)
+CAJA_CONFIRMACION_RETENCION_DIAS = _env_int("CAJA_CONFIRMACION_RETENCION_DIAS", 2)
+# Ventas en espera (carritos suspendidos) que puede tener cada cajero.
+CAJA_ESPERA_MAX = _env_int("CAJA_ESPERA_MAX", 10)
+# Grilla de favoritos del POS (caja_favoritos): ventana de ventas en días y
+# cantidad de teclas por sucursal.
+CAJA_FAVORITOS_DIAS = _env_int("CAJA_FAVORITOS_DIAS", 60)
+CAJA_FAVORITOS_CANTIDAD = _env_int("CAJA_FAVORITOS_CANTIDAD", 24)
+
+# Reintentos ante conflictos de escritura de TiDB/MySQL (core.reintentos).
+DB_REINTENTOS_MAX = _env_int("DB_REINTENTOS_MAX", 4)
+DB_REINTENTOS_BASE_MS = _env_int("DB_REINTENTOS_BASE_MS", 50)
+DB_REINTENTOS_TOPE_MS = _env_int("DB_REINTENTOS_TOPE_MS", 1000)
+
+# Libro IVA Ventas (ventas.libro_iva): días después de fin de mes en que el
+# mes se da por cerrado y su libro queda cacheado sin vencimiento.
+LIBRO_IVA_DIAS_CIERRE = _env_int("LIBRO_IVA_DIAS_CIERRE", 5)
+
 
 
 
@@ -0,0 +1,136 @@
+"""
+Arranque rápido del servicio (start.sh + gunicorn.conf.py).
+
+- `manage.py arranque` corre migrate solo si cambiaron las migraciones desde
+  el último arranque (huella guardada en AppSetting) y el bootstrap de
+  superusuario solo si cambiaron sus variables.
+- Con preload_app, `precargar()` corre en el master de gunicorn antes del fork:
+  URLs, vistas y templates quedan importados/compilados y los workers los
+  heredan ya listos.
+"""
+
+import hashlib
+import logging
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError
+
+from core.models import AppSetting
+
+logger = logging.getLogger(__name__)
+
+HUELLA_MIGRACIONES_KEY = "sistema.migraciones_huella"
+HUELLA_SUPERUSUARIO_KEY = "sistema.superusuario_huella"
+
+_PRECARGAS = []
+
+
+@contextmanager
+def medir(fase: str, tiempos: dict):
+    """Acumula en tiempos[fase] los segundos del bloque."""
+    inicio = time.monotonic()
+    try:
+        yield
+    finally:
+        tiempos[fase] = tiempos.get(fase, 0.0) + (time.monotonic() - inicio)
+
+
+def formatear_tiempos(tiempos: dict) -> str:
+    return " ".join(f"{fase}={segundos * 1000:.0f}ms" for fase, segundos in tiempos.items())
+
+
+# ======================================================================
+# Migraciones
+# ======================================================================
+
+def huella_migraciones() -> str:
+    """sha256 de los archivos de migración de todas las apps instaladas (nombre + contenido)."""
+    h = hashlib.sha256()
+    for app_config in sorted(apps.get_app_configs(), key=lambda a: a.label):
+        carpeta = Path(app_config.path) / "migrations"
+        if not carpeta.is_dir():
+            continue
+        for archivo in sorted(carpeta.glob("*.py")):
+            h.update(f"{app_config.label}/{archivo.name}\0".encode())
+            h.update(archivo.read_bytes())
+    return h.hexdigest()
+
+
+def leer_huella(key: str):
+    """Huella guardada, o None si no hay (o la tabla todavía no existe)."""
+    try:
+        return AppSetting.objects.filter(key=key).values_list("value_str", flat=True).first()
+    except DatabaseError:
+        return None
+
+
+def guardar_huella(key: str, valor: str, descripcion: str = "") -> None:
+    AppSetting.objects.update_or_create(
+        key=key,
+        defaults={"value_str": valor, "description": descripcion},
+    )
+
+
+# ======================================================================
+# Precarga (master de gunicorn)
+# ======================================================================
+
+def registrar_precarga(func):
+    """Registra una función a correr en precargar() (datos de referencia, caches de proceso)."""
+    _PRECARGAS.append(func)
+    return func
+
+
+def _templates_propios():
+    """Nombres de los templates del proyecto (no los de paquetes instalados)."""
+    from django.template import engines
+
+    base = Path(settings.BASE_DIR).resolve()
+    nombres = set()
+    for engine in engines.all():
+        for carpeta in engine.template_dirs:
+            carpeta = Path(carpeta).resolve()
+            if not carpeta.is_dir() or base not in carpeta.parents:
+                continue
+            nombres.update(p.relative_to(carpeta).as_posix() for p in carpeta.rglob("*.html"))
+    return sorted(nombres)
+
+
+def precargar() -> dict:
+    """
+    Deja el proceso listo para atender: importa todas las vistas (URLconf),
+    compila los templates (quedan en el loader cacheado) y corre las precargas
+    registradas. Devuelve los tiempos por fase.
+    """
+    from django.db import connections
+    from django.template.loader import get_template
+    from django.urls import get_resolver
+
+    from core.db.pool import cerrar_pools
+
+    tiempos = {}
+    with medir("urls", tiempos):
+        get_resolver().url_patterns
+
+    with medir("templates", tiempos):
+        for nombre in _templates_propios():
+            try:
+                get_template(nombre)
+            except Exception:
+                logger.debug("No se pudo precompilar %s", nombre, exc_info=True)
+
+    for func in _PRECARGAS:
+        with medir(func.__name__, tiempos):
+            try:
+                func()
+            except Exception:
+                logger.warning("Precarga %s falló", func.__name__, exc_info=True)
+
+    # Las conexiones abiertas en el master no deben heredarse a los workers.
+    connections.close_all()
+    cerrar_pools()
+    return tiempos
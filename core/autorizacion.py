@@ -0,0 +1,120 @@
+"""
+Autorización cacheada por usuario (guards del POS, catálogo, dashboard y Admin Panel).
+
+`has_perm` carga permisos de usuario y de grupos (dos consultas) y la sucursal
+sale de panel_profile -> sucursal (otras dos), en cada request. Acá se arma una
+foto por usuario (permisos, sucursal asignada, flags) que vive en el cache
+compartido; los guards la leen sin tocar la base.
+
+Se invalida (versión global) cuando Admin Panel edita usuarios, roles, perfiles
+o sucursales. El TTL acota lo que cambie por otros caminos (admin de Django, shell).
+"""
+
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+_VERSION_KEY = "auth:snapshot:v"
+_SNAPSHOT_KEY = "auth:snapshot:{user_id}:{version}"
+_ATTR = "_autorizacion_snapshot"
+
+CAMPOS_SUCURSAL = ("id", "nombre", "direccion", "telefono", "activa")
+
+
+@dataclass(frozen=True)
+class Autorizacion:
+    user_id: int
+    is_active: bool
+    is_superuser: bool
+    permisos: frozenset
+    sucursal: dict | None = None   # {campo: valor} de CAMPOS_SUCURSAL
+
+    def tiene_permiso(self, perm: str) -> bool:
+        if not self.is_active:
+            return False
+        return self.is_superuser or perm in self.permisos
+
+    @property
+    def sucursal_id(self):
+        return self.sucursal["id"] if self.sucursal else None
+
+    @property
+    def sucursal_activa(self) -> bool:
+        return bool(self.sucursal and self.sucursal["activa"])
+
+    def sucursal_obj(self):
+        """Sucursal armada desde la foto (sin consulta); None si no tiene asignada."""
+        from core.models import Sucursal
+
+        if not self.sucursal:
+            return None
+        sucursal = Sucursal(**self.sucursal)
+        sucursal._state.adding = False
+        sucursal._state.db = "default"
+        return sucursal
+
+
+def _get_version() -> int:
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        cache.add(_VERSION_KEY, 1, timeout=None)
+        version = cache.get(_VERSION_KEY) or 1
+    return int(version)
+
+
+def invalidar_autorizaciones() -> None:
+    """Llamar (on_commit) después de editar usuarios, roles, perfiles o sucursales."""
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.set(_VERSION_KEY, 2, timeout=None)
+
+
+def _cargar(user) -> Autorizacion:
+    from admin_panel.models import UsuarioPerfil
+
+    permisos = frozenset() if user.is_superuser else frozenset(user.get_all_permissions())
+    sucursal = (
+        UsuarioPerfil.objects
+        .filter(user_id=user.pk, sucursal__isnull=False)
+        .values_list(*(f"sucursal__{campo}" for campo in CAMPOS_SUCURSAL))
+        .first()
+    )
+    return Autorizacion(
+        user_id=user.pk,
+        is_active=bool(user.is_active),
+        is_superuser=bool(user.is_superuser),
+        permisos=permisos,
+        sucursal=dict(zip(CAMPOS_SUCURSAL, sucursal)) if sucursal else None,
+    )
+
+
+def autorizacion(user):
+    """
+    Foto de autorización del usuario (None si no está autenticado).
+    Se memoriza en el propio user durante el request y deja cargado el cache
+    de permisos de Django, así que has_perm / {{ perms }} tampoco consultan.
+    """
+    if not user or not getattr(user, "is_authenticated", False):
+        return None
+    snapshot = getattr(user, _ATTR, None)
+    if snapshot is not None:
+        return snapshot
+
+    key = _SNAPSHOT_KEY.format(user_id=user.pk, version=_get_version())
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = _cargar(user)
+        cache.set(key, snapshot, timeout=int(getattr(settings, "AUTORIZACION_TTL", 300) or 300))
+
+    setattr(user, _ATTR, snapshot)
+    if not user.is_superuser:
+        # Mismo atributo que usa ModelBackend para cachear get_all_permissions.
+        user._perm_cache = set(snapshot.permisos)
+    return snapshot
+
+
+def usuario_tiene_permiso(user, perm: str) -> bool:
+    snapshot = autorizacion(user)
+    return bool(snapshot and user.is_active and snapshot.tiene_permiso(perm))
@@ -0,0 +1,54 @@
+"""
+Backend MySQL (PyMySQL) con pool de conexiones: ENGINE = "core.db.mysql_pool".
+
+Igual al backend de Django, salvo que abrir/cerrar la conexión la toma y la
+devuelve al pool del proceso (core.db.pool). La configuración va en
+DATABASES[alias]["POOL"] (ver config.settings._build_database_config).
+"""
+
+from pymysql.constants import SERVER_STATUS
+
+from django.db.backends.mysql.base import Database
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+
+from core.db.pool import PoolConexiones, obtener_pool
+
+
+def _conectar(conn_params):
+    connection = Database.connect(**conn_params)
+    # Mismo ajuste que el backend de Django (encoder de bytes de mysqlclient).
+    if connection.encoders.get(bytes) is bytes:
+        connection.encoders.pop(bytes)
+    return connection
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+    @property
+    def pool(self) -> PoolConexiones:
+        def crear():
+            params = self.get_connection_params()
+            return PoolConexiones(
+                lambda: _conectar(params),
+                alias=self.alias,
+                **(self.settings_dict.get("POOL") or {}),
+            )
+
+        return obtener_pool(self.alias, crear)
+
+    def get_new_connection(self, conn_params):
+        return self.pool.tomar()
+
+    def _reutilizable(self) -> bool:
+        conn = self.connection
+        if self.in_atomic_block or self.needs_rollback or not getattr(conn, "open", False):
+            return False
+        # Transacción abierta a mano (autocommit apagado sin atomic): no se presta a otro.
+        if not self.autocommit or (conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS):
+            return False
+        # Después de un error (ej. conflicto reintentado) se verifica antes de guardarla.
+        return not self.errors_occurred or self.is_usable()
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                return self.pool.devolver(self.connection, descartar=not self._reutilizable())
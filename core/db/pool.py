@@ -0,0 +1,313 @@
+"""
+Pool de conexiones a la base (TiDB / MySQL remoto con TLS).
+
+Abrir una conexión a TiDB Cloud cuesta TCP + TLS + auth: varios cientos de ms
+desde Render. El pool guarda conexiones ya abiertas por proceso (worker) y
+Django las toma y devuelve en lugar de abrir y cerrar (ver core.db.mysql_pool).
+
+- `minimo`: conexiones libres que se mantienen abiertas (calentadas al bootear).
+- `maximo`: tope de conexiones libres; las que sobran se cierran al devolverlas.
+  No limita las conexiones en uso (cada hilo de Django tiene la suya).
+- `keepalive`: cada cuántos segundos un hilo de fondo hace ping a las libres,
+  para que el servidor/proxy no las corte por inactividad.
+- `vida_max`: segundos tras los cuales una conexión se recicla.
+
+Las estadísticas de cada worker se publican en el cache; `manage.py db_pool`
+las muestra.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+_ESTADISTICAS_KEY = "db:pool:{alias}:{pid}"
+_WORKERS_KEY = "db:pool:workers"
+CAMPOS_ESTADISTICAS = (
+    "creadas",
+    "reusadas",
+    "devueltas",
+    "descartadas",
+    "vencidas",
+    "pings",
+    "pings_fallidos",
+    "errores_conexion",
+)
+
+
+class PoolConexiones:
+    """
+    Pool LIFO de conexiones DB-API: la última devuelta es la primera en salir
+    (la más "caliente"). Las conexiones deben tener ping(reconnect=False) y close().
+    """
+
+    def __init__(self, conectar, *, alias="default", minimo=1, maximo=4, keepalive=45, vida_max=1800):
+        self._conectar = conectar
+        self.alias = alias
+        self.minimo = max(int(minimo or 0), 0)
+        self.maximo = max(int(maximo or 0), self.minimo, 1)
+        self.keepalive = max(int(keepalive or 0), 0)
+        self.vida_max = max(int(vida_max or 0), 0)
+        self.pid = os.getpid()
+
+        self._lock = threading.Lock()
+        self._libres = []   # [(conn, creada, usada)]
+        self._en_uso = {}   # id(conn) -> creada
+        self._contadores = dict.fromkeys(CAMPOS_ESTADISTICAS, 0)
+        self._ms_conexion = 0.0
+        self._hilo = None
+        self._detener = threading.Event()
+
+    # ------------------------------------------------------------------
+    # internos
+    # ------------------------------------------------------------------
+
+    def _sumar(self, campo: str, cantidad: int = 1) -> None:
+        with self._lock:
+            self._contadores[campo] += cantidad
+
+    def _vencida(self, creada: float, ahora: float) -> bool:
+        return bool(self.vida_max) and (ahora - creada) >= self.vida_max
+
+    def _abrir(self):
+        inicio = time.monotonic()
+        try:
+            conn = self._conectar()
+        except Exception:
+            self._sumar("errores_conexion")
+            raise
+        with self._lock:
+            self._contadores["creadas"] += 1
+            self._ms_conexion += (time.monotonic() - inicio) * 1000
+        return conn
+
+    def _cerrar(self, conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            # Ya estaba cortada: no hay nada que cerrar.
+            pass
+
+    def _ping(self, conn) -> bool:
+        self._sumar("pings")
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            self._sumar("pings_fallidos")
+            return False
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def tomar(self):
+        """Conexión libre del pool (verificada si estuvo quieta) o una nueva."""
+        while True:
+            with self._lock:
+                if not self._libres:
+                    break
+                conn, creada, usada = self._libres.pop()
+            ahora = time.monotonic()
+            if self._vencida(creada, ahora):
+                self._sumar("vencidas")
+                self._cerrar(conn)
+                continue
+            # Si el keepalive no la tocó hace rato (hilo sin arrancar o atrasado), ping antes de usarla.
+            quieta = (ahora - usada) > (2 * self.keepalive if self.keepalive else 60)
+            if quieta and not self._ping(conn):
+                self._sumar("descartadas")
+                self._cerrar(conn)
+                continue
+            with self._lock:
+                self._en_uso[id(conn)] = creada
+                self._contadores["reusadas"] += 1
+            return conn
+
+        conn = self._abrir()
+        with self._lock:
+            self._en_uso[id(conn)] = time.monotonic()
+        return conn
+
+    def devolver(self, conn, *, descartar: bool = False) -> None:
+        """Vuelve la conexión al pool; se cierra si está sucia, vencida o sobra."""
+        ahora = time.monotonic()
+        with self._lock:
+            creada = self._en_uso.pop(id(conn), None)
+            guardar = (
+                not descartar
+                and creada is not None
+                and os.getpid() == self.pid
+                and not self._vencida(creada, ahora)
+                and len(self._libres) < self.maximo
+            )
+            if guardar:
+                self._libres.append((conn, creada, ahora))
+                self._contadores["devueltas"] += 1
+            else:
+                self._contadores["descartadas"] += 1
+        if not guardar:
+            self._cerrar(conn)
+
+    def calentar(self) -> int:
+        """Abre conexiones hasta tener `minimo` libres. Devuelve cuántas abrió."""
+        abiertas = 0
+        while True:
+            with self._lock:
+                if len(self._libres) >= self.minimo:
+                    break
+            try:
+                conn = self._abrir()
+            except Exception:
+                logger.warning("db pool %s: no se pudo abrir conexión", self.alias, exc_info=True)
+                break
+            ahora = time.monotonic()
+            with self._lock:
+                self._libres.insert(0, (conn, ahora, ahora))
+            abiertas += 1
+        return abiertas
+
+    def mantener(self) -> None:
+        """Una pasada de keepalive: ping a las libres quietas, recicla vencidas y repone el mínimo."""
+        ahora = time.monotonic()
+        with self._lock:
+            revisar = [c for c in self._libres if (ahora - c[2]) >= self.keepalive]
+            self._libres = [c for c in self._libres if (ahora - c[2]) < self.keepalive]
+
+        vivas = []
+        for conn, creada, usada in revisar:
+            if self._vencida(creada, ahora):
+                self._sumar("vencidas")
+                self._cerrar(conn)
+            elif self._ping(conn):
+                vivas.append((conn, creada, time.monotonic()))
+            else:
+                self._sumar("descartadas")
+                self._cerrar(conn)
+
+        with self._lock:
+            # Al fondo: las recién devueltas (más calientes) siguen saliendo primero.
+            self._libres[:0] = vivas
+        self.calentar()
+
+    def iniciar_keepalive(self) -> None:
+        if not self.keepalive or (self._hilo is not None and self._hilo.is_alive()):
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(
+            target=self._loop_keepalive,
+            name=f"db-pool-keepalive-{self.alias}",
+            daemon=True,
+        )
+        self._hilo.start()
+
+    def _loop_keepalive(self) -> None:
+        while not self._detener.wait(self.keepalive):
+            try:
+                self.mantener()
+                publicar_estadisticas(self)
+            except Exception:
+                logger.exception("db pool %s: error en keepalive", self.alias)
+
+    def cerrar(self) -> None:
+        self._detener.set()
+        with self._lock:
+            libres, self._libres = self._libres, []
+        for conn, _creada, _usada in libres:
+            self._cerrar(conn)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            fila = dict(self._contadores)
+            fila.update(
+                alias=self.alias,
+                pid=self.pid,
+                libres=len(self._libres),
+                en_uso=len(self._en_uso),
+                minimo=self.minimo,
+                maximo=self.maximo,
+                ms_conexion_promedio=(self._ms_conexion / fila["creadas"]) if fila["creadas"] else 0.0,
+            )
+        tomas = fila["creadas"] + fila["reusadas"]
+        fila["tasa_reuso"] = (fila["reusadas"] / tomas) if tomas else 0.0
+        return fila
+
+
+# ======================================================================
+# Registro por proceso
+# ======================================================================
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def obtener_pool(alias: str, crear) -> PoolConexiones:
+    """
+    Pool del alias para este proceso; `crear()` arma uno si no existe.
+    Después de un fork el pool heredado no se usa: sus sockets son del padre.
+    """
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None or pool.pid != os.getpid():
+            pool = crear()
+            _pools[alias] = pool
+        return pool
+
+
+def pools_activos() -> list:
+    pid = os.getpid()
+    with _pools_lock:
+        return [p for p in _pools.values() if p.pid == pid]
+
+
+def calentar_pools() -> int:
+    """
+    Abre las conexiones mínimas de cada alias con pool y arranca el keepalive.
+    Se llama al iniciar cada worker (gunicorn.conf.py).
+    """
+    from django.db import connections
+
+    total = 0
+    for alias in connections:
+        pool = getattr(connections[alias], "pool", None)
+        if pool is None:
+            continue
+        total += pool.calentar()
+        pool.iniciar_keepalive()
+        publicar_estadisticas(pool)
+    return total
+
+
+def cerrar_pools() -> None:
+    """Cierra las conexiones libres de este proceso (master de gunicorn antes del fork)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.cerrar()
+
+
+def publicar_estadisticas(pool: PoolConexiones) -> None:
+    """Deja las estadísticas del worker en el cache (vencen si el worker muere)."""
+    key = _ESTADISTICAS_KEY.format(alias=pool.alias, pid=pool.pid)
+    try:
+        cache.set(key, pool.estadisticas(), timeout=max(pool.keepalive * 3, 60))
+        workers = cache.get(_WORKERS_KEY) or []
+        if key not in workers:
+            cache.set(_WORKERS_KEY, [*workers, key][-50:], timeout=None)
+    except Exception:
+        logger.debug("No se pudieron publicar las estadísticas del pool", exc_info=True)
+
+
+def estadisticas_pool() -> list:
+    """Estadísticas publicadas por los workers vivos (una fila por worker y alias)."""
+    keys = cache.get(_WORKERS_KEY) or []
+    valores = cache.get_many(keys)
+    vivas = [k for k in keys if k in valores]
+    if len(vivas) != len(keys):
+        cache.set(_WORKERS_KEY, vivas, timeout=None)
+    return [valores[k] for k in vivas]
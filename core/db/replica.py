@@ -0,0 +1,132 @@
+"""
+Lecturas de reportes contra una base de solo lectura (réplica o TiDB stale read).
+
+Solo se desvían las lecturas hechas dentro de una vista marcada con
+@lectura_reportes (o del bloque `with leer_de_reportes():`). Todo lo demás
+-POS, caja, escrituras- va a "default" como siempre.
+
+Lectura de lo propio: dentro del bloque, si ya se escribió o hay una
+transacción abierta se vuelve a "default"; y el middleware deja una cookie
+corta al usuario que escribió, para que el listado al que lo redirigen no
+muestre datos viejos.
+
+Lo que se guarda en un cache con versión (KPIs, antigüedad de saldos) se
+calcula siempre en la primaria (`with leer_de_primaria():`): la versión sube
+al confirmar la escritura y la réplica todavía puede no tenerla.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+_en_reportes = contextvars.ContextVar("db_en_reportes", default=False)
+_escribio = contextvars.ContextVar("db_escribio", default=False)
+
+COOKIE_PRIMARIA = "db_primaria"
+
+# Siempre desde la primaria: sesiones/usuarios y tablas de coordinación (jobs, tokens).
+APPS_SOLO_PRIMARIA = frozenset({"auth", "sessions", "contenttypes", "admin", "admin_panel"})
+
+
+def _alias_reportes():
+    alias = getattr(settings, "DB_REPORTES_ALIAS", "reportes")
+    return alias if alias in settings.DATABASES else None
+
+
+@contextmanager
+def leer_de_reportes():
+    """
+    Las lecturas del bloque van a la base de reportes (si está configurada)
+    hasta que el propio bloque escriba algo.
+    """
+    token = _en_reportes.set(True)
+    token_escribio = _escribio.set(False)
+    try:
+        yield
+    finally:
+        escribio = _escribio.get()
+        _escribio.reset(token_escribio)
+        _en_reportes.reset(token)
+        if escribio:
+            _escribio.set(True)
+
+
+@contextmanager
+def leer_de_primaria():
+    """Las lecturas del bloque van a "default" aunque esté dentro de leer_de_reportes()."""
+    token = _en_reportes.set(False)
+    try:
+        yield
+    finally:
+        _en_reportes.reset(token)
+
+
+def _iterar_en_reportes(contenido):
+    # Las exportaciones streaming consultan mientras se envía la respuesta, ya
+    # fuera de la vista: cada chunk se arma dentro del bloque.
+    it = iter(contenido)
+    while True:
+        with leer_de_reportes():
+            try:
+                chunk = next(it)
+            except StopIteration:
+                return
+        yield chunk
+
+
+def lectura_reportes(view_func):
+    """Decorador para vistas de solo lectura (listados, balances, exportaciones)."""
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or request.COOKIES.get(COOKIE_PRIMARIA):
+            return view_func(request, *args, **kwargs)
+        with leer_de_reportes():
+            response = view_func(request, *args, **kwargs)
+        if getattr(response, "streaming", False):
+            response.streaming_content = _iterar_en_reportes(response.streaming_content)
+        return response
+
+    return _wrapped
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _en_reportes.get() or _escribio.get():
+            return None
+        if model._meta.app_label in APPS_SOLO_PRIMARIA:
+            return None
+        alias = _alias_reportes()
+        if alias is None or connections["default"].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        _escribio.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica y primaria tienen los mismos datos.
+        return True
+
+
+class PrimariaTrasEscrituraMiddleware:
+    """Si el request escribió, el usuario lee de la primaria por unos segundos."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _escribio.set(False)
+        try:
+            response = self.get_response(request)
+            escribio = _escribio.get()
+        finally:
+            _escribio.reset(token)
+
+        segundos = int(getattr(settings, "DB_REPORTES_PRIMARIA_SEGUNDOS", 10) or 0)
+        if escribio and segundos and _alias_reportes():
+            response.set_cookie(COOKIE_PRIMARIA, "1", max_age=segundos, httponly=True, samesite="Lax")
+        return response
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import lru_cache
 from typing import Iterable
 
 from core.models import AppSetting
@@ -13,6 +14,10 @@ ONE = Decimal("1")
 HUNDRED = Decimal("100")
 IVA_GENERAL_PCT = Decimal("21.00")
 
+# Desgloses (monto, alicuota) memorizados por proceso: precios y subtotales
+# de una tienda se repiten mucho entre renders.
+DESGLOSE_CACHE_SIZE = 4096
+
 
 class CondicionFiscalEmpresa:
     """
@@ -83,6 +88,30 @@ def money(value) -> Decimal:
     return _to_decimal(value).quantize(MONEY_QUANT, rounding=ROUND_HALF_UP)
 
 
+def parse_decimal_ar(raw) -> Decimal | None:
+    """
+    Importe tipeado en formato AR ("$ 23.648,00" -> 23648.00). None si no es un número.
+    """
+    s = str(raw or "").strip().replace("$", "").replace(" ", "")
+
+    # Caso típico AR: 23.648,00  -> 23648.00
+    if "," in s and "." in s:
+        s = s.replace(".", "").replace(",", ".")
+    elif "," in s:
+        s = s.replace(",", ".")
+
+    allowed = set("0123456789.-")
+    s = "".join(ch for ch in s if ch in allowed)
+
+    if s in ("", "-", ".", "-."):
+        return None
+
+    try:
+        return Decimal(s).quantize(MONEY_QUANT)
+    except InvalidOperation:
+        return None
+
+
 def normalizar_condicion_fiscal_empresa(
     value: str | None,
     *,
@@ -209,6 +238,65 @@ def desglosar_monto_final_gravado_con_iva(
     )
 
 
+def centavos(value) -> int:
+    """Monto redondeado igual que money(), en centavos enteros."""
+    if not isinstance(value, Decimal):
+        value = _to_decimal(value)
+    return int(value.quantize(MONEY_QUANT, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def _dividir_half_up(numerador: int, divisor: int) -> int:
+    cociente, resto = divmod(numerador, divisor)
+    return cociente + (1 if 2 * resto >= divisor else 0)
+
+
+@lru_cache(maxsize=DESGLOSE_CACHE_SIZE)
+def _desglose_centavos(total: int, alicuota: int) -> DesgloseFiscalMonto:
+    """
+    Mismo resultado que desglosar_monto_final_gravado_con_iva, en enteros:
+    neto = total / (1 + alicuota/100) con ROUND_HALF_UP, con total en centavos
+    y alicuota en centesimos de punto (21,00 % -> 2100).
+    """
+    if total < 0:
+        raise ValueError("El monto final no puede ser negativo.")
+    if alicuota < 0:
+        raise ValueError("La alicuota de IVA no puede ser negativa.")
+
+    neto = total
+    if alicuota and total:
+        neto = _dividir_half_up(total * 10000, 10000 + alicuota)
+
+    return DesgloseFiscalMonto(
+        monto_final=Decimal(total).scaleb(-2),
+        monto_sin_impuestos_nacionales=Decimal(neto).scaleb(-2),
+        iva_contenido=Decimal(total - neto).scaleb(-2),
+        iva_alicuota_pct=Decimal(alicuota).scaleb(-2),
+        otros_impuestos_nacionales_indirectos=ZERO,
+    )
+
+
+def desglosar_centavos(
+    montos_centavos: Iterable[int],
+    *,
+    iva_alicuota_pct=IVA_GENERAL_PCT,
+) -> list[DesgloseFiscalMonto]:
+    """
+    Desglose de varios montos finales (en centavos) de una vez, con la misma
+    alicuota. Los resultados son inmutables y se comparten desde el cache.
+    """
+    alicuota = centavos(iva_alicuota_pct)
+    return [_desglose_centavos(int(monto), alicuota) for monto in montos_centavos]
+
+
+def desglosar_montos_finales(
+    montos: Iterable,
+    *,
+    iva_alicuota_pct=IVA_GENERAL_PCT,
+) -> list[DesgloseFiscalMonto]:
+    """desglosar_monto_final_gravado_con_iva para una lista de montos (Decimal/str)."""
+    return desglosar_centavos((centavos(m) for m in montos), iva_alicuota_pct=iva_alicuota_pct)
+
+
 def sumar_desgloses_fiscales(desgloses: Iterable[DesgloseFiscalMonto]) -> ResumenFiscalMontos:
     total_final = ZERO
     total_sin_impuestos = ZERO
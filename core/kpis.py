@@ -0,0 +1,130 @@
+"""
+KPIs del dashboard (ventas del día, stock bajo y caja).
+
+Los valores se cachean por alcance (todas las sucursales o una sucursal) con
+TTL corto. Cada confirmación de venta sube la versión de su
+sucursal y la global, así que el próximo pedido recalcula sin esperar al TTL.
+"""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from core.db.replica import leer_de_primaria
+
+_VERSION_KEY = "dashboard:kpis:v:{scope}"
+_KPIS_KEY = "dashboard:kpis:{dia}:{scope}:{version}"
+
+
+def rango_dia_local(dia):
+    """
+    [inicio, fin) del día local como datetimes aware.
+    Filtrar por rango (y no por fecha__date) deja usar el índice de la columna.
+    """
+    tz = timezone.get_current_timezone()
+    inicio = timezone.make_aware(datetime.combine(dia, time.min), tz)
+    fin = timezone.make_aware(datetime.combine(dia + timedelta(days=1), time.min), tz)
+    return inicio, fin
+
+
+def _scope_sucursal(sucursal_id) -> str:
+    return f"suc{sucursal_id}" if sucursal_id else "all"
+
+
+def _get_version(scope: str) -> int:
+    key = _VERSION_KEY.format(scope=scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key) or 1
+    return int(version)
+
+
+def _bump_version(scope: str) -> None:
+    key = _VERSION_KEY.format(scope=scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+
+
+def invalidar_kpis(sucursal_id=None) -> None:
+    """Llamar después de confirmar una venta (on_commit)."""
+    if sucursal_id:
+        _bump_version(_scope_sucursal(sucursal_id))
+    _bump_version("all")
+
+
+def _calcular_kpis(*, dia, sucursal_id=None, incluir_stock=False) -> dict:
+    from caja.models import CajaSesionTotal
+    from catalogo.models import StockSucursal
+    from ventas.models import Venta, VentaPago
+
+    inicio, fin = rango_dia_local(dia)
+
+    qs = Venta.objects.filter(
+        estado=Venta.Estado.CONFIRMADA,
+        fecha__gte=inicio,
+        fecha__lt=fin,
+    )
+    if sucursal_id:
+        qs = qs.filter(sucursal_id=sucursal_id)
+
+    agg = qs.aggregate(cantidad=Count("id"), total=Sum("total"))
+    ventas_hoy = int(agg["cantidad"] or 0)
+    ingresos_hoy = Decimal(agg["total"] or 0).quantize(Decimal("0.01"))
+    ticket_promedio = (ingresos_hoy / ventas_hoy).quantize(Decimal("0.01")) if ventas_hoy else Decimal("0.00")
+
+    stock_bajo = 0
+    if incluir_stock:
+        # Solo filas marcadas (índice bajo_minimo, sucursal).
+        stock_qs = StockSucursal.objects.filter(
+            bajo_minimo=True,
+            variante__activo=True,
+            variante__producto__activo=True,
+        )
+        if sucursal_id:
+            stock_qs = stock_qs.filter(sucursal_id=sucursal_id)
+        stock_bajo = stock_qs.count()
+
+    # Efectivo en cajas abiertas (acumulados por sesión, sin recorrer ventas).
+    efectivo_qs = CajaSesionTotal.objects.filter(
+        sesion__cerrada_en__isnull=True,
+        tipo=VentaPago.Tipo.CONTADO,
+    )
+    if sucursal_id:
+        efectivo_qs = efectivo_qs.filter(sesion__sucursal_id=sucursal_id)
+    efectivo = Decimal(efectivo_qs.aggregate(s=Sum("monto"))["s"] or 0).quantize(Decimal("0.01"))
+
+    return {
+        "ventas_hoy": ventas_hoy,
+        "ingresos_hoy": ingresos_hoy,
+        "ticket_promedio": ticket_promedio,
+        "stock_bajo": stock_bajo,
+        "caja_efectivo": efectivo,
+    }
+
+
+def get_kpis(*, sucursal_id=None, incluir_stock=False) -> dict:
+    dia = timezone.localdate()
+    scope = _scope_sucursal(sucursal_id)
+    version = _get_version(scope)
+
+    cache_scope = f"{scope}:stock" if incluir_stock else scope
+
+    key = _KPIS_KEY.format(dia=dia.isoformat(), scope=cache_scope, version=version)
+    kpis = cache.get(key)
+    if kpis is None:
+        # Queda bajo la versión actual: no puede salir de una réplica atrasada.
+        with leer_de_primaria():
+            kpis = _calcular_kpis(
+                dia=dia,
+                sucursal_id=sucursal_id,
+                incluir_stock=incluir_stock,
+            )
+        cache.set(key, kpis, timeout=int(getattr(settings, "DASHBOARD_KPIS_TTL", 60) or 60))
+    return kpis
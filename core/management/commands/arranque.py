@@ -0,0 +1,90 @@
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils.crypto import salted_hmac
+
+from core.arranque import (
+    HUELLA_MIGRACIONES_KEY,
+    HUELLA_SUPERUSUARIO_KEY,
+    formatear_tiempos,
+    guardar_huella,
+    huella_migraciones,
+    leer_huella,
+    medir,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Preparación de la base al arrancar (start.sh): migrate solo si cambiaron las "
+        "migraciones y bootstrap de superusuario (DJANGO_SUPERUSER_*) solo si cambiaron "
+        "sus datos. Informa el tiempo de cada fase."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--forzar",
+            action="store_true",
+            help="Corre migrate y el bootstrap aunque las huellas no hayan cambiado.",
+        )
+
+    def handle(self, *args, **options):
+        forzar = options["forzar"]
+        tiempos = {}
+        inicio = time.monotonic()
+
+        with medir("huella", tiempos):
+            huella = huella_migraciones()
+            guardada = leer_huella(HUELLA_MIGRACIONES_KEY)
+
+        if forzar or huella != guardada:
+            with medir("migrate", tiempos):
+                call_command("migrate", interactive=False, verbosity=options["verbosity"])
+                guardar_huella(
+                    HUELLA_MIGRACIONES_KEY,
+                    huella,
+                    "Huella de las migraciones aplicadas en el último arranque.",
+                )
+        else:
+            self.stdout.write("[arranque] migraciones sin cambios: se omite migrate.")
+
+        with medir("superusuario", tiempos):
+            self._bootstrap_superusuario(forzar)
+
+        tiempos["total"] = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(f"[arranque] {formatear_tiempos(tiempos)}"))
+
+    def _bootstrap_superusuario(self, forzar: bool) -> None:
+        """
+        Bootstrap opcional de superusuario en entornos sin acceso a shell (ej. Render free).
+        set_password (PBKDF2) es caro: solo se repite si cambian las variables.
+        """
+        username = os.getenv("DJANGO_SUPERUSER_USERNAME", "")
+        email = os.getenv("DJANGO_SUPERUSER_EMAIL", "")
+        password = os.getenv("DJANGO_SUPERUSER_PASSWORD", "")
+        if not (username and email and password):
+            return
+
+        User = get_user_model()
+        huella = salted_hmac("arranque.superusuario", f"{username}\0{email}\0{password}").hexdigest()
+        if (
+            not forzar
+            and huella == leer_huella(HUELLA_SUPERUSUARIO_KEY)
+            and User.objects.filter(username=username, is_superuser=True).exists()
+        ):
+            return
+
+        user, _created = User.objects.get_or_create(
+            username=username,
+            defaults={"email": email, "is_staff": True, "is_superuser": True},
+        )
+        user.email = email
+        user.is_staff = True
+        user.is_superuser = True
+        user.set_password(password)
+        user.save()
+        guardar_huella(HUELLA_SUPERUSUARIO_KEY, huella, "Huella del bootstrap de superusuario.")
+        self.stdout.write(f"[bootstrap] superuser listo: {username}")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.db.pool import estadisticas_pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Muestra las estadísticas del pool de conexiones de cada worker vivo "
+        "(libres, en uso, creadas, reusadas, descartadas, pings y tiempo de conexión)."
+    )
+
+    def handle(self, *args, **options):
+        filas = estadisticas_pool()
+        if not filas:
+            self.stdout.write("Sin workers con pool publicados.")
+        for fila in filas:
+            self.stdout.write(
+                f"{fila['alias']} pid={fila['pid']}: libres={fila['libres']} en_uso={fila['en_uso']} "
+                f"creadas={fila['creadas']} reusadas={fila['reusadas']} tasa_reuso={fila['tasa_reuso']:.2%} "
+                f"descartadas={fila['descartadas']} vencidas={fila['vencidas']} "
+                f"pings={fila['pings']} pings_fallidos={fila['pings_fallidos']} "
+                f"errores_conexion={fila['errores_conexion']} "
+                f"ms_conexion={fila['ms_conexion_promedio']:.0f}"
+            )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from core.reintentos import metricas_reintentos, reiniciar_metricas
+
+
+class Command(BaseCommand):
+    help = (
+        "Muestra las métricas de reintentos por conflicto de escritura "
+        "(transacciones, intentos, conflictos, fallidas y tasa de conflicto) por operación."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Pone los contadores en cero después de mostrarlos.",
+        )
+
+    def handle(self, *args, **options):
+        metricas = metricas_reintentos()
+        if not metricas:
+            self.stdout.write("Sin transacciones registradas.")
+        for operacion, fila in metricas.items():
+            self.stdout.write(
+                f"{operacion}: transacciones={fila['transacciones']} intentos={fila['intentos']} "
+                f"conflictos={fila['conflictos']} fallidas={fila['fallidas']} "
+                f"tasa_conflicto={fila['tasa_conflicto']:.2%}"
+            )
+
+        if options["reset"]:
+            reiniciar_metricas()
+            self.stdout.write(self.style.SUCCESS("Contadores reiniciados."))
@@ -1,5 +1,28 @@
 from django.db import models
 
+
+class InvalidaReferenciaMixin:
+    """
+    Modelos incluidos en la foto de core.referencia: cada alta, edición o baja
+    la invalida en todos los workers.
+    """
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        _invalidar_referencia()
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        _invalidar_referencia()
+        return resultado
+
+
+def _invalidar_referencia():
+    from core.referencia import invalidar_referencia
+
+    invalidar_referencia()
+
+
 class AppSetting(models.Model):
     """
     Configuración del sistema (clave/valor).
@@ -15,7 +38,7 @@ class AppSetting(models.Model):
     def __str__(self):
         return self.key
 
-class Sucursal(models.Model):
+class Sucursal(InvalidaReferenciaMixin, models.Model):
     nombre = models.CharField(max_length=80, unique=True)
     direccion = models.CharField(max_length=150, blank=True)
     telefono = models.CharField(max_length=30, blank=True)
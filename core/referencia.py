@@ -0,0 +1,173 @@
+"""
+Datos de referencia: tablas chicas que casi no cambian (sucursales, planes de
+cuotas, categorías con su cantidad de productos y atributos/valores).
+
+Cada worker guarda una foto en memoria, cargada de una sola vez (con
+preload_app, ya en el master antes del fork). La foto lleva la versión del
+cache compartido: cualquier alta/edición/baja de esos modelos sube la versión
+(InvalidaReferenciaMixin) y el próximo acceso de cada worker recarga.
+
+Los helpers devuelven instancias de modelo nuevas en cada llamada (se pueden
+usar como FK o en templates sin consultar la base).
+"""
+
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from core.arranque import registrar_precarga
+
+_VERSION_KEY = "referencia:v"
+
+# (version, datos) del worker.
+_foto = (None, None)
+_lock = threading.Lock()
+
+CAMPOS_SUCURSAL = ("id", "nombre", "direccion", "telefono", "activa")
+CAMPOS_PLAN = ("id", "tarjeta", "cuotas", "recargo_pct", "activo")
+CAMPOS_CATEGORIA = ("id", "nombre", "activa")
+
+
+def _get_version() -> str:
+    # Token al azar (no un contador): si el cache se vacía, la foto vieja no coincide.
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        cache.add(_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(_VERSION_KEY)
+    return version
+
+
+def _bump_version() -> None:
+    cache.set(_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def invalidar_referencia() -> None:
+    """
+    Sube la versión ya y de nuevo al confirmar la transacción (si un worker
+    recargó en el medio, habría leído los datos sin el cambio).
+    """
+    _bump_version()
+    transaction.on_commit(_bump_version)
+
+
+def _cargar() -> dict:
+    from catalogo.models import Atributo, AtributoValor, Categoria
+    from core.models import Sucursal
+    from ventas.models import PlanCuotas
+
+    return {
+        "sucursales": list(Sucursal.objects.order_by("nombre", "id").values_list(*CAMPOS_SUCURSAL)),
+        "planes": list(
+            PlanCuotas.objects.filter(activo=True).order_by("tarjeta", "cuotas").values_list(*CAMPOS_PLAN)
+        ),
+        "categorias": list(
+            Categoria.objects
+            .annotate(productos_count=Count("producto"))
+            .order_by("-activa", "nombre")
+            .values_list(*CAMPOS_CATEGORIA, "productos_count")
+        ),
+        "atributos": dict(Atributo.objects.values_list("nombre", "id")),
+        "valores": {
+            (atributo_id, valor): (valor_id, activo)
+            for valor_id, atributo_id, valor, activo in AtributoValor.objects.values_list(
+                "id", "atributo_id", "valor", "activo"
+            )
+        },
+    }
+
+
+@registrar_precarga
+def referencia() -> dict:
+    """Foto vigente (recarga si otro proceso la invalidó)."""
+    global _foto
+    version = _get_version()
+    foto_version, datos = _foto
+    if foto_version == version and datos is not None:
+        return datos
+    with _lock:
+        foto_version, datos = _foto
+        if foto_version != version or datos is None:
+            datos = _cargar()
+            _foto = (version, datos)
+    return datos
+
+
+def _instancia(model, campos, valores):
+    obj = model(**dict(zip(campos, valores)))
+    obj._state.adding = False
+    obj._state.db = "default"
+    return obj
+
+
+# ======================================================================
+# Helpers por tabla
+# ======================================================================
+
+def sucursales(*, solo_activas: bool = True) -> list:
+    from core.models import Sucursal
+
+    return [
+        _instancia(Sucursal, CAMPOS_SUCURSAL, fila)
+        for fila in referencia()["sucursales"]
+        if fila[-1] or not solo_activas
+    ]
+
+
+def sucursal_activa(sucursal_id):
+    for sucursal in sucursales():
+        if sucursal.id == sucursal_id:
+            return sucursal
+    return None
+
+
+def nombres_sucursales() -> dict:
+    return {fila[0]: fila[1] for fila in referencia()["sucursales"]}
+
+
+def tarjetas() -> list:
+    """Tarjetas con al menos un plan activo, ordenadas."""
+    return sorted({fila[1] for fila in referencia()["planes"]})
+
+
+def planes_tarjeta(tarjeta: str) -> list:
+    from ventas.models import PlanCuotas
+
+    return [_instancia(PlanCuotas, CAMPOS_PLAN, fila) for fila in referencia()["planes"] if fila[1] == tarjeta]
+
+
+def plan_activo(plan_id):
+    """Plan activo por id (acepta str); None si no existe o está inactivo."""
+    from ventas.models import PlanCuotas
+
+    try:
+        plan_id = int(plan_id)
+    except (TypeError, ValueError):
+        return None
+    for fila in referencia()["planes"]:
+        if fila[0] == plan_id:
+            return _instancia(PlanCuotas, CAMPOS_PLAN, fila)
+    return None
+
+
+def categorias() -> list:
+    """Categorías (activas primero) con `productos_count`."""
+    from catalogo.models import Categoria
+
+    resultado = []
+    for *fila, productos_count in referencia()["categorias"]:
+        categoria = _instancia(Categoria, CAMPOS_CATEGORIA, fila)
+        categoria.productos_count = productos_count
+        resultado.append(categoria)
+    return resultado
+
+
+def atributo_id(nombre: str):
+    return referencia()["atributos"].get(nombre)
+
+
+def atributo_valor(atributo_id: int, valor: str):
+    """(id, activo) del valor del atributo, o None."""
+    return referencia()["valores"].get((atributo_id, valor))
@@ -0,0 +1,130 @@
+"""
+Reintento de transacciones ante conflictos de escritura (MySQL / TiDB).
+
+TiDB (optimista o pesimista) y MySQL abortan la transacción entera ante un
+conflicto: la única salida correcta es volver a ejecutarla desde el
+principio. `con_reintentos` corre la función en su propio atomic() y, si falla
+con un código reintentable, espera (backoff exponencial con jitter) y repite.
+
+Las métricas (transacciones, intentos, conflictos, fallidas) se acumulan en el
+cache por operación; `manage.py db_reintentos` las muestra.
+"""
+
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Códigos reintentables:
+# 1205 lock wait timeout / 1213 deadlock (MySQL y TiDB pesimista)
+# 8002 conflicto en SELECT FOR UPDATE / 8022 reintento de txn / 8028 cambio de schema (TiDB)
+# 9007 write conflict (TiDB optimista)
+CODIGOS_REINTENTABLES = frozenset({1205, 1213, 8002, 8022, 8028, 9007})
+
+_METRICA_KEY = "db:reintentos:{operacion}:{campo}"
+_OPERACIONES_KEY = "db:reintentos:operaciones"
+CAMPOS_METRICAS = ("transacciones", "intentos", "conflictos", "fallidas")
+
+
+def codigo_error(exc):
+    """Código numérico MySQL/TiDB del error (o de su causa), o None."""
+    while exc is not None:
+        args = getattr(exc, "args", ())
+        if args and isinstance(args[0], int):
+            return args[0]
+        exc = exc.__cause__
+    return None
+
+
+def es_reintentable(exc) -> bool:
+    return isinstance(exc, DatabaseError) and codigo_error(exc) in CODIGOS_REINTENTABLES
+
+
+def _sumar(operacion: str, campo: str, cantidad: int = 1) -> None:
+    key = _METRICA_KEY.format(operacion=operacion, campo=campo)
+    try:
+        if not cache.add(key, cantidad, timeout=None):
+            cache.incr(key, cantidad)
+    except Exception:
+        # Las métricas nunca deben romper una venta.
+        logger.debug("No se pudo registrar la métrica %s", key, exc_info=True)
+
+
+def _registrar_operacion(operacion: str) -> None:
+    operaciones = cache.get(_OPERACIONES_KEY) or []
+    if operacion not in operaciones:
+        cache.set(_OPERACIONES_KEY, sorted([*operaciones, operacion]), timeout=None)
+
+
+def metricas_reintentos() -> dict:
+    """{operacion: {transacciones, intentos, conflictos, fallidas, tasa_conflicto}}"""
+    resultado = {}
+    for operacion in cache.get(_OPERACIONES_KEY) or []:
+        keys = {campo: _METRICA_KEY.format(operacion=operacion, campo=campo) for campo in CAMPOS_METRICAS}
+        valores = cache.get_many(keys.values())
+        fila = {campo: int(valores.get(key) or 0) for campo, key in keys.items()}
+        fila["tasa_conflicto"] = (fila["conflictos"] / fila["intentos"]) if fila["intentos"] else 0.0
+        resultado[operacion] = fila
+    return resultado
+
+
+def reiniciar_metricas() -> None:
+    for operacion in cache.get(_OPERACIONES_KEY) or []:
+        cache.delete_many([_METRICA_KEY.format(operacion=operacion, campo=c) for c in CAMPOS_METRICAS])
+    cache.delete(_OPERACIONES_KEY)
+
+
+def _espera(intento: int) -> float:
+    """Backoff exponencial con full jitter, en segundos."""
+    base_ms = int(getattr(settings, "DB_REINTENTOS_BASE_MS", 50) or 0)
+    tope_ms = int(getattr(settings, "DB_REINTENTOS_TOPE_MS", 1000) or 0)
+    return random.uniform(0, min(tope_ms, base_ms * (2 ** intento))) / 1000.0
+
+
+def con_reintentos(func, *args, operacion: str, intentos: int = None, **kwargs):
+    """
+    Ejecuta func(*args, **kwargs) dentro de transaction.atomic(), reintentando
+    ante conflictos de escritura hasta `intentos` veces (DB_REINTENTOS_MAX).
+
+    func debe ser re-ejecutable: todo lo que escriba en la base se deshace con
+    el rollback; efectos externos van en transaction.on_commit.
+
+    Si ya hay una transacción abierta no se reintenta (el conflicto aborta
+    también la de afuera): se ejecuta una vez, tal cual.
+    """
+    if connection.in_atomic_block:
+        with transaction.atomic():
+            return func(*args, **kwargs)
+
+    maximo = max(int(intentos or getattr(settings, "DB_REINTENTOS_MAX", 4) or 1), 1)
+    _registrar_operacion(operacion)
+    _sumar(operacion, "transacciones")
+
+    for intento in range(maximo):
+        _sumar(operacion, "intentos")
+        try:
+            with transaction.atomic():
+                return func(*args, **kwargs)
+        except DatabaseError as exc:
+            if not es_reintentable(exc):
+                raise
+            _sumar(operacion, "conflictos")
+            if intento + 1 >= maximo:
+                _sumar(operacion, "fallidas")
+                logger.error(
+                    "%s: conflicto %s, sin más reintentos (%s intentos)",
+                    operacion, codigo_error(exc), maximo,
+                )
+                raise
+            espera = _espera(intento)
+            logger.warning(
+                "%s: conflicto %s, reintento %s/%s en %.0f ms",
+                operacion, codigo_error(exc), intento + 1, maximo - 1, espera * 1000,
+            )
+            time.sleep(espera)
+
@@ -1,17 +1,42 @@
 from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
 
+from admin_panel.models import ReporteJob, UsuarioPerfil
+from core.autorizacion import autorizacion, invalidar_autorizaciones, usuario_tiene_permiso
+from core import referencia
+from core.db.pool import PoolConexiones
+from core.db.replica import (
+    COOKIE_PRIMARIA,
+    PrimariaTrasEscrituraMiddleware,
+    ReplicaRouter,
+    lectura_reportes,
+    leer_de_primaria,
+    leer_de_reportes,
+)
 from core.fiscal import (
     CondicionFiscalEmpresa,
+    desglosar_centavos,
     desglosar_monto_final_gravado_con_iva,
+    desglosar_montos_finales,
     empresa_es_responsable_inscripto,
     get_empresa_condicion_fiscal,
     normalizar_condicion_fiscal_empresa,
     set_empresa_condicion_fiscal,
     sumar_desgloses_fiscales,
 )
-from core.models import AppSetting
+from core.kpis import get_kpis, invalidar_kpis
+from core.models import AppSetting, Sucursal
+from core.reintentos import con_reintentos, metricas_reintentos, reiniciar_metricas
+from ventas.models import PlanCuotas, Venta
 
 
 class FiscalHelpersTests(TestCase):
@@ -76,3 +101,236 @@ class FiscalHelpersTests(TestCase):
     def test_desglose_valida_negativos(self):
         with self.assertRaises(ValueError):
             desglosar_monto_final_gravado_con_iva("-1")
+        with self.assertRaises(ValueError):
+            desglosar_centavos([-1])
+
+    def test_desglose_en_lote_igual_al_unitario(self):
+        montos = ["0", "0.01", "0.05", "1000.00", "999.995", "12345.67", "121"]
+        for alicuota in ("21.00", "10.50", "0"):
+            lote = desglosar_montos_finales(montos, iva_alicuota_pct=alicuota)
+            for monto, d in zip(montos, lote):
+                esperado = desglosar_monto_final_gravado_con_iva(monto, iva_alicuota_pct=alicuota)
+                self.assertEqual(
+                    [str(getattr(d, f)) for f in d.__dataclass_fields__],
+                    [str(getattr(esperado, f)) for f in d.__dataclass_fields__],
+                )
+        for c, d in enumerate(desglosar_centavos(range(20001))):
+            self.assertEqual(d, desglosar_monto_final_gravado_con_iva(Decimal(c).scaleb(-2)))
+
+
+class DashboardKpisTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sucursal = Sucursal.objects.create(nombre="Centro")
+
+    def _venta(self, total):
+        return Venta.objects.create(
+            sucursal=self.sucursal,
+            estado=Venta.Estado.CONFIRMADA,
+            total=Decimal(total),
+        )
+
+    def test_kpis_cacheados_hasta_invalidar_la_sucursal(self):
+        self._venta("100.00")
+        kpis = get_kpis(sucursal_id=self.sucursal.id)
+        self.assertEqual(kpis["ventas_hoy"], 1)
+
+        self._venta("50.00")
+        self.assertEqual(get_kpis(sucursal_id=self.sucursal.id)["ventas_hoy"], 1)
+
+        invalidar_kpis(self.sucursal.id)
+        kpis = get_kpis(sucursal_id=self.sucursal.id)
+        self.assertEqual(kpis["ventas_hoy"], 2)
+        self.assertEqual(kpis["ingresos_hoy"], Decimal("150.00"))
+        self.assertEqual(kpis["ticket_promedio"], Decimal("75.00"))
+
+
+@override_settings(DB_REINTENTOS_BASE_MS=0)
+class ReintentosTests(TransactionTestCase):
+    def setUp(self):
+        reiniciar_metricas()
+
+    def test_reintenta_conflictos_y_revierte_cada_intento(self):
+        llamadas = []
+
+        def crear():
+            llamadas.append(1)
+            Sucursal.objects.create(nombre=f"S{len(llamadas)}")
+            if len(llamadas) < 3:
+                raise OperationalError(9007, "Write conflict")
+            return "ok"
+
+        self.assertEqual(con_reintentos(crear, operacion="prueba"), "ok")
+        self.assertEqual(list(Sucursal.objects.values_list("nombre", flat=True)), ["S3"])
+
+        m = metricas_reintentos()["prueba"]
+        self.assertEqual((m["transacciones"], m["intentos"], m["conflictos"], m["fallidas"]), (1, 3, 2, 0))
+
+    def test_errores_no_reintentables_y_tope_de_intentos(self):
+        def integridad():
+            raise IntegrityError(1062, "Duplicate entry")
+
+        def deadlock():
+            raise OperationalError(1213, "Deadlock found")
+
+        with self.assertRaises(IntegrityError):
+            con_reintentos(integridad, operacion="prueba")
+        with self.assertRaises(OperationalError):
+            con_reintentos(deadlock, operacion="prueba", intentos=2)
+
+        m = metricas_reintentos()["prueba"]
+        self.assertEqual((m["intentos"], m["conflictos"], m["fallidas"]), (3, 2, 1))
+
+
+class _ConexionFalsa:
+    def __init__(self):
+        self.open = True
+        self.viva = True
+
+    def ping(self, reconnect=False):
+        if not self.viva:
+            raise OperationalError(2013, "Lost connection")
+
+    def close(self):
+        self.open = False
+
+
+class PoolConexionesTests(TestCase):
+    def test_reusa_conexiones_y_descarta_las_sucias(self):
+        pool = PoolConexiones(_ConexionFalsa, minimo=2, maximo=2)
+        self.assertEqual(pool.calentar(), 2)
+
+        c1 = pool.tomar()
+        pool.devolver(c1)
+        self.assertIs(pool.tomar(), c1)
+        pool.devolver(c1, descartar=True)
+        self.assertFalse(c1.open)
+
+        e = pool.estadisticas()
+        self.assertEqual((e["creadas"], e["reusadas"], e["descartadas"], e["libres"]), (2, 2, 1, 1))
+
+    def test_keepalive_reemplaza_muertas_y_repone_minimo(self):
+        pool = PoolConexiones(_ConexionFalsa, minimo=2, maximo=3, keepalive=0)
+        pool.calentar()
+        muerta = pool._libres[0][0]
+        muerta.viva = False
+
+        pool.mantener()
+
+        e = pool.estadisticas()
+        self.assertEqual((e["libres"], e["pings_fallidos"], e["creadas"]), (2, 1, 3))
+        self.assertNotIn(muerta, [c for c, _creada, _usada in pool._libres])
+
+
+@mock.patch("core.db.replica._alias_reportes", return_value="reportes")
+class ReplicaRouterTests(TransactionTestCase):
+    def test_solo_lee_de_reportes_dentro_del_bloque(self, _alias):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Venta))
+        with leer_de_reportes():
+            self.assertEqual(router.db_for_read(Venta), "reportes")
+            self.assertIsNone(router.db_for_read(ReporteJob))
+            # Después de escribir, el resto del bloque lee lo propio desde la primaria.
+            router.db_for_write(Venta)
+            self.assertIsNone(router.db_for_read(Venta))
+
+    def test_lo_cacheado_con_version_se_calcula_en_la_primaria(self, _alias):
+        router = ReplicaRouter()
+        with leer_de_reportes():
+            with leer_de_primaria():
+                self.assertIsNone(router.db_for_read(Venta))
+            self.assertEqual(router.db_for_read(Venta), "reportes")
+
+        rutas = []
+
+        def calcular(**kwargs):
+            rutas.append(router.db_for_read(Venta))
+            return {}
+
+        cache.clear()
+        with mock.patch("core.kpis._calcular_kpis", side_effect=calcular), leer_de_reportes():
+            get_kpis()
+        self.assertEqual(rutas, [None])
+
+    def test_decorador_y_cookie_tras_escritura(self, _alias):
+        router = ReplicaRouter()
+        rutas = []
+
+        @lectura_reportes
+        def vista(request):
+            rutas.append(router.db_for_read(Venta))
+            return HttpResponse("ok")
+
+        rf = RequestFactory()
+        vista(rf.get("/"))
+        con_cookie = rf.get("/")
+        con_cookie.COOKIES[COOKIE_PRIMARIA] = "1"
+        vista(con_cookie)
+        self.assertEqual(rutas, ["reportes", None])
+
+        def escribe(request):
+            Sucursal.objects.create(nombre="Centro")
+            return HttpResponse("ok")
+
+        response = PrimariaTrasEscrituraMiddleware(escribe)(rf.post("/"))
+        self.assertIn(COOKIE_PRIMARIA, response.cookies)
+
+
+class ArranqueTests(TestCase):
+    def test_migrate_solo_si_cambia_la_huella(self):
+        with mock.patch("core.management.commands.arranque.call_command") as migrate:
+            call_command("arranque", stdout=StringIO())
+            call_command("arranque", stdout=StringIO())
+            self.assertEqual(migrate.call_count, 1)
+
+            AppSetting.objects.filter(key="sistema.migraciones_huella").update(value_str="vieja")
+            call_command("arranque", stdout=StringIO())
+            self.assertEqual(migrate.call_count, 2)
+
+
+class AutorizacionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sucursal = Sucursal.objects.create(nombre="Centro")
+        self.rol = Group.objects.create(name="Cajero")
+        self.rol.permissions.add(Permission.objects.get(codename="usar_caja_pos"))
+        self.user = get_user_model().objects.create_user("caja1", password="x")
+        self.user.groups.add(self.rol)
+        UsuarioPerfil.objects.create(user=self.user, sucursal=self.sucursal)
+
+    def _user_fresco(self):
+        return get_user_model().objects.get(pk=self.user.pk)
+
+    def test_guards_sin_consultas_con_la_foto_cacheada(self):
+        autorizacion(self._user_fresco())
+
+        user = self._user_fresco()
+        with self.assertNumQueries(0):
+            self.assertTrue(usuario_tiene_permiso(user, "ventas.usar_caja_pos"))
+            self.assertTrue(user.has_perm("ventas.usar_caja_pos"))
+            self.assertEqual(autorizacion(user).sucursal_obj().nombre, "Centro")
+
+    def test_invalidar_recarga_permisos(self):
+        self.assertTrue(usuario_tiene_permiso(self._user_fresco(), "ventas.usar_caja_pos"))
+        self.rol.permissions.clear()
+        invalidar_autorizaciones()
+        self.assertFalse(usuario_tiene_permiso(self._user_fresco(), "ventas.usar_caja_pos"))
+
+
+class ReferenciaTests(TestCase):
+    def test_foto_sin_consultas_y_se_invalida_al_editar(self):
+        PlanCuotas.objects.create(tarjeta="VISA", cuotas=3, recargo_pct=Decimal("10.00"))
+        Sucursal.objects.create(nombre="Centro")
+        referencia.referencia()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(referencia.tarjetas(), ["VISA"])
+            self.assertEqual([s.nombre for s in referencia.sucursales()], ["Centro"])
+
+        plan = PlanCuotas.objects.create(tarjeta="AMEX", cuotas=6, recargo_pct=Decimal("20.00"))
+        self.assertEqual(referencia.tarjetas(), ["AMEX", "VISA"])
+        self.assertEqual(referencia.plan_activo(str(plan.id)).cuotas, 6)
+
+        plan.activo = False
+        plan.save()
+        self.assertIsNone(referencia.plan_activo(plan.id))
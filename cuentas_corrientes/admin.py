@@ -1,15 +1,17 @@
 from django.contrib import admin, messages
+from django.db import transaction
 from django.db.models import Sum, Q
 from django.utils.html import format_html
 
 from .models import Cliente, CuentaCorriente, MovimientoCuentaCorriente
+from .services import invalidar_antiguedad
 
 
 class MovimientoInline(admin.TabularInline):
     model = MovimientoCuentaCorriente
     extra = 0
-    fields = ("fecha", "tipo", "monto", "venta", "referencia", "observacion")
-    readonly_fields = ()
+    fields = ("fecha", "tipo", "monto", "saldo_acumulado", "venta", "referencia", "observacion")
+    readonly_fields = ("saldo_acumulado",)
     ordering = ("-fecha", "-id")
 
 
@@ -39,7 +41,7 @@ class ClienteAdmin(admin.ModelAdmin):
     def saldo_cc(self, obj):
         if not hasattr(obj, "cuenta_corriente"):
             return "-"
-        return obj.cuenta_corriente.saldo()
+        return obj.cuenta_corriente.saldo
     saldo_cc.short_description = "Saldo"
 
 
@@ -50,14 +52,14 @@ class CuentaCorrienteAdmin(admin.ModelAdmin):
     search_fields = ("cliente__dni", "cliente__apellido", "cliente__nombre")
     list_select_related = ("cliente",)
     inlines = [MovimientoInline]
-    readonly_fields = ("creada_en",)
+    readonly_fields = ("creada_en", "saldo")
 
     def dni(self, obj):
         return obj.cliente.dni
     dni.short_description = "DNI"
 
     def saldo_admin(self, obj):
-        return obj.saldo()
+        return obj.saldo
     saldo_admin.short_description = "Saldo"
 
 
@@ -80,6 +82,16 @@ class MovimientoCuentaCorrienteAdmin(admin.ModelAdmin):
         return format_html('<a href="/admin/ventas/venta/{}/change/">Venta #{}</a>', obj.venta_id, obj.venta_id)
     venta_link.short_description = "Venta"
 
+    def delete_queryset(self, request, queryset):
+        # "Eliminar seleccionados" borra en bloque sin pasar por delete() del
+        # modelo: se reconstruyen a mano los saldos de las cuentas afectadas.
+        with transaction.atomic():
+            cuenta_ids = set(queryset.values_list("cuenta_id", flat=True))
+            queryset.delete()
+            for cuenta in CuentaCorriente.objects.filter(pk__in=cuenta_ids).order_by("pk"):
+                cuenta.recalcular_saldos()
+            transaction.on_commit(invalidar_antiguedad)
+
     def changelist_view(self, request, extra_context=None):
         extra_context = extra_context or {}
         qs = self.get_queryset(request)
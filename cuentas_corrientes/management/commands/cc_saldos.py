@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cuentas_corrientes.models import CuentaCorriente
+
+
+class Command(BaseCommand):
+    help = (
+        "Verifica el saldo materializado de las cuentas corrientes contra sus movimientos. "
+        "Con --rebuild reconstruye saldo y saldo_acumulado de las cuentas con diferencias."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Reconstruye las cuentas con diferencias (o todas, con --todas).",
+        )
+        parser.add_argument(
+            "--todas",
+            action="store_true",
+            help="Con --rebuild, reconstruye todas las cuentas aunque no tengan diferencias.",
+        )
+        parser.add_argument(
+            "--cuenta",
+            type=int,
+            action="append",
+            default=[],
+            help="Limita a la(s) cuenta(s) indicada(s) por ID. Se puede repetir.",
+        )
+
+    def handle(self, *args, **options):
+        qs = CuentaCorriente.objects.select_related("cliente").order_by("id")
+        if options["cuenta"]:
+            qs = qs.filter(id__in=options["cuenta"])
+
+        revisadas = 0
+        diferencias = 0
+        reconstruidas = 0
+
+        for cuenta in qs.iterator(chunk_size=500):
+            revisadas += 1
+            esperado = Decimal(cuenta.calcular_saldo() or 0).quantize(Decimal("0.01"))
+            actual = Decimal(cuenta.saldo or 0).quantize(Decimal("0.01"))
+
+            if esperado != actual:
+                diferencias += 1
+                self.stdout.write(
+                    f"Cuenta #{cuenta.id} ({cuenta.cliente.dni}): saldo {actual} / movimientos {esperado}"
+                )
+
+            if options["rebuild"] and (options["todas"] or esperado != actual):
+                cuenta.recalcular_saldos()
+                reconstruidas += 1
+
+        resumen = f"Revisadas: {revisadas}. Con diferencias: {diferencias}."
+        if options["rebuild"]:
+            resumen += f" Reconstruidas: {reconstruidas}."
+            self.stdout.write(self.style.SUCCESS(resumen))
+            return
+
+        if diferencias:
+            raise CommandError(resumen + " Ejecutá con --rebuild para corregir.")
+        self.stdout.write(self.style.SUCCESS(resumen))
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas_corrientes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cuentacorriente',
+            name='saldo',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='movimientocuentacorriente',
+            name='saldo_acumulado',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+    ]
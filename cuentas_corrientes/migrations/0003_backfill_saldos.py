@@ -0,0 +1,45 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:20
+
+from decimal import Decimal
+
+from django.db import migrations
+
+
+def backfill_saldos(apps, schema_editor):
+    CuentaCorriente = apps.get_model("cuentas_corrientes", "CuentaCorriente")
+    MovimientoCuentaCorriente = apps.get_model("cuentas_corrientes", "MovimientoCuentaCorriente")
+
+    movimientos = (
+        MovimientoCuentaCorriente.objects
+        .order_by("cuenta_id", "id")
+        .only("id", "cuenta_id", "tipo", "monto")
+    )
+
+    saldos = {}
+    lote = []
+    for mov in movimientos.iterator(chunk_size=2000):
+        monto = Decimal(mov.monto or 0)
+        saldo = saldos.get(mov.cuenta_id, Decimal("0.00"))
+        saldo += monto if mov.tipo == "DEBITO" else -monto
+        saldos[mov.cuenta_id] = saldo
+        mov.saldo_acumulado = saldo
+        lote.append(mov)
+        if len(lote) >= 1000:
+            MovimientoCuentaCorriente.objects.bulk_update(lote, ["saldo_acumulado"])
+            lote = []
+    if lote:
+        MovimientoCuentaCorriente.objects.bulk_update(lote, ["saldo_acumulado"])
+
+    for cuenta_id, saldo in saldos.items():
+        CuentaCorriente.objects.filter(pk=cuenta_id).update(saldo=saldo)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas_corrientes', '0002_saldo_materializado'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_saldos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas_corrientes', '0003_backfill_saldos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimientocuentacorriente',
+            index=models.Index(fields=['cuenta', 'fecha', 'id'], name='cuentas_cor_cuenta__e6018b_idx'),
+        ),
+    ]
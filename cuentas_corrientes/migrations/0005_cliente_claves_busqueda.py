@@ -0,0 +1,40 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas_corrientes', '0004_movimiento_cuenta_fecha_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='busqueda',
+            field=models.CharField(blank=True, editable=False, max_length=170),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='busqueda_nombre',
+            field=models.CharField(blank=True, editable=False, max_length=170),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='dni_normalizado',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['dni_normalizado'], name='cuentas_cor_dni_nor_b24c2d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['busqueda'], name='cuentas_cor_busqued_29520c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['busqueda_nombre'], name='cuentas_cor_busqued_072c64_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:06
+
+from django.db import migrations
+
+from cuentas_corrientes.models import normalizar_busqueda, normalizar_dni
+
+
+def backfill_claves(apps, schema_editor):
+    Cliente = apps.get_model("cuentas_corrientes", "Cliente")
+
+    lote = []
+    for cli in Cliente.objects.only("id", "dni", "nombre", "apellido").iterator(chunk_size=2000):
+        cli.dni_normalizado = normalizar_dni(cli.dni)
+        cli.busqueda = normalizar_busqueda(f"{cli.apellido} {cli.nombre}")
+        cli.busqueda_nombre = normalizar_busqueda(f"{cli.nombre} {cli.apellido}")
+        lote.append(cli)
+        if len(lote) >= 1000:
+            Cliente.objects.bulk_update(lote, ["dni_normalizado", "busqueda", "busqueda_nombre"])
+            lote = []
+    if lote:
+        Cliente.objects.bulk_update(lote, ["dni_normalizado", "busqueda", "busqueda_nombre"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas_corrientes', '0005_cliente_claves_busqueda'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_claves, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.14 on 2026-10-19 10:12
+
+from decimal import Decimal
+
+from django.db import migrations
+
+
+def recalcular_saldo_acumulado(apps, schema_editor):
+    """
+    0003 acumuló en orden de id; el estado de cuenta pagina por (fecha, id).
+    El saldo final de cada cuenta no cambia, solo el acumulado por movimiento.
+    """
+    MovimientoCuentaCorriente = apps.get_model("cuentas_corrientes", "MovimientoCuentaCorriente")
+
+    movimientos = (
+        MovimientoCuentaCorriente.objects
+        .order_by("cuenta_id", "fecha", "id")
+        .only("id", "cuenta_id", "tipo", "monto", "saldo_acumulado")
+    )
+
+    cuenta_actual = None
+    saldo = Decimal("0.00")
+    lote = []
+    for mov in movimientos.iterator(chunk_size=2000):
+        if mov.cuenta_id != cuenta_actual:
+            cuenta_actual = mov.cuenta_id
+            saldo = Decimal("0.00")
+        monto = Decimal(mov.monto or 0)
+        saldo += monto if mov.tipo == "DEBITO" else -monto
+        if mov.saldo_acumulado == saldo:
+            continue
+        mov.saldo_acumulado = saldo
+        lote.append(mov)
+        if len(lote) >= 1000:
+            MovimientoCuentaCorriente.objects.bulk_update(lote, ["saldo_acumulado"])
+            lote = []
+    if lote:
+        MovimientoCuentaCorriente.objects.bulk_update(lote, ["saldo_acumulado"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas_corrientes', '0006_backfill_cliente_busqueda'),
+    ]
+
+    operations = [
+        migrations.RunPython(recalcular_saldo_acumulado, migrations.RunPython.noop),
+    ]
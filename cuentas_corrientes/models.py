@@ -1,14 +1,35 @@
-from django.db import models
+import re
+import unicodedata
+from decimal import Decimal
+
+from django.db import models, transaction
 from django.db.models import Sum, Q
 from django.utils import timezone
 
 
+def normalizar_busqueda(texto: str) -> str:
+    """Minúsculas, sin acentos y con espacios simples ("Pérez  Ñuñez" -> "perez nunez")."""
+    texto = unicodedata.normalize("NFKD", str(texto or ""))
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
+    return " ".join(texto.lower().split())
+
+
+def normalizar_dni(texto: str) -> str:
+    """Solo dígitos ("30.111.222" -> "30111222")."""
+    return re.sub(r"\D", "", str(texto or ""))
+
+
 class Cliente(models.Model):
     dni = models.CharField("DNI", max_length=20, unique=True, db_index=True)
 
     nombre = models.CharField(max_length=80)
     apellido = models.CharField(max_length=80)
 
+    # Claves de búsqueda (se completan en save()): permiten buscar por prefijo con índice.
+    dni_normalizado = models.CharField(max_length=20, blank=True, editable=False)
+    busqueda = models.CharField(max_length=170, blank=True, editable=False)         # "apellido nombre"
+    busqueda_nombre = models.CharField(max_length=170, blank=True, editable=False)  # "nombre apellido"
+
     telefono = models.CharField(max_length=40, blank=True)
     direccion = models.CharField(max_length=200, blank=True)
     fecha_nacimiento = models.DateField(null=True, blank=True)
@@ -20,8 +41,24 @@ class Cliente(models.Model):
         indexes = [
             models.Index(fields=["dni"]),
             models.Index(fields=["apellido", "nombre"]),
+            models.Index(fields=["dni_normalizado"]),
+            models.Index(fields=["busqueda"]),
+            models.Index(fields=["busqueda_nombre"]),
         ]
 
+    def actualizar_claves_busqueda(self):
+        self.dni_normalizado = normalizar_dni(self.dni)
+        self.busqueda = normalizar_busqueda(f"{self.apellido} {self.nombre}")
+        self.busqueda_nombre = normalizar_busqueda(f"{self.nombre} {self.apellido}")
+
+    def save(self, *args, **kwargs):
+        self.actualizar_claves_busqueda()
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = set(update_fields) | {"dni_normalizado", "busqueda", "busqueda_nombre"}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.apellido}, {self.nombre} ({self.dni})"
 
@@ -36,6 +73,9 @@ class CuentaCorriente(models.Model):
     activa = models.BooleanField(default=True)
     creada_en = models.DateTimeField(auto_now_add=True)
 
+    # Saldo materializado (Débitos - Créditos). Se actualiza con cada movimiento.
+    saldo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
     class Meta:
         verbose_name = "Cuenta corriente"
         verbose_name_plural = "Cuentas corrientes"
@@ -44,9 +84,10 @@ class CuentaCorriente(models.Model):
     def __str__(self):
         return f"CC {self.cliente.dni} - {self.cliente.apellido}, {self.cliente.nombre}"
 
-    def saldo(self):
+    def calcular_saldo(self):
         """
-        Saldo = Débitos - Créditos (saldo global).
+        Saldo = Débitos - Créditos, recorriendo los movimientos.
+        Solo para verificar/reconstruir: para leer el saldo usar el campo `saldo`.
         """
         agg = self.movimientos.aggregate(
             debitos=Sum("monto", filter=Q(tipo=MovimientoCuentaCorriente.Tipo.DEBITO)),
@@ -56,6 +97,29 @@ class CuentaCorriente(models.Model):
         cred = agg["creditos"] or 0
         return deb - cred
 
+    @transaction.atomic
+    def recalcular_saldos(self):
+        """
+        Reconstruye saldo_acumulado de cada movimiento (en orden fecha, id) y el saldo de la cuenta.
+        Devuelve el saldo resultante.
+        """
+        CuentaCorriente.objects.select_for_update().filter(pk=self.pk).first()
+
+        saldo = Decimal("0.00")
+        cambios = []
+        for mov in self.movimientos.order_by("fecha", "id").only("id", "tipo", "monto", "saldo_acumulado"):
+            saldo += mov.importe_firmado
+            if mov.saldo_acumulado != saldo:
+                mov.saldo_acumulado = saldo
+                cambios.append(mov)
+
+        if cambios:
+            MovimientoCuentaCorriente.objects.bulk_update(cambios, ["saldo_acumulado"], batch_size=500)
+
+        CuentaCorriente.objects.filter(pk=self.pk).update(saldo=saldo)
+        self.saldo = saldo
+        return saldo
+
 
 class MovimientoCuentaCorriente(models.Model):
     class Tipo(models.TextChoices):
@@ -88,12 +152,17 @@ class MovimientoCuentaCorriente(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Saldo de la cuenta inmediatamente después de este movimiento (orden fecha, id).
+    # Es lo que permite paginar el estado de cuenta con saldo de apertura por página.
+    saldo_acumulado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
     class Meta:
         verbose_name = "Movimiento de cuenta corriente"
         verbose_name_plural = "Movimientos de cuenta corriente"
         ordering = ["-fecha", "-id"]
         indexes = [
             models.Index(fields=["cuenta", "tipo", "fecha"]),
+            models.Index(fields=["cuenta", "fecha", "id"]),
             models.Index(fields=["venta"]),
         ]
 
@@ -116,7 +185,67 @@ class MovimientoCuentaCorriente(models.Model):
         if self.tipo == self.Tipo.CREDITO and self.venta is not None:
             raise ValidationError("Un movimiento CRÉDITO no debería estar asociado a una Venta.")
 
+    @property
+    def importe_firmado(self):
+        monto = Decimal(self.monto or 0)
+        return monto if self.tipo == self.Tipo.DEBITO else -monto
+
     def save(self, *args, **kwargs):
         # Ejecuta validaciones del clean() también al guardar desde código/admin
         self.full_clean()
-        super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            transaction.on_commit(_invalidar_antiguedad)
+            if self._state.adding:
+                # Lock de la cuenta: serializa movimientos concurrentes del mismo cliente.
+                saldo_actual = (
+                    CuentaCorriente.objects
+                    .select_for_update()
+                    .values_list("saldo", flat=True)
+                    .get(pk=self.cuenta_id)
+                )
+                nuevo_saldo = Decimal(saldo_actual or 0) + self.importe_firmado
+                self.saldo_acumulado = nuevo_saldo
+
+                # Movimiento con fecha anterior a otros ya cargados: los acumulados
+                # posteriores cambian, así que se reconstruye la cuenta.
+                retroactivo = (
+                    MovimientoCuentaCorriente.objects
+                    .filter(cuenta_id=self.cuenta_id, fecha__gt=self.fecha)
+                    .exists()
+                )
+                super().save(*args, **kwargs)
+
+                if retroactivo:
+                    nuevo_saldo = self.cuenta.recalcular_saldos()
+                    self.refresh_from_db(fields=["saldo_acumulado"])
+                else:
+                    CuentaCorriente.objects.filter(pk=self.cuenta_id).update(saldo=nuevo_saldo)
+                if MovimientoCuentaCorriente.cuenta.is_cached(self):
+                    self.cuenta.saldo = nuevo_saldo
+            else:
+                # Edición (admin): raro; se reconstruye la cuenta completa (y la
+                # anterior, si el movimiento se pasó a otra cuenta).
+                cuenta_anterior_id = (
+                    MovimientoCuentaCorriente.objects
+                    .filter(pk=self.pk)
+                    .values_list("cuenta_id", flat=True)
+                    .first()
+                )
+                super().save(*args, **kwargs)
+                self.cuenta.recalcular_saldos()
+                if cuenta_anterior_id and cuenta_anterior_id != self.cuenta_id:
+                    CuentaCorriente.objects.get(pk=cuenta_anterior_id).recalcular_saldos()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            transaction.on_commit(_invalidar_antiguedad)
+            cuenta = self.cuenta
+            resultado = super().delete(*args, **kwargs)
+            cuenta.recalcular_saldos()
+        return resultado
+
+
+def _invalidar_antiguedad():
+    from .services import invalidar_antiguedad
+    invalidar_antiguedad()
@@ -0,0 +1,536 @@
+import csv
+import io
+import re
+from collections import deque
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Q, Value, When
+from django.utils import timezone
+
+from core.db.replica import leer_de_primaria
+from core.fiscal import parse_decimal_ar
+
+from .models import Cliente, CuentaCorriente, MovimientoCuentaCorriente, normalizar_busqueda, normalizar_dni
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+ESTADO_CUENTA_PAGINA = 50
+BUSQUEDA_CLIENTES_LIMITE = 20
+
+# (clave, días desde, días hasta inclusive; None = sin tope)
+TRAMOS_ANTIGUEDAD = [
+    ("d0_30", 0, 30),
+    ("d31_60", 31, 60),
+    ("d61_90", 61, 90),
+    ("d90_mas", 91, None),
+]
+
+_ANTIGUEDAD_VERSION_KEY = "cc:antiguedad:v"
+_ANTIGUEDAD_KEY = "cc:antiguedad:{dia}:{sucursal}:{version}"
+
+
+# ======================================================================
+# Búsqueda de clientes (POS)
+# ======================================================================
+
+def buscar_clientes(q: str, *, limite: int = BUSQUEDA_CLIENTES_LIMITE) -> list:
+    """
+    Clientes activos por prefijo de DNI o de nombre, en una sola consulta.
+
+    Usa las claves normalizadas (índices dni_normalizado / busqueda /
+    busqueda_nombre) y trae la cuenta corriente en el mismo query, así el
+    picker muestra saldo y estado sin consultas por fila.
+
+    Orden: DNI exacto, prefijo de DNI, prefijo de "apellido nombre",
+    prefijo de "nombre apellido".
+
+    Las claves ya están en minúsculas: istartswith en MySQL/TiDB es un
+    LIKE 'x%' común, que recorre el índice por rango (startswith sería
+    LIKE BINARY y con la collation case-insensitive no usa el índice).
+    """
+    texto = normalizar_busqueda(q)
+    if not texto:
+        return []
+
+    qs = Cliente.objects.filter(activo=True).select_related("cuenta_corriente")
+
+    dni = normalizar_dni(texto)
+    if dni and not any(ch.isalpha() for ch in texto):
+        qs = qs.filter(dni_normalizado__istartswith=dni).annotate(
+            rango=Case(
+                When(dni_normalizado=dni, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        )
+    else:
+        qs = qs.filter(Q(busqueda__istartswith=texto) | Q(busqueda_nombre__istartswith=texto)).annotate(
+            rango=Case(
+                When(busqueda__istartswith=texto, then=Value(2)),
+                default=Value(3),
+                output_field=IntegerField(),
+            )
+        )
+
+    return list(qs.order_by("rango", "busqueda", "id")[:limite])
+
+
+# ======================================================================
+# Estado de cuenta (paginación keyset sobre (fecha, id))
+# ======================================================================
+
+def cursor_movimiento(mov: MovimientoCuentaCorriente) -> str:
+    micros = (mov.fecha - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}_{mov.id}"
+
+
+def parse_cursor(raw: str):
+    """Devuelve (fecha, id) o None si el cursor no es válido."""
+    try:
+        micros_raw, id_raw = (raw or "").split("_", 1)
+        fecha = _EPOCH + timedelta(microseconds=int(micros_raw))
+        return fecha, int(id_raw)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def pagina_estado_cuenta(cuenta: CuentaCorriente, *, antes: str = "", despues: str = "",
+                         tamanio: int = ESTADO_CUENTA_PAGINA) -> dict:
+    """
+    Una página del estado de cuenta, del movimiento más reciente al más antiguo.
+
+    - `antes`: cursor del último movimiento visto -> página siguiente (más antigua).
+    - `despues`: cursor del primer movimiento visto -> página anterior (más reciente).
+
+    Los saldos de apertura y cierre salen de saldo_acumulado: no se suma el historial.
+    """
+    qs = cuenta.movimientos.select_related("venta")
+
+    cursor_antes = parse_cursor(antes) if antes else None
+    cursor_despues = parse_cursor(despues) if despues and not cursor_antes else None
+
+    if cursor_despues:
+        fecha, mov_id = cursor_despues
+        filas = list(
+            qs.filter(Q(fecha__gt=fecha) | Q(fecha=fecha, id__gt=mov_id))
+            .order_by("fecha", "id")[:tamanio + 1]
+        )
+        hay_mas_recientes = len(filas) > tamanio
+        movimientos = list(reversed(filas[:tamanio]))
+        hay_mas_antiguos = True
+    else:
+        if cursor_antes:
+            fecha, mov_id = cursor_antes
+            qs = qs.filter(Q(fecha__lt=fecha) | Q(fecha=fecha, id__lt=mov_id))
+        filas = list(qs.order_by("-fecha", "-id")[:tamanio + 1])
+        hay_mas_antiguos = len(filas) > tamanio
+        movimientos = filas[:tamanio]
+        hay_mas_recientes = bool(cursor_antes)
+
+    if movimientos:
+        saldo_cierre = Decimal(movimientos[0].saldo_acumulado or 0)
+        ultimo = movimientos[-1]
+        saldo_apertura = Decimal(ultimo.saldo_acumulado or 0) - ultimo.importe_firmado
+    else:
+        saldo_cierre = Decimal(cuenta.saldo or 0)
+        saldo_apertura = saldo_cierre
+
+    return {
+        "movimientos": movimientos,
+        "saldo_apertura": saldo_apertura.quantize(Decimal("0.01")),
+        "saldo_cierre": saldo_cierre.quantize(Decimal("0.01")),
+        "cursor_antes": cursor_movimiento(movimientos[-1]) if movimientos and hay_mas_antiguos else "",
+        "cursor_despues": cursor_movimiento(movimientos[0]) if movimientos and hay_mas_recientes else "",
+    }
+
+
+def iterar_estado_cuenta(cuenta: CuentaCorriente, chunk_size: int = 1000):
+    """Historial completo en orden cronológico, sin cargarlo entero en memoria."""
+    return (
+        cuenta.movimientos
+        .select_related("venta")
+        .order_by("fecha", "id")
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+# ======================================================================
+# Antigüedad de saldos (imputación FIFO de pagos a débitos)
+# ======================================================================
+
+def _version_antiguedad() -> int:
+    version = cache.get(_ANTIGUEDAD_VERSION_KEY)
+    if version is None:
+        cache.add(_ANTIGUEDAD_VERSION_KEY, 1, timeout=None)
+        version = cache.get(_ANTIGUEDAD_VERSION_KEY) or 1
+    return int(version)
+
+
+def invalidar_antiguedad() -> None:
+    """Llamar (on_commit) después de cualquier alta/edición/baja de movimientos."""
+    try:
+        cache.incr(_ANTIGUEDAD_VERSION_KEY)
+    except ValueError:
+        cache.set(_ANTIGUEDAD_VERSION_KEY, 2, timeout=None)
+
+
+def _tramo(dias: int) -> str:
+    for clave, desde, hasta in TRAMOS_ANTIGUEDAD:
+        if dias >= desde and (hasta is None or dias <= hasta):
+            return clave
+    return TRAMOS_ANTIGUEDAD[0][0]
+
+
+def _cerrar_cuenta(cuenta_id, pendientes, hoy, sucursal_id):
+    """Reparte en tramos lo que quedó sin cancelar de los débitos de una cuenta."""
+    tramos = {clave: Decimal("0.00") for clave, _, _ in TRAMOS_ANTIGUEDAD}
+    total = Decimal("0.00")
+    for fecha, pendiente, suc_id in pendientes:
+        if sucursal_id and suc_id != sucursal_id:
+            continue
+        dias = max((hoy - timezone.localtime(fecha).date()).days, 0)
+        tramos[_tramo(dias)] += pendiente
+        total += pendiente
+    if not total:
+        return None
+    return {"cuenta_id": cuenta_id, "total": total, **tramos}
+
+
+def _movimientos_antiguedad(sucursal_id=None, lote: int = 2000):
+    """
+    Movimientos en orden (cuenta, fecha, id) por lotes keyset sobre el índice
+    (cuenta, fecha, id): el driver de MySQL trae cada resultado entero a
+    memoria, así que no se abre una sola consulta sobre toda la tabla.
+
+    Con sucursal, solo las cuentas con algún débito de una venta de esa sucursal.
+    """
+    qs = MovimientoCuentaCorriente.objects.order_by("cuenta_id", "fecha", "id")
+    if sucursal_id:
+        qs = qs.filter(
+            cuenta_id__in=MovimientoCuentaCorriente.objects.filter(
+                tipo=MovimientoCuentaCorriente.Tipo.DEBITO,
+                venta__sucursal_id=sucursal_id,
+            ).values("cuenta_id")
+        )
+    qs = qs.values_list("id", "cuenta_id", "tipo", "monto", "fecha", "venta__sucursal_id")
+
+    ultimo = None
+    while True:
+        pagina = qs
+        if ultimo is not None:
+            mov_id, cuenta_id, fecha = ultimo
+            pagina = qs.filter(
+                Q(cuenta_id__gt=cuenta_id)
+                | Q(cuenta_id=cuenta_id, fecha__gt=fecha)
+                | Q(cuenta_id=cuenta_id, fecha=fecha, id__gt=mov_id)
+            )
+        filas = list(pagina[:lote])
+        for fila in filas:
+            yield fila[1:]
+        if len(filas) < lote:
+            return
+        ultimo = (filas[-1][0], filas[-1][1], filas[-1][4])
+
+
+def _calcular_antiguedad(*, hoy, sucursal_id=None) -> list:
+    """
+    Una sola pasada ordenada (cuenta, fecha, id), leída por lotes keyset.
+
+    Por cuenta se mantiene una cola de débitos abiertos; cada crédito cancela
+    desde el más antiguo (FIFO). Lo que sobra de un crédito queda a favor y
+    cancela los débitos siguientes antes de que entren a la cola (así el
+    total de la fila coincide con el saldo). Al cambiar de cuenta se cierra
+    la anterior.
+    Con sucursal se recorren solo las cuentas con débitos de esa sucursal, y
+    el filtro de los débitos se aplica al final: los pagos no tienen sucursal
+    y se imputan igual contra todos los débitos de la cuenta.
+    """
+    movimientos = _movimientos_antiguedad(sucursal_id)
+
+    filas = []
+    cuenta_actual = None
+    pendientes = deque()
+    a_favor = Decimal("0.00")
+
+    for cuenta_id, tipo, monto, fecha, suc_id in movimientos:
+        if cuenta_id != cuenta_actual:
+            if cuenta_actual is not None:
+                fila = _cerrar_cuenta(cuenta_actual, pendientes, hoy, sucursal_id)
+                if fila:
+                    filas.append(fila)
+            cuenta_actual = cuenta_id
+            pendientes = deque()
+            a_favor = Decimal("0.00")
+
+        monto = Decimal(monto or 0)
+        if tipo == MovimientoCuentaCorriente.Tipo.DEBITO:
+            # Un pago anticipado cancela el débito antes de que envejezca.
+            aplicado = min(a_favor, monto)
+            a_favor -= aplicado
+            monto -= aplicado
+            if monto > 0:
+                pendientes.append([fecha, monto, suc_id])
+            continue
+
+        # Crédito: cancela desde el débito más antiguo. El excedente queda a favor.
+        while monto > 0 and pendientes:
+            deb = pendientes[0]
+            aplicado = min(deb[1], monto)
+            deb[1] -= aplicado
+            monto -= aplicado
+            if deb[1] <= 0:
+                pendientes.popleft()
+        a_favor += monto
+
+    if cuenta_actual is not None:
+        fila = _cerrar_cuenta(cuenta_actual, pendientes, hoy, sucursal_id)
+        if fila:
+            filas.append(fila)
+
+    # Nombres en bloque (una consulta por lote, no por cuenta).
+    cuentas = {}
+    ids = [f["cuenta_id"] for f in filas]
+    for i in range(0, len(ids), 500):
+        for cc in CuentaCorriente.objects.filter(id__in=ids[i:i + 500]).select_related("cliente"):
+            cuentas[cc.id] = cc
+    for f in filas:
+        cc = cuentas.get(f["cuenta_id"])
+        f["dni"] = cc.cliente.dni if cc else ""
+        f["cliente"] = f"{cc.cliente.apellido}, {cc.cliente.nombre}" if cc else ""
+        f["activa"] = bool(cc and cc.activa)
+
+    filas.sort(key=lambda f: (-f["d90_mas"], -f["total"], f["cliente"]))
+    return filas
+
+
+def antiguedad_saldos(*, sucursal_id=None) -> dict:
+    """
+    Reporte de antigüedad (0-30 / 31-60 / 61-90 / 90+ días) por cuenta.
+
+    Se cachea hasta el próximo movimiento (versión global) o el cambio de día;
+    por eso se calcula en la primaria aunque la vista lea de reportes.
+    """
+    hoy = timezone.localdate()
+    key = _ANTIGUEDAD_KEY.format(
+        dia=hoy.isoformat(),
+        sucursal=sucursal_id or "all",
+        version=_version_antiguedad(),
+    )
+    reporte = cache.get(key)
+    if reporte is None:
+        # Queda bajo la versión actual: no puede salir de una réplica atrasada.
+        with leer_de_primaria():
+            filas = _calcular_antiguedad(hoy=hoy, sucursal_id=sucursal_id)
+        totales = {clave: sum((f[clave] for f in filas), Decimal("0.00")) for clave, _, _ in TRAMOS_ANTIGUEDAD}
+        totales["total"] = sum((f["total"] for f in filas), Decimal("0.00"))
+        reporte = {"filas": filas, "totales": totales, "calculado_en": timezone.now()}
+        cache.set(key, reporte, timeout=int(getattr(settings, "CC_ANTIGUEDAD_TTL", 86400) or 86400))
+    return reporte
+
+
+# ======================================================================
+# Importación masiva de pagos (CSV del banco)
+# ======================================================================
+
+_COLUMNAS_IMPORTACION = {
+    "fecha": ("fecha", "fecha valor", "fecha operacion"),
+    "dni": ("dni", "documento", "cuit", "cuil"),
+    "referencia": ("referencia", "concepto", "descripcion", "detalle"),
+    "monto": ("monto", "importe", "credito", "haber"),
+}
+
+_FORMATOS_FECHA = ("%d/%m/%Y %H:%M", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%d-%m-%Y")
+
+
+_MILES_AR = re.compile(r"^-?\d{1,3}(\.\d{3})+$")
+
+
+def _parse_monto(raw: str):
+    """
+    Importe en formato AR (core.fiscal.parse_decimal_ar). Además, solo puntos
+    agrupando de a tres dígitos es separador de miles (1.234 -> 1234.00), no
+    decimales. None si no es un importe positivo.
+    """
+    txt = str(raw or "").strip().replace("$", "").replace(" ", "")
+    if _MILES_AR.match(txt):
+        txt = txt.replace(".", "")
+    monto = parse_decimal_ar(txt)
+    return monto if monto is not None and monto > 0 else None
+
+
+def _parse_fecha(raw: str):
+    # Sin fecha se rechaza: el día es parte de la clave para no duplicar al reimportar.
+    txt = (raw or "").strip()
+    for fmt in _FORMATOS_FECHA:
+        try:
+            fecha = datetime.strptime(txt, fmt)
+        except ValueError:
+            continue
+        return timezone.make_aware(fecha, timezone.get_current_timezone())
+    return None
+
+
+def _candidatos_dni(dni_raw: str, referencia: str) -> list:
+    """DNIs posibles de una fila: columna DNI/CUIT y, si no, números largos de la referencia."""
+    numeros = [normalizar_dni(dni_raw)] if normalizar_dni(dni_raw) else re.findall(r"\d{7,11}", referencia or "")
+    candidatos = []
+    for n in numeros:
+        candidatos.append(n)
+        if len(n) == 11:
+            candidatos.append(n[2:10])  # CUIT/CUIL -> DNI
+    return candidatos
+
+
+def leer_csv_pagos(contenido: str) -> list:
+    """Filas del CSV como dicts normalizados (linea, fecha, dni, referencia, monto) en texto crudo."""
+    # El delimitador sale del encabezado (los montos "1.234,56" confunden al Sniffer).
+    primera = contenido.split("\n", 1)[0]
+    delimitador = max(";,\t", key=primera.count)
+
+    reader = csv.reader(io.StringIO(contenido), delimiter=delimitador)
+    encabezado = [normalizar_busqueda(c) for c in next(reader, [])]
+
+    indices = {}
+    for campo, alias in _COLUMNAS_IMPORTACION.items():
+        for i, col in enumerate(encabezado):
+            if col in alias:
+                indices[campo] = i
+                break
+    if "monto" not in indices or not ({"dni", "referencia"} & indices.keys()):
+        raise ValueError("El archivo debe tener columna de monto y de DNI o referencia.")
+
+    def _valor(row, campo):
+        i = indices.get(campo)
+        return row[i].strip() if i is not None and i < len(row) else ""
+
+    filas = []
+    for linea, row in enumerate(reader, start=2):
+        if not any((c or "").strip() for c in row):
+            continue
+        filas.append({
+            "linea": linea,
+            "fecha": _valor(row, "fecha"),
+            "dni": _valor(row, "dni"),
+            "referencia": _valor(row, "referencia")[:120],
+            "monto": _valor(row, "monto"),
+        })
+    return filas
+
+
+def importar_pagos(filas: list, *, observacion: str = "Importación de pagos") -> dict:
+    """
+    Registra como CRÉDITO las filas que matchean una cuenta activa (por DNI o referencia).
+
+    - Valida en memoria (sin full_clean por fila) y resuelve clientes con una consulta.
+    - Las filas ya importadas (misma cuenta, referencia, monto y día) se saltean.
+    - Inserta todo con bulk_create en una transacción, con saldo_acumulado calculado;
+      las cuentas con pagos anteriores a su último movimiento se reconstruyen.
+
+    Devuelve {"creados", "total", "rechazados": [{linea, motivo, ...}], "duplicados"}.
+    """
+    rechazados = []
+    validas = []
+    dnis = set()
+    for f in filas:
+        monto = _parse_monto(f["monto"])
+        fecha = _parse_fecha(f["fecha"])
+        candidatos = _candidatos_dni(f["dni"], f["referencia"])
+        if monto is None:
+            rechazados.append({**f, "motivo": "Monto inválido"})
+        elif fecha is None:
+            rechazados.append({**f, "motivo": "Fecha inválida"})
+        elif not candidatos:
+            rechazados.append({**f, "motivo": "Sin DNI ni referencia identificable"})
+        else:
+            validas.append((f, monto, fecha, candidatos))
+            dnis.update(candidatos)
+
+    cuentas_por_dni = {
+        dni: (cuenta_id, activa)
+        for dni, cuenta_id, activa in (
+            Cliente.objects
+            .filter(dni_normalizado__in=dnis, cuenta_corriente__isnull=False)
+            .values_list("dni_normalizado", "cuenta_corriente__id", "cuenta_corriente__activa")
+        )
+    }
+
+    pendientes = []
+    for f, monto, fecha, candidatos in validas:
+        match = next((cuentas_por_dni[d] for d in candidatos if d in cuentas_por_dni), None)
+        if match is None:
+            rechazados.append({**f, "motivo": "Cliente sin cuenta corriente"})
+        elif not match[1]:
+            rechazados.append({**f, "motivo": "Cuenta corriente inactiva"})
+        else:
+            pendientes.append((match[0], f, monto, fecha))
+
+    creados = []
+    duplicados = 0
+    with transaction.atomic():
+        cuenta_ids = sorted({p[0] for p in pendientes})
+        saldos = dict(
+            CuentaCorriente.objects.select_for_update()
+            .filter(id__in=cuenta_ids).order_by("id")
+            .values_list("id", "saldo")
+        )
+        ultimas = dict(
+            MovimientoCuentaCorriente.objects.filter(cuenta_id__in=cuenta_ids)
+            .values("cuenta_id").annotate(ultima=Max("fecha"))
+            .values_list("cuenta_id", "ultima")
+        )
+        existentes = set(
+            (cuenta_id, ref, monto, timezone.localtime(fecha).date())
+            for cuenta_id, ref, monto, fecha in (
+                MovimientoCuentaCorriente.objects
+                .filter(cuenta_id__in=cuenta_ids, tipo=MovimientoCuentaCorriente.Tipo.CREDITO)
+                .exclude(referencia="")
+                .values_list("cuenta_id", "referencia", "monto", "fecha")
+            )
+        )
+
+        retroactivas = set()
+        for cuenta_id, f, monto, fecha in sorted(pendientes, key=lambda p: (p[0], p[3])):
+            firma = (cuenta_id, f["referencia"], monto, timezone.localtime(fecha).date())
+            if f["referencia"] and firma in existentes:
+                duplicados += 1
+                continue
+            existentes.add(firma)
+
+            if ultimas.get(cuenta_id) and fecha < ultimas[cuenta_id]:
+                retroactivas.add(cuenta_id)
+            saldos[cuenta_id] = Decimal(saldos[cuenta_id] or 0) - monto
+            creados.append(MovimientoCuentaCorriente(
+                cuenta_id=cuenta_id,
+                tipo=MovimientoCuentaCorriente.Tipo.CREDITO,
+                monto=monto,
+                fecha=fecha,
+                referencia=f["referencia"],
+                observacion=observacion,
+                saldo_acumulado=saldos[cuenta_id],
+            ))
+
+        MovimientoCuentaCorriente.objects.bulk_create(creados, batch_size=500)
+
+        cuentas = CuentaCorriente.objects.in_bulk({m.cuenta_id for m in creados})
+        for cuenta_id, cuenta in cuentas.items():
+            if cuenta_id in retroactivas:
+                cuenta.recalcular_saldos()
+            else:
+                cuenta.saldo = saldos[cuenta_id]
+        CuentaCorriente.objects.bulk_update(
+            [c for i, c in cuentas.items() if i not in retroactivas], ["saldo"], batch_size=500,
+        )
+
+        if creados:
+            transaction.on_commit(invalidar_antiguedad)
+
+    return {
+        "creados": len(creados),
+        "total": sum((m.monto for m in creados), Decimal("0.00")),
+        "rechazados": sorted(rechazados, key=lambda r: r["linea"]),
+        "duplicados": duplicados,
+    }
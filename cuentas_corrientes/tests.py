@@ -1,3 +1,217 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib import admin
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Sucursal
+from cuentas_corrientes.models import Cliente, CuentaCorriente, MovimientoCuentaCorriente
+from cuentas_corrientes.services import (
+    _movimientos_antiguedad,
+    antiguedad_saldos,
+    buscar_clientes,
+    importar_pagos,
+    leer_csv_pagos,
+    pagina_estado_cuenta,
+)
+from ventas.models import Venta
+
+
+class SaldoMaterializadoTests(TestCase):
+    def setUp(self):
+        cliente = Cliente.objects.create(dni="30111222", nombre="Ana", apellido="Pérez")
+        self.cuenta = CuentaCorriente.objects.create(cliente=cliente)
+        self.venta = Venta.objects.create(sucursal=Sucursal.objects.create(nombre="Centro"), total=Decimal("100.00"))
+
+    def _mov(self, tipo, monto, fecha=None):
+        return MovimientoCuentaCorriente.objects.create(
+            cuenta=self.cuenta,
+            tipo=tipo,
+            monto=Decimal(monto),
+            fecha=fecha or timezone.now(),
+            venta=self.venta if tipo == MovimientoCuentaCorriente.Tipo.DEBITO else None,
+        )
+
+    def test_cada_movimiento_actualiza_saldo_y_acumulado(self):
+        d = self._mov(MovimientoCuentaCorriente.Tipo.DEBITO, "100.00")
+        c = self._mov(MovimientoCuentaCorriente.Tipo.CREDITO, "30.00")
+
+        self.cuenta.refresh_from_db()
+        self.assertEqual(self.cuenta.saldo, Decimal("70.00"))
+        self.assertEqual(d.saldo_acumulado, Decimal("100.00"))
+        self.assertEqual(c.saldo_acumulado, Decimal("70.00"))
+
+        c.delete()
+        self.cuenta.refresh_from_db()
+        self.assertEqual(self.cuenta.saldo, Decimal("100.00"))
+
+    def test_admin_borrado_en_bloque_y_cambio_de_cuenta_reconstruyen_saldos(self):
+        otro = Cliente.objects.create(dni="30999888", nombre="Luis", apellido="Gómez")
+        otra_cuenta = CuentaCorriente.objects.create(cliente=otro)
+        self._mov(MovimientoCuentaCorriente.Tipo.DEBITO, "100.00")
+        c = self._mov(MovimientoCuentaCorriente.Tipo.CREDITO, "30.00")
+
+        c.cuenta = otra_cuenta
+        c.save()
+        self.cuenta.refresh_from_db()
+        otra_cuenta.refresh_from_db()
+        self.assertEqual((self.cuenta.saldo, otra_cuenta.saldo), (Decimal("100.00"), Decimal("-30.00")))
+
+        model_admin = admin.site._registry[MovimientoCuentaCorriente]
+        creditos = MovimientoCuentaCorriente.objects.filter(tipo=MovimientoCuentaCorriente.Tipo.CREDITO)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            model_admin.delete_queryset(None, creditos)
+        self.assertTrue(callbacks)
+        otra_cuenta.refresh_from_db()
+        self.assertEqual(otra_cuenta.saldo, Decimal("0.00"))
+
+    def test_comando_detecta_y_reconstruye_diferencias(self):
+        self._mov(MovimientoCuentaCorriente.Tipo.DEBITO, "50.00")
+        CuentaCorriente.objects.filter(pk=self.cuenta.pk).update(saldo=Decimal("999.00"))
+
+        with self.assertRaises(CommandError):
+            call_command("cc_saldos", stdout=StringIO())
+
+        call_command("cc_saldos", "--rebuild", stdout=StringIO())
+        self.cuenta.refresh_from_db()
+        self.assertEqual(self.cuenta.saldo, Decimal("50.00"))
+        call_command("cc_saldos", stdout=StringIO())
+
+    def test_estado_de_cuenta_paginado_con_saldo_de_apertura(self):
+        base = timezone.now() - timedelta(days=10)
+        for i in range(5):
+            self._mov(MovimientoCuentaCorriente.Tipo.DEBITO, "10.00", fecha=base + timedelta(days=i))
+        # Pago retroactivo: se intercala y reconstruye los acumulados posteriores.
+        self._mov(MovimientoCuentaCorriente.Tipo.CREDITO, "5.00", fecha=base + timedelta(days=1, hours=1))
+
+        p1 = pagina_estado_cuenta(self.cuenta, tamanio=4)
+        self.assertEqual(p1["saldo_cierre"], Decimal("45.00"))
+        self.assertEqual(p1["saldo_apertura"], Decimal("20.00"))
+        self.assertTrue(p1["cursor_antes"])
+        self.assertFalse(p1["cursor_despues"])
+
+        p2 = pagina_estado_cuenta(self.cuenta, antes=p1["cursor_antes"], tamanio=4)
+        self.assertEqual(len(p2["movimientos"]), 2)
+        self.assertEqual(p2["saldo_cierre"], p1["saldo_apertura"])
+        self.assertEqual(p2["saldo_apertura"], Decimal("0.00"))
+        self.assertFalse(p2["cursor_antes"])
+
+        volver = pagina_estado_cuenta(self.cuenta, despues=p2["cursor_despues"], tamanio=4)
+        self.assertEqual(
+            [m.id for m in volver["movimientos"]],
+            [m.id for m in p1["movimientos"]],
+        )
+
+    def test_antiguedad_imputa_pagos_fifo_y_se_invalida_con_cada_movimiento(self):
+        ahora = timezone.now()
+        self._mov(MovimientoCuentaCorriente.Tipo.DEBITO, "100.00", ahora - timedelta(days=100))
+        self._mov(MovimientoCuentaCorriente.Tipo.DEBITO, "50.00", ahora - timedelta(days=40))
+        self._mov(MovimientoCuentaCorriente.Tipo.CREDITO, "30.00", ahora - timedelta(days=10))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._mov(MovimientoCuentaCorriente.Tipo.DEBITO, "20.00", ahora - timedelta(days=5))
+
+        fila = antiguedad_saldos()["filas"][0]
+        self.assertEqual(fila["d90_mas"], Decimal("70.00"))
+        self.assertEqual(fila["d31_60"], Decimal("50.00"))
+        self.assertEqual(fila["d0_30"], Decimal("20.00"))
+        self.assertEqual(fila["total"], self.cuenta.calcular_saldo())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._mov(MovimientoCuentaCorriente.Tipo.CREDITO, "80.00")
+        fila = antiguedad_saldos()["filas"][0]
+        self.assertEqual(fila["d90_mas"], Decimal("0.00"))
+        self.assertEqual(fila["d31_60"], Decimal("40.00"))
+
+        otra = Sucursal.objects.create(nombre="Norte")
+        self.assertEqual(antiguedad_saldos(sucursal_id=otra.id)["filas"], [])
+
+    def test_antiguedad_descuenta_pagos_anticipados(self):
+        ahora = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            self._mov(MovimientoCuentaCorriente.Tipo.DEBITO, "40.00", ahora - timedelta(days=70))
+            self._mov(MovimientoCuentaCorriente.Tipo.CREDITO, "140.00", ahora - timedelta(days=50))  # 100 a favor
+            self._mov(MovimientoCuentaCorriente.Tipo.DEBITO, "150.00", ahora - timedelta(days=5))
+
+        self.cuenta.refresh_from_db()
+        fila = antiguedad_saldos()["filas"][0]
+        self.assertEqual(fila["total"], self.cuenta.saldo)
+        self.assertEqual(fila["d0_30"], Decimal("50.00"))
+        self.assertEqual(fila["d61_90"], Decimal("0.00"))
+
+    def test_movimientos_antiguedad_por_lotes_keyset(self):
+        otra = CuentaCorriente.objects.create(
+            cliente=Cliente.objects.create(dni="30999888", nombre="Luis", apellido="Gómez"),
+        )
+        fecha = timezone.now() - timedelta(days=3)
+        for cuenta in (otra, self.cuenta):
+            for _ in range(3):  # misma fecha: desempata por id
+                MovimientoCuentaCorriente.objects.create(
+                    cuenta=cuenta,
+                    tipo=MovimientoCuentaCorriente.Tipo.CREDITO,
+                    monto=Decimal("1.00"),
+                    fecha=fecha,
+                )
+        self._mov(MovimientoCuentaCorriente.Tipo.DEBITO, "10.00")
+
+        esperado = list(
+            MovimientoCuentaCorriente.objects.order_by("cuenta_id", "fecha", "id")
+            .values_list("cuenta_id", "tipo", "monto", "fecha", "venta__sucursal_id")
+        )
+        self.assertEqual(list(_movimientos_antiguedad(lote=2)), esperado)
+        # Con sucursal, solo las cuentas con débitos de ventas de esa sucursal.
+        self.assertEqual(
+            {m[0] for m in _movimientos_antiguedad(self.venta.sucursal_id, lote=2)},
+            {self.cuenta.id},
+        )
+
+    def test_importacion_masiva_de_pagos(self):
+        self._mov(MovimientoCuentaCorriente.Tipo.DEBITO, "100.00")
+        csv_banco = (
+            "Fecha;Concepto;DNI;Importe\n"
+            "01/01/2020;TRF 1;30.111.222;1.000,50\n"
+            f"{timezone.localdate():%d/%m/%Y};TRF CUIT 27301112224;;20,00\n"
+            "01/01/2020;TRF 3;99999999;10\n"
+            "01/01/2020;TRF 4;30111222;abc\n"
+            "02/01/2020;TRF 5;30111222;$ 2.000\n"
+            ";TRF 6;30111222;5,00\n"
+        )
+        res = importar_pagos(leer_csv_pagos(csv_banco))
+
+        self.assertEqual(res["creados"], 3)
+        self.assertEqual(res["total"], Decimal("3020.50"))
+        self.assertEqual([r["linea"] for r in res["rechazados"]], [4, 5, 7])
+        self.assertEqual(res["rechazados"][2]["motivo"], "Fecha inválida")
+
+        # Los pagos de 2020 son anteriores al débito: se reconstruyen los acumulados.
+        self.cuenta.refresh_from_db()
+        self.assertEqual(self.cuenta.saldo, Decimal("-2920.50"))
+        self.assertEqual(self.cuenta.saldo, self.cuenta.calcular_saldo())
+        ultimo = self.cuenta.movimientos.order_by("-fecha", "-id").first()
+        self.assertEqual(ultimo.saldo_acumulado, self.cuenta.saldo)
+
+        # Reimportar el mismo archivo no duplica.
+        res = importar_pagos(leer_csv_pagos(csv_banco))
+        self.assertEqual((res["creados"], res["duplicados"]), (0, 3))
+
+
+class BuscarClientesTests(TestCase):
+    def test_prefijo_sin_acentos_y_dni_exacto_primero(self):
+        perez = Cliente.objects.create(dni="30.111.222", nombre="Ana", apellido="Pérez")
+        otro = Cliente.objects.create(dni="301112229", nombre="Luis", apellido="Gómez")
+        Cliente.objects.create(dni="40111222", nombre="Perla", apellido="Díaz")
+        CuentaCorriente.objects.create(cliente=perez)
+
+        self.assertEqual(perez.dni_normalizado, "30111222")
+        self.assertEqual(perez.busqueda, "perez ana")
+
+        self.assertEqual([c.id for c in buscar_clientes("30111222")], [perez.id, otro.id])
+        self.assertEqual([c.id for c in buscar_clientes("PEREZ")], [perez.id])
 
-# Create your tests here.
+        with self.assertNumQueries(1):
+            res = buscar_clientes("pe")
+            self.assertEqual(res[0].id, perez.id)  # prefijo de apellido antes que de nombre
+            self.assertEqual(res[0].cuenta_corriente.saldo, Decimal("0.00"))
@@ -0,0 +1,40 @@
+"""
+Configuración de gunicorn (start.sh la usa con -c).
+
+- preload_app: Django, URLs, vistas y templates se cargan una vez en el
+  master y los workers los heredan con el fork (arrancan en caliente).
+- Cada worker abre las conexiones mínimas del pool apenas arranca, así el
+  primer request no paga el handshake TCP + TLS con TiDB.
+"""
+
+import time
+
+preload_app = True
+
+_inicio = time.monotonic()
+
+
+def when_ready(server):
+    from core.arranque import formatear_tiempos, precargar
+
+    tiempos = {"app": time.monotonic() - _inicio}
+    try:
+        tiempos.update(precargar())
+    except Exception:
+        server.log.warning("arranque: la precarga falló", exc_info=True)
+    server.log.info("arranque master: %s", formatear_tiempos(tiempos))
+
+
+def post_worker_init(worker):
+    from core.db.pool import calentar_pools
+
+    inicio = time.monotonic()
+    try:
+        abiertas = calentar_pools()
+        worker.log.info(
+            "arranque worker %s: %s conexiones calentadas en %.0fms",
+            worker.pid, abiertas, (time.monotonic() - inicio) * 1000,
+        )
+    except Exception:
+        # Sin base todavía: el worker arranca igual y abre conexiones a demanda.
+        worker.log.warning("db pool: no se pudo calentar", exc_info=True)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Micro-benchmark del desglose fiscal: por monto (Decimal) vs lote en centavos.
+
+Compara desglosar_monto_final_gravado_con_iva (un monto por llamada) contra
+desglosar_montos_finales / desglosar_centavos (lote, enteros, con LRU) y
+verifica que den exactamente el mismo resultado:
+- barrido completo de centavos 0..--barrido con cada alicuota
+- montos al azar tipo carrito/búsqueda (precio unitario y subtotal)
+
+Uso:
+  python tools/benchmark_fiscal.py
+  python tools/benchmark_fiscal.py --filas 50 --repeticiones 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import timeit
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from core import fiscal  # noqa: E402
+
+ALICUOTAS = ("21.00", "10.50", "27.00", "2.50", "0.00")
+
+
+def montos_carrito(filas: int, semilla: int) -> list[Decimal]:
+    """Precio unitario y subtotal por fila, como _build_cart_context."""
+    rnd = random.Random(semilla)
+    montos = []
+    for _ in range(filas):
+        precio = Decimal(rnd.randrange(500, 25000000)).scaleb(-2)
+        montos.extend([precio, precio * rnd.randint(1, 6)])
+    return montos
+
+
+def _campos(d) -> tuple:
+    # str(): también tiene que coincidir la cantidad de decimales, no solo el valor.
+    return tuple(str(getattr(d, f)) for f in fiscal.DesgloseFiscalMonto.__dataclass_fields__)
+
+
+def verificar(barrido: int, montos: list[Decimal]) -> int:
+    comparados = 0
+    for alicuota in ALICUOTAS:
+        lote = fiscal.desglosar_centavos(range(barrido + 1), iva_alicuota_pct=alicuota)
+        for c, d in enumerate(lote):
+            esperado = fiscal.desglosar_monto_final_gravado_con_iva(Decimal(c).scaleb(-2), iva_alicuota_pct=alicuota)
+            if _campos(d) != _campos(esperado):
+                raise SystemExit(f"Diferencia en {c} centavos al {alicuota}%: {d} != {esperado}")
+            comparados += 1
+
+        lote = fiscal.desglosar_montos_finales(montos, iva_alicuota_pct=alicuota)
+        for monto, d in zip(montos, lote):
+            esperado = fiscal.desglosar_monto_final_gravado_con_iva(monto, iva_alicuota_pct=alicuota)
+            if _campos(d) != _campos(esperado):
+                raise SystemExit(f"Diferencia en {monto} al {alicuota}%: {d} != {esperado}")
+            comparados += 1
+    return comparados
+
+
+def medir(nombre: str, func, repeticiones: int, montos: int) -> float:
+    segundos = min(timeit.repeat(func, number=repeticiones, repeat=5))
+    us = segundos / (repeticiones * montos) * 1e6
+    print(f"{nombre:38s} {us:8.3f} us/monto")
+    return us
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, default=30, help="filas de carrito por render")
+    parser.add_argument("--repeticiones", type=int, default=1000)
+    parser.add_argument("--barrido", type=int, default=100000, help="centavos a verificar exhaustivamente")
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args()
+
+    montos = montos_carrito(args.filas, args.semilla)
+    comparados = verificar(args.barrido, montos)
+    print(f"Paridad OK: {comparados} desgloses idénticos ({len(ALICUOTAS)} alicuotas).")
+    print()
+
+    def por_monto():
+        return [fiscal.desglosar_monto_final_gravado_con_iva(m) for m in montos]
+
+    def lote_frio():
+        fiscal._desglose_centavos.cache_clear()
+        return fiscal.desglosar_montos_finales(montos)
+
+    def lote_caliente():
+        return fiscal.desglosar_montos_finales(montos)
+
+    centavos = [fiscal.centavos(m) for m in montos]
+
+    def lote_centavos():
+        return fiscal.desglosar_centavos(centavos)
+
+    base = medir("por monto (Decimal)", por_monto, args.repeticiones, len(montos))
+    for nombre, func in (
+        ("lote, cache frío", lote_frio),
+        ("lote, cache caliente", lote_caliente),
+        ("lote en centavos, cache caliente", lote_centavos),
+    ):
+        us = medir(nombre, func, args.repeticiones, len(montos))
+        print(f"{'':38s} x{base / us:.1f}")
+
+    print()
+    print(f"LRU: {fiscal._desglose_centavos.cache_info()}")
+
+
+if __name__ == "__main__":
+    run()
@@ -1,7 +1,7 @@
 from django.contrib import admin, messages
 from django.core.exceptions import ValidationError
 
-from .models import Venta, VentaItem, VentaPago, PlanCuotas
+from .models import MargenDiario, Venta, VentaItem, VentaPago, PlanCuotas
 from .services import confirmar_venta
 
 
@@ -73,3 +73,19 @@ class VentaAdmin(admin.ModelAdmin):
                 messages.error(request, f"Venta #{venta.id}: {e}")
         if ok:
             messages.success(request, f"Confirmadas: {ok}")
+
+
+@admin.register(MargenDiario)
+class MargenDiarioAdmin(admin.ModelAdmin):
+    list_display = (
+        "dia",
+        "sucursal",
+        "producto_nombre",
+        "categoria_nombre",
+        "cantidad",
+        "venta_neto",
+        "costo_total",
+    )
+    list_filter = ("sucursal", "dia")
+    search_fields = ("producto_nombre", "categoria_nombre")
+    date_hierarchy = "dia"
@@ -0,0 +1,186 @@
+"""
+Libro IVA Ventas mensual.
+
+Sale de los snapshots fiscales de VentaItem (neto, IVA y otros impuestos por
+línea, con la alícuota de cada ítem): la base agrupa por día, sucursal y
+alícuota y acá solo se da formato. Se exporta en streaming como CSV (Excel) o
+TXT de ancho fijo.
+
+Un mes cerrado (terminó hace más de LIBRO_IVA_DIAS_CIERRE días) ya no cambia:
+sus filas quedan en el cache compartido sin vencimiento y regenerarlo no toca
+la base.
+
+TXT, una línea por fila (importes en centavos, sin separador decimal):
+  fecha AAAAMMDD (8) | sucursal (4) | alícuota en centésimos, 2100 = 21 % (4) |
+  comprobantes (8) | neto (15) | IVA (15) | otros impuestos (15) | total (15)
+"""
+
+import calendar
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Venta, VentaItem
+
+# Subir si cambian las columnas (invalida los meses cacheados).
+LIBRO_IVA_VERSION = 1
+
+_LIBRO_KEY = "ventas:libro_iva:v{version}:{anio}-{mes:02d}:{sucursal}"
+
+FilaLibroIva = namedtuple(
+    "FilaLibroIva",
+    ["dia", "sucursal_id", "alicuota", "comprobantes", "neto", "iva", "otros", "total"],
+)
+
+_CERO = Decimal("0.00")
+
+
+def rango_mes(anio: int, mes: int):
+    """[inicio, fin) del mes local como datetimes aware (usa el índice de fecha)."""
+    tz = timezone.get_current_timezone()
+    primero = date(anio, mes, 1)
+    siguiente = primero + timedelta(days=calendar.monthrange(anio, mes)[1])
+    return (
+        timezone.make_aware(datetime.combine(primero, time.min), tz),
+        timezone.make_aware(datetime.combine(siguiente, time.min), tz),
+    )
+
+
+def mes_cerrado(anio: int, mes: int, *, ahora=None) -> bool:
+    _inicio, fin = rango_mes(anio, mes)
+    dias = int(getattr(settings, "LIBRO_IVA_DIAS_CIERRE", 5) or 0)
+    return (ahora or timezone.now()) >= fin + timedelta(days=dias)
+
+
+def _items_del_mes(anio: int, mes: int, sucursal_id=None):
+    inicio, fin = rango_mes(anio, mes)
+    qs = VentaItem.objects.filter(
+        venta__estado=Venta.Estado.CONFIRMADA,
+        venta__fecha__gte=inicio,
+        venta__fecha__lt=fin,
+    )
+    if sucursal_id:
+        qs = qs.filter(venta__sucursal_id=sucursal_id)
+    return qs
+
+
+def _fila(dia, sucursal_id, alicuota, comprobantes, neto, iva, otros, total) -> FilaLibroIva:
+    return FilaLibroIva(
+        dia,
+        sucursal_id,
+        Decimal(alicuota or 0).quantize(_CERO),
+        int(comprobantes or 0),
+        Decimal(neto or 0).quantize(_CERO),
+        Decimal(iva or 0).quantize(_CERO),
+        Decimal(otros or 0).quantize(_CERO),
+        Decimal(total or 0).quantize(_CERO),
+    )
+
+
+def _agrupar_en_python(qs):
+    """Fallback para motores sin tablas de zona horaria (TruncDate -> NULL)."""
+    grupos = {}
+    filas = qs.values_list(
+        "venta__fecha", "venta_id", "venta__sucursal_id", "iva_alicuota_pct",
+        "subtotal_sin_impuestos_nacionales", "subtotal_iva_contenido",
+        "subtotal_otros_impuestos_nacionales_indirectos", "subtotal",
+    )
+    for fecha, venta_id, sucursal_id, alicuota, neto, iva, otros, total in filas.iterator(chunk_size=2000):
+        clave = (timezone.localtime(fecha).date(), sucursal_id, Decimal(alicuota or 0).quantize(_CERO))
+        g = grupos.setdefault(clave, [set(), _CERO, _CERO, _CERO, _CERO])
+        g[0].add(venta_id)
+        g[1] += neto or 0
+        g[2] += iva or 0
+        g[3] += otros or 0
+        g[4] += total or 0
+    for clave in sorted(grupos):
+        ventas, neto, iva, otros, total = grupos[clave]
+        yield _fila(*clave, len(ventas), neto, iva, otros, total)
+
+
+def _calcular(anio: int, mes: int, sucursal_id=None):
+    """Filas del libro agregadas en SQL (una por día, sucursal y alícuota)."""
+    qs = _items_del_mes(anio, mes, sucursal_id)
+    agregado = (
+        qs.annotate(dia=TruncDate("venta__fecha"))
+        .values_list("dia", "venta__sucursal_id", "iva_alicuota_pct")
+        .annotate(
+            comprobantes=Count("venta_id", distinct=True),
+            neto=Sum("subtotal_sin_impuestos_nacionales"),
+            iva=Sum("subtotal_iva_contenido"),
+            otros=Sum("subtotal_otros_impuestos_nacionales_indirectos"),
+            total=Sum("subtotal"),
+        )
+        .order_by("dia", "venta__sucursal_id", "iva_alicuota_pct")
+    )
+    filas = agregado.iterator(chunk_size=500)
+    primera = next(filas, None)
+    if primera is None:
+        return
+    if primera[0] is None:
+        yield from _agrupar_en_python(qs)
+        return
+    yield _fila(*primera)
+    for fila in filas:
+        yield _fila(*fila)
+
+
+def filas_libro_iva(anio: int, mes: int, sucursal_id=None):
+    """
+    Filas del Libro IVA Ventas del mes. Mes cerrado: del cache (o se calcula
+    una vez y se guarda). Mes abierto: iterador directo sobre la consulta.
+    """
+    if not mes_cerrado(anio, mes):
+        return _calcular(anio, mes, sucursal_id)
+
+    key = _LIBRO_KEY.format(version=LIBRO_IVA_VERSION, anio=anio, mes=mes, sucursal=sucursal_id or "all")
+    filas = cache.get(key)
+    if filas is None:
+        filas = list(_calcular(anio, mes, sucursal_id))
+        cache.set(key, filas, timeout=None)
+    return filas
+
+
+# ======================================================================
+# Formato
+# ======================================================================
+
+def acumular_total(totales: dict, fila: FilaLibroIva) -> None:
+    """
+    Suma la fila a {alícuota: FilaLibroIva} (dia y sucursal en None), así los
+    totales salen mientras se transmite el libro.
+
+    Comprobantes queda en None (columna vacía): una venta con ítems a varias
+    alícuotas cuenta en cada una, y sumados no darían ventas distintas.
+    """
+    t = totales.get(fila.alicuota)
+    if t is None:
+        totales[fila.alicuota] = fila._replace(dia=None, sucursal_id=None, comprobantes=None)
+        return
+    totales[fila.alicuota] = t._replace(
+        neto=t.neto + fila.neto,
+        iva=t.iva + fila.iva,
+        otros=t.otros + fila.otros,
+        total=t.total + fila.total,
+    )
+
+
+def _centavos(valor: Decimal, ancho: int = 15) -> str:
+    return f"{int(valor.scaleb(2)):0{ancho}d}"
+
+
+def linea_txt(fila: FilaLibroIva) -> str:
+    return (
+        f"{fila.dia:%Y%m%d}"
+        f"{fila.sucursal_id:04d}"
+        f"{_centavos(fila.alicuota, 4)}"
+        f"{fila.comprobantes:08d}"
+        f"{_centavos(fila.neto)}{_centavos(fila.iva)}{_centavos(fila.otros)}{_centavos(fila.total)}"
+        "\r\n"
+    )
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0002_alter_variante_codigo_barras'),
+        ('core', '0002_appsetting'),
+        ('ventas', '0012_alter_venta_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ventaitem',
+            name='costo_unitario',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.CreateModel(
+            name='MargenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('producto_nombre', models.CharField(blank=True, max_length=150)),
+                ('categoria_nombre', models.CharField(blank=True, max_length=80)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('venta_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('venta_neto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('costo_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cantidad_sin_costo', models.PositiveIntegerField(default=0)),
+                ('categoria', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='catalogo.categoria')),
+                ('producto', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='catalogo.producto')),
+                ('sucursal', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, related_name='margenes_diarios', to='core.sucursal')),
+            ],
+            options={
+                'verbose_name': 'Margen diario',
+                'verbose_name_plural': 'Márgenes diarios',
+                'indexes': [models.Index(fields=['dia', 'sucursal'], name='ventas_marg_dia_7ecc5d_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='margendiario',
+            constraint=models.UniqueConstraint(fields=('dia', 'sucursal', 'producto'), name='margen_diario_unico'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:00
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill_margenes(apps, schema_editor):
+    VentaItem = apps.get_model("ventas", "VentaItem")
+    MargenDiario = apps.get_model("ventas", "MargenDiario")
+
+    # Ventas históricas: no hay costo al momento de la venta, usamos el actual del catálogo.
+    pendientes = (
+        VentaItem.objects
+        .filter(costo_unitario__isnull=True)
+        .select_related("variante__producto")
+        .only("id", "variante__costo", "variante__producto__costo_base")
+    )
+    lote = []
+    for item in pendientes.iterator(chunk_size=1000):
+        costo = Decimal(item.variante.costo or 0)
+        if costo <= 0:
+            costo = Decimal(item.variante.producto.costo_base or 0)
+        item.costo_unitario = costo.quantize(Decimal("0.01"))
+        lote.append(item)
+        if len(lote) >= 1000:
+            VentaItem.objects.bulk_update(lote, ["costo_unitario"])
+            lote = []
+    if lote:
+        VentaItem.objects.bulk_update(lote, ["costo_unitario"])
+
+    filas = (
+        VentaItem.objects
+        .filter(venta__estado="CONFIRMADA")
+        .values_list(
+            "venta__fecha",
+            "venta__sucursal_id",
+            "variante__producto_id",
+            "variante__producto__nombre",
+            "variante__producto__categoria_id",
+            "variante__producto__categoria__nombre",
+            "cantidad",
+            "subtotal",
+            "subtotal_sin_impuestos_nacionales",
+            "costo_unitario",
+        )
+    )
+    acumulado = {}
+    for (fecha, sucursal_id, producto_id, producto_nombre, categoria_id, categoria_nombre,
+         cantidad, subtotal, subtotal_neto, costo) in filas.iterator(chunk_size=2000):
+        dia = timezone.localtime(fecha).date() if timezone.is_aware(fecha) else fecha.date()
+        key = (dia, sucursal_id, producto_id)
+        row = acumulado.get(key)
+        if row is None:
+            row = acumulado[key] = MargenDiario(
+                dia=dia,
+                sucursal_id=sucursal_id,
+                producto_id=producto_id,
+                categoria_id=categoria_id,
+                producto_nombre=producto_nombre or "",
+                categoria_nombre=categoria_nombre or "",
+                cantidad=0,
+                venta_total=Decimal("0.00"),
+                venta_neto=Decimal("0.00"),
+                costo_total=Decimal("0.00"),
+                cantidad_sin_costo=0,
+            )
+        costo = Decimal(costo or 0)
+        row.cantidad += cantidad
+        row.venta_total += Decimal(subtotal or 0)
+        row.venta_neto += Decimal(subtotal_neto or subtotal or 0)
+        row.costo_total += costo * cantidad
+        if costo <= 0:
+            row.cantidad_sin_costo += cantidad
+
+    MargenDiario.objects.bulk_create(acumulado.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0013_ventaitem_costo_margendiario'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_margenes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0014_backfill_margenes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ventaitem',
+            name='atributos',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='ventaitem',
+            name='descripcion',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='ventaitem',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:11
+
+from django.db import migrations
+
+from ventas.models import describir_variante
+
+
+def backfill_descripciones(apps, schema_editor):
+    VentaItem = apps.get_model("ventas", "VentaItem")
+
+    # Ventas históricas: se toma la descripción del catálogo actual (mejor esfuerzo).
+    pendientes = (
+        VentaItem.objects
+        .filter(descripcion="")
+        .select_related("variante__producto")
+        .prefetch_related("variante__atributos__atributo", "variante__atributos__valor")
+        .order_by("id")
+    )
+    lote = []
+    for item in pendientes.iterator(chunk_size=1000):
+        item.descripcion, item.atributos = describir_variante(item.variante)
+        item.sku = item.variante.sku or ""
+        lote.append(item)
+        if len(lote) >= 1000:
+            VentaItem.objects.bulk_update(lote, ["descripcion", "sku", "atributos"])
+            lote = []
+    if lote:
+        VentaItem.objects.bulk_update(lote, ["descripcion", "sku", "atributos"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0015_ventaitem_descripcion'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_descripciones, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:35
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+
+_CENTAVO = Decimal("0.01")
+
+
+def _desglose(monto, alicuota):
+    """(neto, iva) de un monto final con IVA incluido, como core.fiscal al momento del backfill."""
+    total = Decimal(str(monto or 0)).quantize(_CENTAVO, rounding=ROUND_HALF_UP)
+    alicuota = Decimal(str(alicuota)).quantize(_CENTAVO, rounding=ROUND_HALF_UP)
+    if alicuota == 0 or total == 0:
+        return total, Decimal("0.00")
+    neto = (total / (Decimal("1") + alicuota / Decimal("100"))).quantize(_CENTAVO, rounding=ROUND_HALF_UP)
+    return neto, (total - neto).quantize(_CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def backfill_snapshot_fiscal(apps, schema_editor):
+    VentaItem = apps.get_model("ventas", "VentaItem")
+
+    # Ítems anteriores al snapshot fiscal: el Libro IVA suma estas columnas.
+    campos = [
+        "precio_unitario_sin_impuestos_nacionales",
+        "precio_unitario_iva_contenido",
+        "subtotal_sin_impuestos_nacionales",
+        "subtotal_iva_contenido",
+        "subtotal_otros_impuestos_nacionales_indirectos",
+    ]
+    pendientes = VentaItem.objects.filter(subtotal_iva_contenido__isnull=True).order_by("id")
+    lote = []
+    for item in pendientes.iterator(chunk_size=1000):
+        alicuota = item.iva_alicuota_pct if item.iva_alicuota_pct is not None else "21.00"
+        (
+            item.precio_unitario_sin_impuestos_nacionales,
+            item.precio_unitario_iva_contenido,
+        ) = _desglose(item.precio_unitario, alicuota)
+        item.subtotal_sin_impuestos_nacionales, item.subtotal_iva_contenido = _desglose(item.subtotal, alicuota)
+        item.subtotal_otros_impuestos_nacionales_indirectos = Decimal("0.00")
+        lote.append(item)
+        if len(lote) >= 1000:
+            VentaItem.objects.bulk_update(lote, campos)
+            lote = []
+    if lote:
+        VentaItem.objects.bulk_update(lote, campos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0016_backfill_ventaitem_descripcion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['estado', 'fecha'], name='ventas_vent_estado_804244_idx'),
+        ),
+        migrations.RunPython(backfill_snapshot_fiscal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caja', '0005_terminales'),
+        ('ventas', '0017_libro_iva'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='numero_terminal',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='punto_venta',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='terminal',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ventas', to='caja.terminal'),
+        ),
+        migrations.AddConstraint(
+            model_name='venta',
+            constraint=models.UniqueConstraint(fields=('sucursal', 'punto_venta', 'numero_terminal'), name='ventas_numero_terminal_uniq'),
+        ),
+    ]
@@ -4,12 +4,12 @@ from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
-from core.models import Sucursal
+from core.models import InvalidaReferenciaMixin, Sucursal
 from core.fiscal import desglosar_monto_final_gravado_con_iva
-from catalogo.models import Variante
+from catalogo.models import Categoria, Producto, Variante
 
 
-class PlanCuotas(models.Model):
+class PlanCuotas(InvalidaReferenciaMixin, models.Model):
     tarjeta = models.CharField(max_length=30)  # VISA / MASTERCARD / AMEX / etc.
     cuotas = models.PositiveSmallIntegerField()  # 1,3,6,12...
     recargo_pct = models.DecimalField(max_digits=5, decimal_places=2, default=0)
@@ -40,6 +40,19 @@ class Venta(models.Model):
 
     sucursal = models.ForeignKey(Sucursal, on_delete=models.PROTECT)
     numero_sucursal = models.PositiveBigIntegerField(null=True, blank=True)
+    # Ventas del POS: correlativo propio del terminal ("0002-00000015").
+    # numero_sucursal queda para las ventas previas a los terminales.
+    terminal = models.ForeignKey(
+        "caja.Terminal",
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name="ventas",
+        db_constraint=False,
+        db_index=False,
+    )
+    punto_venta = models.PositiveSmallIntegerField(null=True, blank=True)
+    numero_terminal = models.PositiveBigIntegerField(null=True, blank=True)
     caja_sesion = models.ForeignKey(
         "caja.CajaSesion",
         null=True,
@@ -110,13 +123,21 @@ class Venta(models.Model):
                 fields=["sucursal", "numero_sucursal"],
                 name="ventas_numero_sucursal_uniq",
             ),
+            models.UniqueConstraint(
+                fields=["sucursal", "punto_venta", "numero_terminal"],
+                name="ventas_numero_terminal_uniq",
+            ),
         ]
         indexes = [
             models.Index(fields=["sucursal", "numero_sucursal"]),
+            # Reportes por período (balances, Libro IVA Ventas).
+            models.Index(fields=["estado", "fecha"]),
         ]
 
     @property
     def codigo_sucursal(self) -> str:
+        if self.numero_terminal:
+            return f"{int(self.punto_venta or 0):04d}-{int(self.numero_terminal):08d}"
         if self.numero_sucursal:
             return f"V{int(self.numero_sucursal):0{self.CODIGO_DIGITS}d}"
         if self.id:
@@ -127,6 +148,35 @@ class Venta(models.Model):
         return f"Venta {self.codigo_sucursal} - {self.sucursal.nombre} - {self.fecha:%Y-%m-%d %H:%M}"
 
 
+_ATRIBUTOS_TALLE = ("talle", "tamaño", "tamanio", "size")
+
+
+def describir_variante(variante):
+    """
+    Descripción para ticket/detalle ("Remera - Rojo - M") y atributos {nombre: valor}
+    según el catálogo actual. Conviene tener prefetcheados atributos__atributo y atributos__valor.
+    """
+    base = (getattr(getattr(variante, "producto", None), "nombre", "") or "").strip()
+
+    color = ""
+    talle = ""
+    atributos = {}
+    for va in variante.atributos.all():
+        nom = (va.atributo.nombre or "").strip()
+        val = (va.valor.valor or "").strip()
+        if not val:
+            continue
+        atributos[nom] = val
+        if nom.lower() == "color":
+            color = val
+        elif nom.lower() in _ATRIBUTOS_TALLE:
+            talle = val
+
+    partes = [p for p in (base, color, talle) if p]
+    descripcion = " - ".join(partes) if partes else (variante.sku or base or "Item")
+    return descripcion[:255], dict(sorted(atributos.items()))
+
+
 class VentaItem(models.Model):
     venta = models.ForeignKey(Venta, on_delete=models.CASCADE, related_name="items")
     variante = models.ForeignKey(Variante, on_delete=models.PROTECT)
@@ -166,6 +216,28 @@ class VentaItem(models.Model):
         blank=True,
     )
 
+    # Snapshot del costo al confirmar (el costo del catálogo puede cambiar después).
+    costo_unitario = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+    )
+
+    # Snapshot de la descripción al confirmar: ticket y detalle se arman con la propia venta
+    # y no cambian si después se edita el producto o sus atributos.
+    descripcion = models.CharField(max_length=255, blank=True)
+    sku = models.CharField(max_length=64, blank=True)
+    atributos = models.JSONField(default=dict, blank=True)
+
+    @property
+    def descripcion_display(self):
+        return self.descripcion or self.sku or "Item"
+
+    def aplicar_snapshot_descripcion(self):
+        self.descripcion, self.atributos = describir_variante(self.variante)
+        self.sku = self.variante.sku or ""
+
     def _aplicar_snapshot_fiscal(self):
         alicuota = self.iva_alicuota_pct if self.iva_alicuota_pct is not None else Decimal("21.00")
         unitario = desglosar_monto_final_gravado_con_iva(
@@ -253,3 +325,64 @@ class VentaPago(models.Model):
 
     def __str__(self):
         return f"{self.venta_id} - {self.tipo} ${self.monto}"
+
+
+class MargenDiario(models.Model):
+    """
+    Acumulado de ventas y costo por día, sucursal y producto.
+
+    Se actualiza al confirmar cada venta. Guarda nombre de producto y
+    categoría como snapshot para que los reportes no consulten el catálogo.
+    """
+    dia = models.DateField()
+    sucursal = models.ForeignKey(
+        Sucursal,
+        on_delete=models.PROTECT,
+        related_name="margenes_diarios",
+        db_constraint=False,
+    )
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.DO_NOTHING,
+        related_name="+",
+        db_constraint=False,
+    )
+    categoria = models.ForeignKey(
+        Categoria,
+        on_delete=models.DO_NOTHING,
+        related_name="+",
+        null=True,
+        blank=True,
+        db_constraint=False,
+    )
+
+    producto_nombre = models.CharField(max_length=150, blank=True)
+    categoria_nombre = models.CharField(max_length=80, blank=True)
+
+    cantidad = models.PositiveIntegerField(default=0)
+    venta_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Venta sin impuestos nacionales (base para el margen).
+    venta_neto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    costo_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Unidades vendidas sin costo cargado (el margen de esas unidades no es real).
+    cantidad_sin_costo = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Margen diario"
+        verbose_name_plural = "Márgenes diarios"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dia", "sucursal", "producto"],
+                name="margen_diario_unico",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["dia", "sucursal"]),
+        ]
+
+    @property
+    def margen(self):
+        return (self.venta_neto or 0) - (self.costo_total or 0)
+
+    def __str__(self):
+        return f"{self.dia} - {self.sucursal_id} - {self.producto_nombre}"
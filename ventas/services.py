@@ -1,12 +1,14 @@
 from decimal import Decimal
-from django.db import transaction
-from django.db.models import Max
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 
 from catalogo.models import StockSucursal
 from core.models import Sucursal, AppSetting
 from core.fiscal import get_empresa_condicion_fiscal
-from .models import Venta
+from core.kpis import invalidar_kpis
+from .models import MargenDiario, Venta
 from admin_panel.services import permitir_vender_sin_stock
 
 
@@ -36,6 +38,74 @@ def _snapshot_empresa_y_fiscal_en_venta(venta: Venta, items: list) -> None:
     venta.fiscal_items_otros_impuestos_nacionales_indirectos = total_otros.quantize(Decimal("0.01"))
 
 
+def _costo_actual(variante) -> Decimal:
+    # Costo por variante; si no está cargado, el del producto base.
+    costo = Decimal(variante.costo or 0)
+    if costo <= 0:
+        costo = Decimal(variante.producto.costo_base or 0)
+    return costo.quantize(Decimal("0.01"))
+
+
+def _acumular_margenes(venta: Venta, items: list) -> None:
+    """
+    Suma los items de la venta al acumulado diario por (día, sucursal, producto).
+    """
+    dia = timezone.localdate(venta.fecha) if venta.fecha else timezone.localdate()
+
+    acumulado = {}
+    for item in items:
+        producto = item.variante.producto
+        row = acumulado.setdefault(producto.id, {
+            "producto": producto,
+            "cantidad": 0,
+            "venta_total": Decimal("0.00"),
+            "venta_neto": Decimal("0.00"),
+            "costo_total": Decimal("0.00"),
+            "cantidad_sin_costo": 0,
+        })
+        costo = Decimal(item.costo_unitario or 0)
+        row["cantidad"] += item.cantidad
+        row["venta_total"] += Decimal(item.subtotal or 0)
+        row["venta_neto"] += Decimal(item.subtotal_sin_impuestos_nacionales or item.subtotal or 0)
+        row["costo_total"] += costo * item.cantidad
+        if costo <= 0:
+            row["cantidad_sin_costo"] += item.cantidad
+
+    for producto_id, row in acumulado.items():
+        producto = row.pop("producto")
+        filtro = {"dia": dia, "sucursal_id": venta.sucursal_id, "producto_id": producto_id}
+        incrementos = {campo: F(campo) + valor for campo, valor in row.items()}
+
+        if MargenDiario.objects.filter(**filtro).update(**incrementos):
+            continue
+        try:
+            with transaction.atomic():
+                MargenDiario.objects.create(
+                    **filtro,
+                    categoria_id=producto.categoria_id,
+                    producto_nombre=producto.nombre,
+                    categoria_nombre=producto.categoria.nombre if producto.categoria_id else "",
+                    **row,
+                )
+        except IntegrityError:
+            # Otra venta creó la fila en paralelo: sumamos sobre esa.
+            MargenDiario.objects.filter(**filtro).update(**incrementos)
+
+
+def _asignar_numero_terminal(venta: Venta) -> None:
+    """
+    Próximo número del terminal de la venta. El UPDATE con F() bloquea solo la
+    fila de ese terminal hasta el commit: las otras cajas de la sucursal siguen
+    numerando sin esperar.
+    """
+    from caja.models import Terminal
+
+    Terminal.objects.filter(pk=venta.terminal_id).update(ultimo_numero_venta=F("ultimo_numero_venta") + 1)
+    venta.punto_venta, venta.numero_terminal = (
+        Terminal.objects.filter(pk=venta.terminal_id).values_list("numero", "ultimo_numero_venta").get()
+    )
+
+
 @transaction.atomic
 def confirmar_venta(venta: Venta):
     if venta.estado != Venta.Estado.BORRADOR:
@@ -45,11 +115,19 @@ def confirmar_venta(venta: Venta):
             f"La sucursal {venta.sucursal.nombre} está inactiva. No se puede confirmar la venta."
         )
 
-    items = list(venta.items.select_related("variante").all())
+    items = list(
+        venta.items
+        .select_related("variante__producto__categoria")
+        .prefetch_related("variante__atributos__atributo", "variante__atributos__valor")
+    )
 
     # Recalcular total
     total = Decimal("0.00")
     for item in items:
+        if item.costo_unitario is None:
+            item.costo_unitario = _costo_actual(item.variante)
+        if not item.descripcion:
+            item.aplicar_snapshot_descripcion()
         # Fuerza persistencia del snapshot fiscal del item (y subtotal) por si cambió.
         item.save()
         total += item.subtotal
@@ -73,8 +151,11 @@ def confirmar_venta(venta: Venta):
             stock.cantidad -= item.cantidad
             stock.save()
 
-    if not venta.numero_sucursal:
-        # Serializa la asignación de correlativo por sucursal.
+    if venta.terminal_id:
+        if not venta.numero_terminal:
+            _asignar_numero_terminal(venta)
+    elif not venta.numero_sucursal:
+        # Ventas sin terminal: correlativo por sucursal (serializa toda la sucursal).
         Sucursal.objects.select_for_update().only("id").get(id=venta.sucursal_id)
         ultimo = (
             Venta.objects
@@ -88,3 +169,9 @@ def confirmar_venta(venta: Venta):
     venta.total = total
     venta.estado = Venta.Estado.CONFIRMADA
     venta.save()
+
+    _acumular_margenes(venta, items)
+
+    # KPIs del dashboard: se recalculan recién cuando la venta quedó commiteada.
+    sucursal_id = venta.sucursal_id
+    transaction.on_commit(lambda: invalidar_kpis(sucursal_id))
@@ -1,3 +1,146 @@
-from django.test import TestCase
+from datetime import date, datetime
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from catalogo.models import Atributo, AtributoValor, Categoria, Producto, StockSucursal, Variante, VarianteAtributo
+from core.models import Sucursal
+from ventas.libro_iva import acumular_total, filas_libro_iva, linea_txt
+from ventas.models import MargenDiario, Venta, VentaItem
+from ventas.services import confirmar_venta
+
+
+class ConfirmarVentaTests(TestCase):
+    def setUp(self):
+        self.sucursal = Sucursal.objects.create(nombre="Centro")
+        categoria = Categoria.objects.create(nombre="Remeras")
+        self.producto = Producto.objects.create(nombre="Remera lisa", categoria=categoria)
+        self.variante = Variante.objects.create(
+            producto=self.producto,
+            sku="REM-M",
+            precio=Decimal("121.00"),
+            costo=Decimal("40.00"),
+        )
+        StockSucursal.objects.create(sucursal=self.sucursal, variante=self.variante, cantidad=10)
+
+    def _confirmar(self, cantidad):
+        venta = Venta.objects.create(sucursal=self.sucursal, total=Decimal("0.00"))
+        VentaItem.objects.create(
+            venta=venta,
+            variante=self.variante,
+            cantidad=cantidad,
+            precio_unitario=Decimal("121.00"),
+        )
+        confirmar_venta(venta)
+        return venta
+
+    def test_snapshot_de_costo_y_acumulado_de_margen(self):
+        venta = self._confirmar(2)
+
+        # Un cambio de costo posterior no altera lo ya vendido.
+        self.variante.costo = Decimal("90.00")
+        self.variante.save()
+        self._confirmar(1)
+
+        self.assertEqual(venta.items.get().costo_unitario, Decimal("40.00"))
+
+        margen = MargenDiario.objects.get(sucursal=self.sucursal, producto=self.producto)
+        self.assertEqual(margen.cantidad, 3)
+        self.assertEqual(margen.venta_total, Decimal("363.00"))
+        self.assertEqual(margen.venta_neto, Decimal("300.00"))
+        self.assertEqual(margen.costo_total, Decimal("170.00"))
+        self.assertEqual(margen.categoria_nombre, "Remeras")
+
+    def test_snapshot_de_descripcion_no_depende_del_catalogo(self):
+        talle = Atributo.objects.create(nombre="Talle")
+        VarianteAtributo.objects.create(
+            variante=self.variante,
+            atributo=talle,
+            valor=AtributoValor.objects.create(atributo=talle, valor="M"),
+        )
+        venta = self._confirmar(1)
+
+        self.producto.nombre = "Remera estampada"
+        self.producto.save()
+
+        item = venta.items.get()
+        self.assertEqual(item.descripcion, "Remera lisa - M")
+        self.assertEqual(item.sku, "REM-M")
+        self.assertEqual(item.atributos, {"Talle": "M"})
+
+
+class ConfirmarVentaAtomicaTests(TransactionTestCase):
+    def test_stock_insuficiente_no_deja_descuentos_parciales(self):
+        sucursal = Sucursal.objects.create(nombre="Centro")
+        producto = Producto.objects.create(nombre="Remera lisa")
+        hay = Variante.objects.create(producto=producto, sku="REM-M", precio=Decimal("10.00"))
+        falta = Variante.objects.create(producto=producto, sku="REM-L", precio=Decimal("10.00"))
+        StockSucursal.objects.create(sucursal=sucursal, variante=hay, cantidad=10)
+        StockSucursal.objects.create(sucursal=sucursal, variante=falta, cantidad=0)
+
+        venta = Venta.objects.create(sucursal=sucursal)
+        VentaItem.objects.create(venta=venta, variante=hay, cantidad=3, precio_unitario=Decimal("10.00"))
+        VentaItem.objects.create(venta=venta, variante=falta, cantidad=1, precio_unitario=Decimal("10.00"))
+
+        # Sin transacción abierta por el llamador (como la acción del admin).
+        with self.assertRaises(ValidationError):
+            confirmar_venta(venta)
+
+        self.assertEqual(StockSucursal.objects.get(variante=hay).cantidad, 10)
+        self.assertFalse(MargenDiario.objects.exists())
+        self.assertEqual(Venta.objects.get(pk=venta.pk).estado, Venta.Estado.BORRADOR)
+
+
+class LibroIvaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.centro = Sucursal.objects.create(nombre="Centro")
+        self.norte = Sucursal.objects.create(nombre="Norte")
+        producto = Producto.objects.create(nombre="Remera")
+        self.variante = Variante.objects.create(producto=producto, sku="REM-1", precio=Decimal("121.00"))
+
+        fecha = timezone.make_aware(datetime(2026, 3, 10, 23, 30))  # local: sigue siendo el 10
+        for sucursal, items in (
+            (self.centro, [("121.00", "21.00", 2), ("110.50", "10.50", 1)]),
+            (self.centro, [("121.00", "21.00", 1)]),
+            (self.norte, [("242.00", "21.00", 1)]),
+        ):
+            venta = Venta.objects.create(sucursal=sucursal, estado=Venta.Estado.CONFIRMADA, fecha=fecha)
+            for precio, alicuota, cantidad in items:
+                VentaItem.objects.create(
+                    venta=venta,
+                    variante=self.variante,
+                    cantidad=cantidad,
+                    precio_unitario=Decimal(precio),
+                    iva_alicuota_pct=Decimal(alicuota),
+                )
+        Venta.objects.create(sucursal=self.centro, estado=Venta.Estado.BORRADOR, fecha=fecha)
+
+    def test_agrupa_por_dia_sucursal_y_alicuota_y_cachea_mes_cerrado(self):
+        filas = filas_libro_iva(2026, 3)
+        self.assertEqual(
+            [(f.dia, f.sucursal_id, f.alicuota, f.comprobantes, f.neto, f.iva, f.total) for f in filas],
+            [
+                (date(2026, 3, 10), self.centro.id, Decimal("10.50"), 1, Decimal("100.00"), Decimal("10.50"), Decimal("110.50")),
+                (date(2026, 3, 10), self.centro.id, Decimal("21.00"), 2, Decimal("300.00"), Decimal("63.00"), Decimal("363.00")),
+                (date(2026, 3, 10), self.norte.id, Decimal("21.00"), 1, Decimal("200.00"), Decimal("42.00"), Decimal("242.00")),
+            ],
+        )
+
+        # Mes cerrado: regenerarlo no consulta la base.
+        with self.assertNumQueries(0):
+            self.assertEqual(filas_libro_iva(2026, 3), filas)
+
+        totales = {}
+        for f in filas:
+            acumular_total(totales, f)
+        self.assertEqual(totales[Decimal("21.00")].iva, Decimal("105.00"))
+        self.assertIsNone(totales[Decimal("21.00")].comprobantes)
+        self.assertEqual(
+            linea_txt(filas[0]),
+            f"20260310{self.centro.id:04d}1050" "00000001"
+            "000000000010000" "000000000001050" "000000000000000" "000000000011050\r\n",
+        )